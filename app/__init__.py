@@ -119,6 +119,11 @@ def create_app(config_class=Config):
     from app.blueprints.dashboard import dashboard_bp
     app.register_blueprint(dashboard_bp, url_prefix='/dashboard')
 
+    # Kompaktor žurnálů katalogů farem
+    if app.config.get('CATALOG_COMPACT_INTERVAL'):
+        from app.core.farm_catalog import catalog_store
+        catalog_store.start_compactor(app.config['CATALOG_COMPACT_INTERVAL'], app.config['CATALOG_COMPACT_MIN_BYTES'])
+
     # Hlavní stránka
     @app.route('/')
     def index():
@@ -132,15 +137,9 @@ def create_app(config_class=Config):
         }
         
         try:
-            from app.core.models import Farm, Product
-            # Počet farem
-            stats['farms_count'] = Farm.query.count()
-            # Aktivní farmy
-            stats['active_farms'] = Farm.query.filter_by(is_active=True).count()
-            # Celkový počet produktů
-            stats['total_products'] = Product.query.count()
-            # Potvrzené produkty
-            stats['confirmed_products'] = Product.query.filter_by(is_confirmed=True).count()
+            from app.blueprints.dashboard import product_stats
+            # Počty farem a produktů jedním agregačním dotazem (krátce cachované)
+            stats.update(product_stats())
             # Úspěšnost
             if stats['total_products'] > 0:
                 stats['success_rate'] = round((stats['confirmed_products'] / stats['total_products']) * 100)
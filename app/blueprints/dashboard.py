@@ -1,31 +1,49 @@
-from flask import Blueprint, render_template, jsonify, current_app
+from flask import Blueprint, render_template, jsonify, current_app, request
 from flask_login import login_required, current_user
 from app.core.models import Farm, Product
+from app.core.catalog_backends import get_catalog_backend
+from app.core.stats_cache import stats_cache
+from app.core.openai_clients import openai_clients
+from app.core.llm_cache import llm_cache
+from app.core.single_flight import single_flight
+from app.core.translation_store import translation_store
+from app.core.retry_policy import generation_retry
+from app.core.telemetry import telemetry
+from app.core.pregeneration import pregeneration
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+RECENT_ACTIVITIES_LIMIT = 10
+
+def product_stats(user_id=None):
+    """
+    Počty farem a produktů (všech, nebo jen farem uživatele).
+
+    Počty produktů spočítá úložiště katalogů jedním dotazem (GROUP BY přes
+    farmu a stav potvrzení); výsledek se krátce drží v cache.
+    """
+    backend = get_catalog_backend()
+
+    def compute():
+        farm_stats = backend.farm_stats(user_id)
+        return {
+            'farms_count': len(farm_stats),
+            'active_farms': sum(1 for farm in farm_stats.values() if farm['is_active']),
+            'total_products': sum(farm['products'] for farm in farm_stats.values()),
+            'confirmed_products': sum(farm['confirmed'] for farm in farm_stats.values())
+        }
+
+    return stats_cache.get_or_compute(('product_stats', backend.name, user_id), compute)
+
 @dashboard_bp.route('/')
 @login_required
 def index():
     """Hlavní stránka s přehledem"""
     try:
         # Získání statistik
-        farms = Farm.query.filter_by(user_id=current_user.id).all()
-        stats = {
-            'farms_count': len(farms),
-            'active_farms': len([f for f in farms if f.is_active]),
-            'total_products': 0,
-            'confirmed_products': 0,
-            'recent_activities': []
-        }
-        
-        # Statistiky produktů pro každou farmu
-        for farm in farms:
-            products = Product.query.filter_by(farm_id=farm.id).all()
-            stats['total_products'] += len(products)
-            stats['confirmed_products'] += len([p for p in products if p.is_confirmed])
+        stats = dict(product_stats(current_user.id), recent_activities=[])
         
-        return render_template('dashboard/index.html', stats=stats, farms=farms)
+        return render_template('dashboard/index.html', stats=stats)
         
     except Exception as e:
         current_app.logger.error(f'Chyba při načítání dashboardu: {str(e)}')
@@ -36,28 +54,18 @@ def index():
 def get_stats():
     """API endpoint pro aktualizaci statistik"""
     try:
-        farms = Farm.query.filter_by(user_id=current_user.id).all()
+        counts = product_stats(current_user.id)
         
-        # Základní statistiky
         stats = {
-            'farms_count': len(farms),
-            'active_farms': len([f for f in farms if f.is_active]),
+            'farms_count': counts['farms_count'],
+            'active_farms': counts['active_farms'],
             'products_by_status': {
-                'draft': 0,
+                'draft': counts['total_products'] - counts['confirmed_products'],
                 'pending': 0,
-                'confirmed': 0
+                'confirmed': counts['confirmed_products']
             }
         }
         
-        # Statistiky produktů
-        for farm in farms:
-            products = Product.query.filter_by(farm_id=farm.id).all()
-            for product in products:
-                if product.is_confirmed:
-                    stats['products_by_status']['confirmed'] += 1
-                else:
-                    stats['products_by_status']['draft'] += 1
-        
         return jsonify(stats)
         
     except Exception as e:
@@ -71,21 +79,48 @@ def get_stats():
 def get_activities():
     """API endpoint pro získání posledních aktivit"""
     try:
-        activities = []
-        farms = Farm.query.filter_by(user_id=current_user.id).all()
-        
-        for farm in farms:
-            farm_activities = Product.query.filter_by(farm_id=farm.id).all()
-            activities.extend(farm_activities)
-        
-        # Seřazení a formátování aktivit
-        activities.sort(key=lambda x: x.created_at, reverse=True)
-        activities = [a.to_dict() for a in activities[:10]]
+        def compute():
+            # Řazení a limit v databázi (index ix_product_created_at)
+            products = Product.query.join(Farm).filter(Farm.user_id == current_user.id) \
+                .order_by(Product.created_at.desc()).limit(RECENT_ACTIVITIES_LIMIT).all()
+            return [p.to_dict() for p in products]
         
+        activities = stats_cache.get_or_compute(('activities', current_user.id), compute)
         return jsonify(activities)
         
     except Exception as e:
         current_app.logger.error(f'Chyba při získávání aktivit: {str(e)}')
         return jsonify({
             'error': 'Při získávání aktivit došlo k chybě'
-        }), 500 
\ No newline at end of file
+        }), 500 
+
+@dashboard_bp.route('/openai')
+@login_required
+def get_openai_stats():
+    """Využití spojení k OpenAI (znovupoužití keep-alive, TLS handshaky), LLM cache, opakování, slučování generování a překladů"""
+    return jsonify({
+        'clients': openai_clients.to_dict(),
+        'llm_cache': llm_cache.stats(),
+        'retries': generation_retry.stats(),
+        'pregeneration': pregeneration.stats(),
+        'single_flight': single_flight.stats(),
+        'translations': translation_store.stats()
+    })
+
+@dashboard_bp.route('/metrics')
+@login_required
+def get_generation_metrics():
+    """
+    Telemetrie generování: počty volání, tokeny, cena, fallbacky, varování
+    validace a histogramy latence podle farmy, endpointu a typu popisu.
+
+    Bez parametrů vrací souhrn tohoto procesu; source=log přepočítá souhrn
+    ze sdíleného logu událostí (všechny workery), volitelně od since (unix čas).
+    """
+    if request.args.get('source') == 'log':
+        try:
+            since = float(request.args.get('since', 0))
+        except ValueError:
+            return jsonify({'error': 'Parametr since musí být číslo (unix čas)'}), 400
+        return jsonify({'source': 'log', **telemetry.aggregate_log(since)})
+    return jsonify({'source': 'process', **telemetry.snapshot()})
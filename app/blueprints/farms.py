@@ -1,9 +1,11 @@
 from flask import Blueprint, render_template, request, jsonify, current_app, redirect, url_for, flash
 from flask_login import login_required, current_user
 from app.core.models import Farm
+from app.core.catalog_backends import get_catalog_backend
+from app.core.pregeneration import pregeneration
+from app.processors.product_name_processor import warm_translations_in_background
 from app import db
 import os
-import json
 import csv
 import io
 
@@ -79,7 +81,17 @@ def register():
                 flash('CSV soubor je prázdný nebo neobsahuje validní data', 'danger')
                 return redirect(url_for('farms.register'))
 
-            # Vytvoření JSON souboru s daty farmy
+            # Vytvoření záznamu v databázi (SQL úložiště katalogu ho potřebuje)
+            farm = Farm(
+                farm_id=farm_id,
+                name=name,
+                description=description,
+                user_id=current_user.id
+            )
+            db.session.add(farm)
+            db.session.flush()
+
+            # Uložení katalogu farmy
             farm_data = {
                 'farm_id': farm_id,
                 'name': name,
@@ -87,27 +99,21 @@ def register():
                 'products': csv_data
             }
             
-            json_path = os.path.join(farm_dir, f'{farm_id}.json')
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(farm_data, f, ensure_ascii=False, indent=2)
-            current_app.logger.debug(f'Uložena data farmy do: {json_path}')
+            get_catalog_backend().save_catalog(farm_id, farm_data)
+            current_app.logger.debug(f'Uložen katalog farmy {farm_id}')
+            # Překlady názvů pro generování obrázků připravíme předem na pozadí
+            warm_translations_in_background(csv_data)
 
         except Exception as e:
+            db.session.rollback()
             current_app.logger.error(f'Chyba při zpracování souborů: {str(e)}', exc_info=True)
             flash('Chyba při zpracování souborů. Zkontrolujte formát CSV souboru.', 'danger')
             return redirect(url_for('farms.register'))
 
-        # Vytvoření záznamu v databázi
-        farm = Farm(
-            farm_id=farm_id,
-            name=name,
-            description=description,
-            user_id=current_user.id
-        )
-        
-        db.session.add(farm)
         db.session.commit()
         current_app.logger.info(f'Farma {name} byla úspěšně vytvořena (ID: {farm_id})')
+        # Popisy nových produktů se začnou generovat do cache na pozadí
+        pregeneration.enqueue(farm_id, get_catalog_backend(), current_app._get_current_object())
         
         flash('Farma byla úspěšně zaregistrována', 'success')
         return redirect(url_for('farms.list'))
@@ -128,22 +134,18 @@ def list():
         farms = Farm.query.filter_by(user_id=current_user.id).all()
         current_app.logger.debug(f'Nalezeno {len(farms)} farem pro uživatele {current_user.id}')
         
-        # Načtení počtu produktů pro každou farmu
+        # Souhrn katalogu pro každou farmu (bez načítání celých katalogů)
+        backend = get_catalog_backend()
         for farm in farms:
             try:
-                json_path = os.path.join(current_app.root_path, 'data', 'farms', farm.farm_id, f'{farm.farm_id}.json')
-                if os.path.exists(json_path):
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        farm_data = json.load(f)
-                        # Počítáme pouze řádky dat bez hlavičky
-                        farm.products = farm_data.get('products', [])
-                        current_app.logger.debug(f'Načteno {len(farm.products)} produktů pro farmu {farm.farm_id}')
+                if backend.exists(farm.farm_id):
+                    farm.summary = backend.summary(farm.farm_id)
                 else:
-                    farm.products = []
-                    current_app.logger.warning(f'JSON soubor pro farmu {farm.farm_id} neexistuje: {json_path}')
+                    farm.summary = None
+                    current_app.logger.warning(f'Katalog farmy {farm.farm_id} neexistuje')
             except Exception as e:
-                farm.products = []
-                current_app.logger.error(f'Chyba při načítání JSON dat pro farmu {farm.farm_id}: {str(e)}', exc_info=True)
+                farm.summary = None
+                current_app.logger.error(f'Chyba při načítání souhrnu katalogu farmy {farm.farm_id}: {str(e)}', exc_info=True)
         
         return render_template('farms/list.html', farms=farms)
         
@@ -177,6 +179,7 @@ def edit(farm_id):
         farm.description = request.form.get('description')
         
         # Zpracování CSV souboru, pokud byl nahrán
+        catalog_uploaded = False
         if 'products_csv' in request.files:
             csv_file = request.files['products_csv']
             if csv_file and csv_file.filename:
@@ -198,10 +201,10 @@ def edit(farm_id):
                             'products': csv_data
                         }
                         
-                        json_path = os.path.join(farm_dir, f'{farm_id}.json')
-                        with open(json_path, 'w', encoding='utf-8') as f:
-                            json.dump(farm_data, f, ensure_ascii=False, indent=2)
+                        get_catalog_backend().save_catalog(farm_id, farm_data)
                         current_app.logger.info(f'Aktualizován seznam produktů pro farmu {farm_id}')
+                        warm_translations_in_background(csv_data)
+                        catalog_uploaded = True
                 except Exception as e:
                     current_app.logger.error(f'Chyba při zpracování CSV souboru: {str(e)}', exc_info=True)
                     return jsonify({
@@ -211,6 +214,9 @@ def edit(farm_id):
         
         db.session.commit()
         current_app.logger.info(f'Farma {farm.name} byla úspěšně aktualizována')
+        if catalog_uploaded:
+            # Nezměněné produkty mají popisy v cache, vygenerují se jen nové a změněné
+            pregeneration.enqueue(farm_id, get_catalog_backend(), current_app._get_current_object())
         
         return jsonify({
             'success': True,
@@ -264,7 +270,8 @@ def delete(farm_id):
                     'message': 'Chyba při mazání adresáře farmy'
                 }), 500
         
-        # Smazání záznamu z databáze
+        # Smazání katalogu a záznamu z databáze
+        get_catalog_backend().delete_catalog(farm_id)
         db.session.delete(farm)
         db.session.commit()
         current_app.logger.info(f'Farma {farm_id} byla úspěšně smazána')
@@ -1,8 +1,13 @@
-from flask import Blueprint, render_template, request, jsonify, current_app, send_file
+from flask import Blueprint, render_template, request, jsonify, current_app, send_file, Response, stream_with_context
 from flask_login import login_required, current_user
 from app.core.models import Product, Farm
 from app.core.product_manager import ProductManager
-from app import db
+from app.core.catalog_backends import get_catalog_backend
+from app.core.bulk_generation import bulk_generation
+from app.generators.text_generator import GenerationError
+from app.generators.output_validator import output_validator, audit_summary
+from app import db, socketio
+from flask_socketio import join_room
 import os
 import json
 import pandas as pd
@@ -51,7 +56,8 @@ def generate_product_content():
             
         try:
             current_app.logger.info('Začínám generovat obsah pomocí ProductManager')
-            result = product_manager.generate_product_content(farm_id, sku)
+            result = product_manager.generate_product_content(farm_id, sku, data.get('type'),
+                                                              bypass_cache=bool(data.get('regenerate')))
             current_app.logger.info(f'Obsah úspěšně vygenerován: {result}')
             return jsonify(result)
         except Exception as e:
@@ -78,7 +84,7 @@ def regenerate_content():
         return jsonify({'error': 'Chybí ID farmy nebo SKU'}), 400
         
     try:
-        result = product_manager.generate_product_content(farm_id, sku, content_type)
+        result = product_manager.generate_product_content(farm_id, sku, content_type, bypass_cache=True)
         return jsonify(result)
     except GenerationError as e:
         return jsonify({'error': str(e)}), 400
@@ -166,28 +172,22 @@ def confirm_product():
         long_description = data.get('long_description')
         image_path = data.get('image_path')
             
-        # Načtení JSON souboru
-        json_path = os.path.join(current_app.root_path, 'data', 'farms', farm_id, f'{farm_id}.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            farm_data = json.load(f)
+        fields = {
+            'Short Description': short_description,
+            'Description': long_description,
+            'is_confirmed': True
+        }
+        # Zachováme kompletní URL obrázku
+        if image_path:
+            fields['mirakl_image_1'] = image_path
+            fields['image_path'] = image_path
             
         # Nalezení a aktualizace produktu
-        for product in farm_data.get('products', []):
-            if product.get('Shop SKU') == sku:
-                product['Short Description'] = short_description
-                product['Description'] = long_description
-                # Zachováme kompletní URL obrázku
-                if image_path:
-                    product['mirakl_image_1'] = image_path
-                    product['image_path'] = image_path
-                product['is_confirmed'] = True
-                break
-                
-        # Uložení změn
-        with open(json_path, 'w', encoding='utf-8') as f:
-            json.dump(farm_data, f, indent=2, ensure_ascii=False)
+        ack = get_catalog_backend().update_product(farm_id, sku, fields)
+        if not ack.found:
+            return jsonify({'error': f'Produkt {sku} nenalezen'}), 404
         
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'commit': ack.to_dict()})
         
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
@@ -195,88 +195,245 @@ def confirm_product():
     except Exception as e:
         return jsonify({'error': f'Neočekávaná chyba: {str(e)}'}), 500
 
+# Pole produktu, která lze vyžádat parametrem fields=
+PRODUCT_FIELDS = ('sku', 'name', 'short_description', 'long_description', 'image_path', 'is_confirmed', 'metadata')
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def _product_to_api(product, fields):
+    """Převede řádek katalogu na produkt pro frontend (jen vyžádaná pole)"""
+    result = {}
+    for field in fields:
+        if field == 'sku':
+            result['sku'] = product.get('Shop SKU', '')
+        elif field == 'name':
+            result['name'] = product.get('Name', '')
+        elif field == 'short_description':
+            result['short_description'] = product.get('Short Description', '')
+        elif field == 'long_description':
+            result['long_description'] = product.get('Description', '')
+        elif field == 'image_path':
+            result['image_path'] = product.get('mirakl_image_1', '')
+        elif field == 'is_confirmed':
+            result['is_confirmed'] = bool(product.get('is_confirmed', False))
+        elif field == 'metadata':
+            result['metadata'] = {
+                'allergens': product.get('Farm allergens', ''),
+                'ingredients': product.get('Farm ingredients', ''),
+                'weight': product.get('Weight', ''),
+                'category': product.get('Category', '')
+            }
+    return result
+
+def _product_query_args():
+    """
+    Načte společné parametry výpisu produktů (fields, category, confirmed).
+
+    Raises:
+        ValueError: Při neplatné hodnotě parametru
+    """
+    fields = PRODUCT_FIELDS
+    if request.args.get('fields'):
+        fields = tuple(f.strip() for f in request.args['fields'].split(',') if f.strip())
+        unknown = set(fields) - set(PRODUCT_FIELDS)
+        if unknown:
+            raise ValueError(f"Neznámá pole: {', '.join(sorted(unknown))}")
+
+    confirmed = request.args.get('confirmed')
+    if confirmed is not None:
+        if confirmed.lower() not in ('true', 'false', '1', '0'):
+            raise ValueError('Parametr confirmed musí být true nebo false')
+        confirmed = confirmed.lower() in ('true', '1')
+
+    return fields, {'confirmed': confirmed, 'category': request.args.get('category')}
+
+def _check_farm_access(farm_id):
+    """Vrátí chybovou odpověď, pokud farma nepatří přihlášenému uživateli"""
+    farm = Farm.query.filter_by(farm_id=farm_id).first_or_404()
+    if farm.user_id != current_user.id:
+        current_app.logger.warning(f'Uživatel {current_user.id} se pokusil přistoupit k farmě {farm_id}, která mu nepatří')
+        return jsonify({
+            'error': 'Nemáte přístup k této farmě'
+        }), 403
+    return None
+
 @products_bp.route('/api/farms/<farm_id>/products', methods=['GET'])
 @login_required
 def get_farm_products(farm_id):
-    """Načtení produktů farmy"""
-    current_app.logger.info(f'Začátek načítání produktů pro farmu {farm_id}')
-    
+    """
+    Stránkované načtení produktů farmy.
+
+    Parametry: limit, after_sku (kurzor), fields (seznam polí oddělený čárkou),
+    category, confirmed (true/false). První stránka obsahuje i celkové počty.
+    """
     try:
-        # Kontrola přístupu k farmě
-        current_app.logger.debug(f'Hledám farmu s ID {farm_id}')
-        farm = Farm.query.filter_by(farm_id=farm_id).first_or_404()
-        current_app.logger.debug(f'Farma nalezena: {farm.name}')
+        denied = _check_farm_access(farm_id)
+        if denied:
+            return denied
         
-        if farm.user_id != current_user.id:
-            current_app.logger.warning(f'Uživatel {current_user.id} se pokusil přistoupit k farmě {farm_id}, která mu nepatří')
-            return jsonify({
-                'error': 'Nemáte přístup k této farmě'
-            }), 403
+        try:
+            fields, filters = _product_query_args()
+            limit = min(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError('Parametr limit musí být kladný')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        after_sku = request.args.get('after_sku')
         
-        # Načtení JSON souboru s produkty
-        json_path = os.path.join(current_app.root_path, 'data', 'farms', farm_id, f'{farm_id}.json')
-        current_app.logger.debug(f'Cesta k JSON souboru: {json_path}')
+        backend = get_catalog_backend()
+        if not backend.exists(farm_id):
+            current_app.logger.warning(f'Katalog farmy {farm_id} neexistuje')
+            return jsonify({'products': [], 'next_after_sku': None, 'total': 0, 'confirmed': 0})
+        
+        try:
+            products, next_after_sku = backend.list_page(farm_id, limit, after_sku=after_sku, **filters)
+        except KeyError:
+            return jsonify({'error': f'Produkt {after_sku} (after_sku) nenalezen'}), 400
+        
+        result = {
+            'products': [_product_to_api(p, fields) for p in products],
+            'next_after_sku': next_after_sku
+        }
+        if after_sku is None:
+            result['total'] = backend.count_products(farm_id)
+            result['confirmed'] = backend.count_products(farm_id, confirmed=True)
+        
+        current_app.logger.debug(f'Farma {farm_id}: vráceno {len(products)} produktů (after_sku={after_sku})')
+        return jsonify(result)
         
-        if not os.path.exists(json_path):
-            current_app.logger.warning(f'JSON soubor pro farmu {farm_id} neexistuje')
-            return jsonify([])
-            
-        current_app.logger.debug('Načítám JSON soubor')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            farm_data = json.load(f)
-            products = farm_data.get('products', [])
-            current_app.logger.debug(f'Načteno {len(products)} produktů z JSON souboru')
-            
-            # Transformace dat pro frontend
-            transformed_products = []
-            current_app.logger.info(f'Začínám transformaci {len(products)} produktů')
-            
-            for i, product in enumerate(products):
-                current_app.logger.info(f'Zpracovávám produkt {i+1}/{len(products)}:')
-                current_app.logger.info(f'Produkt: {product}')
-                
-                # Přeskočení hlavičkového řádku (detekce podle hodnot)
-                is_header = all([
-                    product.get('Category') == 'category',
-                    product.get('Shop SKU') == 'shop_sku',
-                    product.get('Name') == 'name',
-                    product.get('Description') == 'description',
-                    product.get('Short Description') == 'short_description',
-                    product.get('Weight') == 'weight'
-                ])
-                
-                if is_header:
-                    current_app.logger.info('Detekován hlavičkový řádek, přeskakuji')
-                    continue
-                
-                current_app.logger.info(f'Transformuji produkt: {product.get("Shop SKU")} - {product.get("Name")}')
-                transformed_product = {
-                    'sku': product.get('Shop SKU', ''),
-                    'name': product.get('Name', ''),
-                    'short_description': product.get('Short Description', ''),
-                    'long_description': product.get('Description', ''),
-                    'image_path': product.get('mirakl_image_1', ''),
-                    'is_confirmed': False,
-                    'metadata': {
-                        'allergens': product.get('Farm allergens', ''),
-                        'ingredients': product.get('Farm ingredients', ''),
-                        'weight': product.get('Weight', ''),
-                        'category': product.get('Category', '')
-                    }
-                }
-                current_app.logger.info(f'Transformovaný produkt: {transformed_product}')
-                transformed_products.append(transformed_product)
-                current_app.logger.info(f'Produkt {i+1} úspěšně zpracován')
-            
-            current_app.logger.info(f'Úspěšně načteno a transformováno {len(transformed_products)} produktů pro farmu {farm_id}')
-            return jsonify(transformed_products)
-            
     except Exception as e:
         current_app.logger.error(f'Chyba při načítání produktů pro farmu {farm_id}: {str(e)}', exc_info=True)
         return jsonify({
             'error': 'Při načítání produktů došlo k chybě'
         }), 500
 
+@products_bp.route('/api/farms/<farm_id>/products.ndjson', methods=['GET'])
+@login_required
+def stream_farm_products(farm_id):
+    """Streamování všech produktů farmy jako NDJSON (jeden produkt na řádek)"""
+    denied = _check_farm_access(farm_id)
+    if denied:
+        return denied
+    
+    try:
+        fields, filters = _product_query_args()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    backend = get_catalog_backend()
+    if not backend.exists(farm_id):
+        return jsonify({'error': f'Katalog farmy {farm_id} neexistuje'}), 404
+    
+    def generate():
+        for product in backend.iter_products(farm_id, **filters):
+            yield json.dumps(_product_to_api(product, fields), ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def _emit_bulk_event(event, payload):
+    """Průběh hromadné úlohy posíláme jen klientům připojeným k dané farmě"""
+    socketio.emit(event, payload, to=f"farm:{payload['farm_id']}")
+
+@socketio.on('join_farm')
+def join_farm(data):
+    """Přihlášení Socket.IO klienta k odběru průběhu generování farmy"""
+    farm_id = (data or {}).get('farm_id')
+    if not farm_id or not current_user.is_authenticated:
+        return {'error': 'Nepřihlášený uživatel nebo chybí ID farmy'}
+    farm = Farm.query.filter_by(farm_id=farm_id).first()
+    if farm is None or farm.user_id != current_user.id:
+        return {'error': 'Nemáte přístup k této farmě'}
+    join_room(f'farm:{farm_id}')
+    return {'joined': farm_id, 'job': bulk_generation.status(farm_id)}
+
+@socketio.on('generate_long_stream')
+def generate_long_stream(data):
+    """
+    Streamované generování dlouhého popisu produktu.
+
+    Klient pošle {farm_id, sku, stream_id[, regenerate]}; kousky textu chodí
+    do místnosti generation:<stream_id> jako 'long_description_delta',
+    hotový (uložený) popis jako 'long_description_done'.
+    """
+    data = data or {}
+    farm_id, sku, stream_id = data.get('farm_id'), data.get('sku'), data.get('stream_id')
+    if not farm_id or not sku or not stream_id:
+        return {'error': 'Chybí ID farmy, SKU nebo ID streamu'}
+    if not current_user.is_authenticated:
+        return {'error': 'Nepřihlášený uživatel'}
+    farm = Farm.query.filter_by(farm_id=farm_id).first()
+    if farm is None or farm.user_id != current_user.id:
+        return {'error': 'Nemáte přístup k této farmě'}
+    
+    room = f'generation:{stream_id}'
+    join_room(room)
+    socketio.start_background_task(_stream_long_description, current_app._get_current_object(),
+                                   room, stream_id, farm_id, sku, bool(data.get('regenerate')))
+    return {'started': stream_id}
+
+def _stream_long_description(app, room, stream_id, farm_id, sku, bypass_cache):
+    with app.app_context():
+        try:
+            def on_piece(paragraph, text):
+                socketio.emit('long_description_delta', {'stream_id': stream_id, 'paragraph': paragraph, 'text': text},
+                              to=room)
+            
+            long_description = product_manager.stream_long_description(farm_id, sku, on_piece, bypass_cache)
+            socketio.emit('long_description_done', {'stream_id': stream_id, 'long_description': long_description},
+                          to=room)
+        except Exception as e:
+            app.logger.error(f'Chyba při streamování popisu {sku} farmy {farm_id}: {str(e)}', exc_info=True)
+            socketio.emit('long_description_error', {'stream_id': stream_id, 'error': str(e)}, to=room)
+        finally:
+            socketio.close_room(room)
+
+@products_bp.route('/api/farms/<farm_id>/generate_all', methods=['POST'])
+@login_required
+def start_bulk_generation(farm_id):
+    """
+    Spustí hromadné generování popisů všech nepotvrzených produktů farmy.
+
+    Zrušenou nebo přerušenou úlohu obnoví (zpracuje zbylé produkty).
+    Volitelně {"overwrite": true} přegeneruje i produkty, které popisy mají.
+    """
+    denied = _check_farm_access(farm_id)
+    if denied:
+        return denied
+    
+    backend = get_catalog_backend()
+    if not backend.exists(farm_id):
+        return jsonify({'error': f'Katalog farmy {farm_id} neexistuje'}), 404
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        job = bulk_generation.start(farm_id, backend, app=current_app._get_current_object(),
+                                    overwrite=bool(data.get('overwrite')), emit=_emit_bulk_event)
+    except RuntimeError as e:
+        return jsonify({'error': str(e), 'job': bulk_generation.status(farm_id)}), 409
+    
+    current_app.logger.info(f'Spuštěno hromadné generování farmy {farm_id} (úloha {job.state["job_id"]})')
+    return jsonify({'job': job.to_dict()}), 202
+
+@products_bp.route('/api/farms/<farm_id>/generate_all', methods=['GET'])
+@login_required
+def bulk_generation_status(farm_id):
+    """Stav poslední hromadné úlohy farmy"""
+    denied = _check_farm_access(farm_id)
+    if denied:
+        return denied
+    return jsonify({'job': bulk_generation.status(farm_id)})
+
+@products_bp.route('/api/farms/<farm_id>/generate_all/cancel', methods=['POST'])
+@login_required
+def cancel_bulk_generation(farm_id):
+    """Zastaví běžící hromadnou úlohu farmy"""
+    denied = _check_farm_access(farm_id)
+    if denied:
+        return denied
+    if not bulk_generation.cancel(farm_id):
+        return jsonify({'error': 'Pro farmu neběží žádné hromadné generování'}), 409
+    return jsonify({'job': bulk_generation.status(farm_id)})
+
 @products_bp.route('/api/products/<sku>/regenerate', methods=['POST'])
 def regenerate_product_content(sku):
     data = request.get_json()
@@ -287,8 +444,8 @@ def regenerate_product_content(sku):
         return jsonify({'error': 'Chybí farm_id'}), 400
 
     try:
-        product_manager = ProductManager()
-        content = product_manager.generate_product_content(farm_id, sku)
+        # Regenerace vždy obchází LLM cache (jinak by vrátila stejný text)
+        content = product_manager.generate_product_content(farm_id, sku, content_type, bypass_cache=True)
         
         if content_type == 'short':
             return jsonify({'short_description': content['short_description']})
@@ -300,19 +457,46 @@ def regenerate_product_content(sku):
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f'Chyba při regeneraci obsahu: {str(e)}')
+        current_app.logger.error(f'Chyba při regeneraci obsahu: {str(e)}')
         return jsonify({'error': 'Interní chyba serveru'}), 500
 
+@products_bp.route('/api/farms/<farm_id>/audit', methods=['GET'])
+@login_required
+def audit_farm_descriptions(farm_id):
+    """
+    Audit popisů všech produktů farmy (zakázaná slova, procenta, vykřičníky, délka).
+
+    JSON se souhrnem a produkty s problémy, format=csv vrátí celý report.
+    """
+    try:
+        denied = _check_farm_access(farm_id)
+        if denied:
+            return denied
+        
+        backend = get_catalog_backend()
+        if not backend.exists(farm_id):
+            return jsonify({'error': f'Katalog farmy {farm_id} neexistuje'}), 404
+        
+        report = output_validator.audit(backend.iter_products(farm_id))
+        if request.args.get('format') == 'csv':
+            output = BytesIO()
+            report.assign(forbidden=report['forbidden'].str.join(', ')).to_csv(output, index=False, encoding='utf-8')
+            output.seek(0)
+            return send_file(output, mimetype='text/csv', as_attachment=True,
+                             download_name=f'farm_{farm_id}_audit.csv')
+        
+        issues = report[~report['ok']].drop(columns='ok')
+        return jsonify({'summary': audit_summary(report), 'issues': issues.to_dict(orient='records')})
+        
+    except Exception as e:
+        current_app.logger.error(f'Chyba při auditu popisů farmy {farm_id}: {str(e)}', exc_info=True)
+        return jsonify({'error': 'Při auditu popisů došlo k chybě'}), 500
+
 @products_bp.route('/api/farms/<farm_id>/export', methods=['GET'])
 def export_farm_data(farm_id):
     try:
-        # Načtení JSON souboru
-        json_path = os.path.join(current_app.root_path, 'data', 'farms', farm_id, f'{farm_id}.json')
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
         # Získání pouze potvrzených produktů
-        products = [p for p in data['products'] if p.get('is_confirmed', False)]
+        products = get_catalog_backend().list_products(farm_id, confirmed=True)
         
         if not products:
             return jsonify({'error': 'Žádné potvrzené produkty k exportu'}), 400
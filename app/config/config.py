@@ -10,6 +10,15 @@ class Config:
     
     # OpenAI konfigurace
     OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY')
+    OPENAI_BASE_URL = os.environ.get('OPENAI_BASE_URL')  # None = oficiální API
+    
+    # Sdílený pool HTTP spojení k OpenAI (viz app/core/openai_clients.py)
+    OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 50))
+    OPENAI_MAX_KEEPALIVE = int(os.environ.get('OPENAI_MAX_KEEPALIVE', 20))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 60))
+    OPENAI_TIMEOUT = float(os.environ.get('OPENAI_TIMEOUT', 60))
+    OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+    OPENAI_HTTP2 = os.environ.get('OPENAI_HTTP2', 'true').lower() in ['true', 'on', '1']
     
     # Nastavení uploadů
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'uploads')
@@ -19,6 +28,66 @@ class Config:
     # Nastavení dat
     DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
     
+    # Cache katalogů farem (limit podle součtu velikostí JSON souborů)
+    FARM_CATALOG_CACHE_BYTES = int(os.environ.get('FARM_CATALOG_CACHE_BYTES', 256 * 1024 * 1024))
+    
+    # Kompaktování žurnálu úprav katalogů (interval v sekundách, 0 = vypnuto)
+    CATALOG_COMPACT_INTERVAL = float(os.environ.get('CATALOG_COMPACT_INTERVAL', 60))
+    CATALOG_COMPACT_MIN_BYTES = int(os.environ.get('CATALOG_COMPACT_MIN_BYTES', 64 * 1024))
+    
+    # Úložiště katalogů farem: 'json' (soubory app/data/farms) nebo 'sql' (tabulka product)
+    CATALOG_BACKEND = os.environ.get('CATALOG_BACKEND', 'json')
+    
+    # Okno pro slučování souběžných úprav jedné farmy do jednoho zápisu (s)
+    CATALOG_COMMIT_WINDOW = float(os.environ.get('CATALOG_COMMIT_WINDOW', 0.005))
+    
+    # Platnost cache statistik dashboardu (s); zápis produktů ji zneplatní dřív
+    DASHBOARD_STATS_TTL = float(os.environ.get('DASHBOARD_STATS_TTL', 15))
+    
+    # Hromadné generování popisů: počet souběžně zpracovávaných produktů farmy
+    BULK_GENERATION_CONCURRENCY = int(os.environ.get('BULK_GENERATION_CONCURRENCY', 8))
+    
+    # Perzistentní cache odpovědí OpenAI (SQLite soubor, prázdná cesta = vypnuto)
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', os.path.join(DATA_DIR, 'llm_cache.sqlite3'))
+    LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', 30 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 100000))
+    
+    # Krátký i dlouhý popis jedním voláním OpenAI (JSON odpověď); false = dvě volání
+    COMBINED_GENERATION = os.environ.get('COMBINED_GENERATION', 'true').lower() in ['true', 'on', '1']
+
+    # Limity OpenAI účtu sdílené všemi workery (viz app/core/rate_limiter.py, 0 = bez limitu)
+    OPENAI_RPM_LIMIT = int(os.environ.get('OPENAI_RPM_LIMIT', 500))
+    OPENAI_TPM_LIMIT = int(os.environ.get('OPENAI_TPM_LIMIT', 30000))
+    OPENAI_LIMITER_PATH = os.environ.get('OPENAI_LIMITER_PATH', os.path.join(DATA_DIR, 'openai_limits.sqlite3'))
+    # Adaptivní souběžnost volání OpenAI v procesu (AIMD)
+    OPENAI_CONCURRENCY_INITIAL = int(os.environ.get('OPENAI_CONCURRENCY_INITIAL', 8))
+    OPENAI_CONCURRENCY_MAX = int(os.environ.get('OPENAI_CONCURRENCY_MAX', 32))
+
+    # Slučování souběžných generování stejného produktu mezi workery (prázdná cesta = jen v procesu)
+    SINGLE_FLIGHT_PATH = os.environ.get('SINGLE_FLIGHT_PATH', os.path.join(DATA_DIR, 'single_flight.sqlite3'))
+    SINGLE_FLIGHT_LEASE = float(os.environ.get('SINGLE_FLIGHT_LEASE', 300))
+
+    # Překlady názvů produktů do angličtiny (SQLite sdílené mezi workery, prázdná cesta = jen paměť procesu)
+    TRANSLATION_STORE_PATH = os.environ.get('TRANSLATION_STORE_PATH', os.path.join(DATA_DIR, 'translations.sqlite3'))
+    TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', 200))  # názvů v jednom volání OpenAI
+
+    # Časový rozpočet generování včetně opakování (s): interaktivní požadavek / produkt v hromadné úloze
+    GENERATION_DEADLINE = float(os.environ.get('GENERATION_DEADLINE', 20))
+    BULK_GENERATION_DEADLINE = float(os.environ.get('BULK_GENERATION_DEADLINE', 180))
+    GENERATION_RETRY_ATTEMPTS = int(os.environ.get('GENERATION_RETRY_ATTEMPTS', 3))
+    GENERATION_RETRY_BASE = float(os.environ.get('GENERATION_RETRY_BASE', 0.5))  # s, roste 2^pokus
+    GENERATION_RETRY_CAP = float(os.environ.get('GENERATION_RETRY_CAP', 8))
+    GENERATION_MIN_ATTEMPT = float(os.environ.get('GENERATION_MIN_ATTEMPT', 2))  # kratší zbytek = rovnou fallback
+
+    # Předgenerování popisů do LLM cache po nahrání katalogu (denní rozpočet volání na farmu)
+    PREGENERATION_ENABLED = os.environ.get('PREGENERATION_ENABLED', 'true').lower() in ['true', 'on', '1']
+    PREGENERATION_FARM_BUDGET = int(os.environ.get('PREGENERATION_FARM_BUDGET', 300))
+    PREGENERATION_QUIET = float(os.environ.get('PREGENERATION_QUIET', 1.0))  # s klidu po interaktivním generování
+
+    # Log událostí telemetrie generování (JSON řádky, prázdná cesta = jen souhrny v paměti)
+    TELEMETRY_LOG_PATH = os.environ.get('TELEMETRY_LOG_PATH', os.path.join(DATA_DIR, 'telemetry', 'generation.jsonl'))
+    TELEMETRY_LOG_MAX_BYTES = int(os.environ.get('TELEMETRY_LOG_MAX_BYTES', 50 * 1024 * 1024))
+
     # Email konfigurace
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -0,0 +1,330 @@
+import os
+import json
+import uuid
+import shutil
+import logging
+import tempfile
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from app.config.config import Config
+from app.core.catalog_backends import CatalogBackend
+from app.core.bulk_generation import generation_data, group_products, needs_generation
+from app.core.openai_clients import openai_clients
+from app.generators.text_generator import TextGenerator
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = '/v1/chat/completions'
+
+# Stavy běhu: prepared -> submitted -> downloaded -> ingesting -> completed (nebo failed)
+ACTIVE_STATES = ('prepared', 'submitted', 'downloaded', 'ingesting')
+# Koncové stavy dávky na straně Batch API, kdy výsledky nebudou
+BATCH_FAILED_STATES = ('failed', 'expired', 'cancelled')
+
+
+def _write_atomic(path: str, write: Callable) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.batch.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class BatchTransport:
+    """Odeslání dávky (JSONL soubor požadavků) ke zpracování a stažení výsledků"""
+
+    def submit(self, input_path: str, metadata: Dict) -> str:
+        """Odešle dávku, vrací její ID"""
+        raise NotImplementedError
+
+    def status(self, batch_id: str) -> Dict:
+        """Stav dávky; klíč 'status' má hodnoty Batch API (in_progress, completed, failed, ...)"""
+        raise NotImplementedError
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        """Uloží výsledky dokončené dávky do JSONL souboru"""
+        raise NotImplementedError
+
+
+class OpenAIBatchTransport(BatchTransport):
+    """
+    OpenAI Batch API (zpracování do 24 hodin za poloviční cenu, mimo běžné
+    rate limity). Batch API je volané přímo přes HTTP metody klienta -
+    připnutá verze SDK pro něj nemá vlastní resource.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or openai_clients.client()
+
+    def submit(self, input_path: str, metadata: Dict) -> str:
+        with open(input_path, 'rb') as f:
+            uploaded = self.client.files.create(file=f, purpose='batch')
+        batch = self.client.post('/batches', cast_to=dict, body={
+            'input_file_id': uploaded.id,
+            'endpoint': BATCH_ENDPOINT,
+            'completion_window': '24h',
+            'metadata': metadata
+        })
+        return batch['id']
+
+    def status(self, batch_id: str) -> Dict:
+        batch = self.client.get(f'/batches/{batch_id}', cast_to=dict)
+        return {'status': batch['status'], 'request_counts': batch.get('request_counts'),
+                'output_file_id': batch.get('output_file_id'), 'errors': batch.get('errors')}
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        output_file_id = self.status(batch_id)['output_file_id']
+        if not output_file_id:
+            raise ValueError(f'Dávka {batch_id} nemá výstupní soubor')
+        tmp_path = f'{output_path}.part'
+        self.client.files.content(output_file_id).write_to_file(tmp_path)
+        os.replace(tmp_path, output_path)
+
+
+class LocalBatchTransport(BatchTransport):
+    """
+    Lokální náhrada Batch API pro testy a vývoj.
+
+    Dávku zpracuje hned při odeslání: každý požadavek předá funkci
+    responder(body) -> obsah odpovědi a výsledky zapíše ve formátu
+    výstupního souboru Batch API. Výjimka responderu = chybový výsledek.
+    """
+
+    def __init__(self, responder: Callable[[Dict], str], work_dir: str):
+        self.responder = responder
+        self.work_dir = work_dir
+
+    def submit(self, input_path: str, metadata: Dict) -> str:
+        batch_id = f'batch_local_{uuid.uuid4().hex[:12]}'
+        with open(input_path, 'r', encoding='utf-8') as src:
+            lines = [json.loads(line) for line in src if line.strip()]
+
+        def write(f):
+            for n, line in enumerate(lines):
+                try:
+                    content = self.responder(line['body'])
+                    response = {'status_code': 200, 'body': {
+                        'id': f'chatcmpl-{n}', 'object': 'chat.completion', 'model': line['body'].get('model'),
+                        'choices': [{'index': 0, 'finish_reason': 'stop',
+                                     'message': {'role': 'assistant', 'content': content}}]
+                    }}
+                except Exception as e:
+                    response = {'status_code': 500, 'body': {'error': {'message': str(e)}}}
+                f.write(json.dumps({'id': f'batch_req_{n}', 'custom_id': line['custom_id'],
+                                    'response': response, 'error': None}, ensure_ascii=False) + '\n')
+
+        _write_atomic(self._output_path(batch_id), write)
+        return batch_id
+
+    def status(self, batch_id: str) -> Dict:
+        return {'status': 'completed' if os.path.exists(self._output_path(batch_id)) else 'failed'}
+
+    def download(self, batch_id: str, output_path: str) -> None:
+        shutil.copyfile(self._output_path(batch_id), output_path)
+
+    def _output_path(self, batch_id: str) -> str:
+        return os.path.join(self.work_dir, f'{batch_id}.output.jsonl')
+
+
+class BatchGenerationManager:
+    """
+    Noční generování popisů celé farmy přes Batch API.
+
+    Běh farmy prochází kroky prepare (zápis promptů do JSONL), submit,
+    poll + download a ingest (hromadný zápis výsledků do katalogu). Stav
+    běhu je v souboru <farm_id>.batch.json a ukládá se po každém kroku
+    i po každém importovaném bloku výsledků - po pádu se pokračuje tam,
+    kde běh skončil, bez nového odesílání dávky.
+    """
+
+    def __init__(self, batches_dir: str = None, transport_factory: Callable[[], BatchTransport] = OpenAIBatchTransport,
+                 generator_factory: Callable[[], TextGenerator] = TextGenerator, ingest_chunk: int = 200):
+        self.batches_dir = batches_dir or os.path.join(Config.DATA_DIR, 'batches')
+        self.transport_factory = transport_factory
+        self.generator_factory = generator_factory
+        self.ingest_chunk = ingest_chunk
+
+    def state_path(self, farm_id: str) -> str:
+        return os.path.join(self.batches_dir, f'{farm_id}.batch.json')
+
+    def state(self, farm_id: str) -> Optional[Dict]:
+        """Stav posledního běhu farmy; None pokud žádný nebyl"""
+        try:
+            with open(self.state_path(farm_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def prepare(self, farm_id: str, backend: CatalogBackend, overwrite: bool = False) -> Dict:
+        """
+        Zapíše kombinované požadavky (krátký + dlouhý popis) všech produktů
+        k vygenerování do vstupního JSONL souboru dávky - jeden požadavek
+        na skupinu variant se stejným promptem.
+
+        Raises:
+            RuntimeError: Pokud farma už má rozpracovaný běh
+        """
+        previous = self.state(farm_id)
+        if previous is not None and previous['status'] in ACTIVE_STATES:
+            raise RuntimeError(f"Dávkové generování farmy {farm_id} už probíhá ({previous['status']})")
+
+        generator = self.generator_factory()
+        farm_data = backend.farm_info(farm_id)
+        run_id = uuid.uuid4().hex[:12]
+        input_path = os.path.join(self.batches_dir, f'{farm_id}.{run_id}.input.jsonl')
+        products = [p for p in backend.iter_products(farm_id, confirmed=False) if needs_generation(p, overwrite)]
+        # Jeden požadavek na skupinu variant se stejným promptem, výsledek dostanou všechny
+        groups = group_products(products, farm_data, farm_id)
+
+        def write(f):
+            for group in groups:
+                prompt = generator._build_combined_prompt(generation_data(group[0], farm_data, farm_id))
+                f.write(json.dumps({'custom_id': group[0]['Shop SKU'], 'method': 'POST', 'url': BATCH_ENDPOINT,
+                                    'body': generator._chat_request(prompt, 1200, json_mode=True)},
+                                   ensure_ascii=False) + '\n')
+
+        _write_atomic(input_path, write)
+        now = datetime.utcnow().isoformat()
+        state = {
+            'run_id': run_id,
+            'farm_id': farm_id,
+            'status': 'prepared',
+            'overwrite': overwrite,
+            'input_path': input_path,
+            'output_path': os.path.join(self.batches_dir, f'{farm_id}.{run_id}.output.jsonl'),
+            'batch_id': None,
+            'total': len(products),
+            'requests': len(groups),
+            'api_calls_saved': len(products) - len(groups),
+            # Ostatní SKU skupiny podle custom_id požadavku
+            'variants': {group[0]['Shop SKU']: [p['Shop SKU'] for p in group[1:]] for group in groups if len(group) > 1},
+            'ingested_lines': 0,
+            'done': 0,
+            'skipped': 0,
+            'failed': {},
+            'created_at': now,
+            'updated_at': now,
+            'finished_at': None
+        }
+        if not groups:
+            state.update(status='completed', finished_at=now)
+        self._save(state)
+        logger.info(f'Dávka farmy {farm_id} připravena: {len(groups)} požadavků pro {len(products)} produktů ({input_path})')
+        return state
+
+    def advance(self, farm_id: str, backend: CatalogBackend, transport: BatchTransport = None) -> Optional[Dict]:
+        """
+        Posune rozpracovaný běh farmy co nejdál: odešle připravenou dávku,
+        zjistí stav odeslané, stáhne výsledky a naimportuje je. Vrací stav
+        běhu (status 'submitted' = dávka se ještě zpracovává).
+        """
+        state = self.state(farm_id)
+        if state is None or state['status'] not in ACTIVE_STATES:
+            return state
+        transport = transport or self.transport_factory()
+
+        if state['status'] == 'prepared':
+            state['batch_id'] = transport.submit(state['input_path'], {'farm_id': farm_id, 'run_id': state['run_id']})
+            state['status'] = 'submitted'
+            self._save(state)
+            logger.info(f"Dávka farmy {farm_id} odeslána jako {state['batch_id']}")
+
+        if state['status'] == 'submitted':
+            batch = transport.status(state['batch_id'])
+            state['batch_status'] = batch['status']
+            if batch['status'] in BATCH_FAILED_STATES:
+                self._finish(state, 'failed', error=f"Dávka {state['batch_id']} skončila ve stavu {batch['status']}")
+                return state
+            if batch['status'] != 'completed':
+                self._save(state)
+                return state
+            transport.download(state['batch_id'], state['output_path'])
+            state['status'] = 'downloaded'
+            self._save(state)
+
+        self._ingest(state, backend)
+        return state
+
+    def _ingest(self, state: Dict, backend: CatalogBackend) -> None:
+        """Hromadný zápis výsledků po blocích; po každém bloku se uloží pozice ve výstupním souboru"""
+        farm_id = state['farm_id']
+        state['status'] = 'ingesting'
+        generator = self.generator_factory()
+        # Produkty potvrzené mezi odesláním a importem se nepřepisují
+        confirmed = {p['Shop SKU'] for p in backend.iter_products(farm_id, confirmed=True)}
+
+        for lines in self._chunks(state['output_path'], state['ingested_lines']):
+            edits = []
+            for line in lines:
+                custom_id, result, error = self._parse_line(generator, line)
+                for sku in [custom_id] + state.get('variants', {}).get(custom_id, []):
+                    if error:
+                        state['failed'][sku] = error
+                    elif sku in confirmed:
+                        state['skipped'] += 1
+                    else:
+                        edits.append((sku, {'Short Description': result['short_description'],
+                                            'Description': result['long_description']}))
+            for ack in backend.update_products(farm_id, edits) if edits else []:
+                if ack.found:
+                    state['done'] += 1
+                else:
+                    state['failed'][ack.sku] = 'Produkt mezitím zmizel z katalogu'
+            state['ingested_lines'] += len(lines)
+            self._save(state)
+
+        self._finish(state, 'completed')
+        logger.info(f"Dávka farmy {farm_id} naimportována: {state['done']} produktů, "
+                    f"{len(state['failed'])} chyb, {state['skipped']} přeskočeno")
+
+    def _chunks(self, path: str, skip: int) -> Iterator[List[str]]:
+        with open(path, 'r', encoding='utf-8') as f:
+            lines = []
+            for n, line in enumerate(f):
+                if n < skip:
+                    continue
+                lines.append(line)
+                if len(lines) >= self.ingest_chunk:
+                    yield lines
+                    lines = []
+            if lines:
+                yield lines
+
+    def _parse_line(self, generator: TextGenerator, line: str) -> Tuple[str, Optional[Dict], Optional[str]]:
+        """Řádek výstupu Batch API -> (sku, popisy, chyba)"""
+        data = json.loads(line)
+        sku = data.get('custom_id')
+        response = data.get('response') or {}
+        if data.get('error') or response.get('status_code') != 200:
+            error = data.get('error') or response.get('body', {}).get('error') or {}
+            return sku, None, error.get('message') or f"HTTP {response.get('status_code')}"
+        try:
+            content = response['body']['choices'][0]['message']['content']
+        except (KeyError, IndexError, TypeError):
+            return sku, None, 'Odpověď bez obsahu'
+        result = generator._parse_combined(content or '')
+        if result is None:
+            return sku, None, 'Neplatná JSON odpověď'
+        return sku, result, None
+
+    def _finish(self, state: Dict, status: str, error: str = None) -> None:
+        state['status'] = status
+        state['finished_at'] = datetime.utcnow().isoformat()
+        if error:
+            state['error'] = error
+            logger.error(f"Dávkové generování farmy {state['farm_id']} selhalo: {error}")
+        self._save(state)
+
+    def _save(self, state: Dict) -> None:
+        state['updated_at'] = datetime.utcnow().isoformat()
+        _write_atomic(self.state_path(state['farm_id']), lambda f: json.dump(state, f))
+
+
+batch_generation = BatchGenerationManager()
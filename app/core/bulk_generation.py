@@ -0,0 +1,329 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import tempfile
+import threading
+from contextlib import nullcontext
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from app.config.config import Config
+from app.core.catalog_backends import CatalogBackend
+from app.core.product_name_processor import ProductNameProcessor
+from app.core.telemetry import telemetry
+from app.generators.text_generator import AsyncTextGenerator
+
+logger = logging.getLogger(__name__)
+
+# Stavy, ze kterých lze úlohu znovu spustit (pokračuje se zbylými produkty)
+RESUMABLE_STATES = ('cancelled', 'interrupted', 'failed')
+
+
+def generation_data(product: Dict, farm_data: Dict, farm_id: str) -> Dict:
+    """Vstupní data pro generátor popisů z řádku katalogu a údajů o farmě"""
+    return {
+        'name': product.get('Name', ''),
+        'ingredients': product.get('Farm ingredients', ''),
+        'farm_description': farm_data.get('description', 'Rodinná farma s tradicí.'),
+        'farm_name': farm_data.get('name', farm_id)
+    }
+
+
+def generation_key(data: Dict, name_processor: ProductNameProcessor) -> Tuple[str, str, str, str]:
+    """
+    Klíč, podle kterého se produkty se stejným promptem generují jen jednou.
+
+    Varianty lišící se hmotností nebo balením mají po zjednodušení názvu
+    (simplify_product_name odstraní i hmotnost) stejný prompt.
+    """
+    return (
+        name_processor.simplify_product_name(data['name']),
+        ' '.join(str(data['ingredients'] or '').lower().split()),
+        ' '.join(data['farm_description'].split()),
+        data['farm_name']
+    )
+
+
+def group_products(products: List[Dict], farm_data: Dict, farm_id: str) -> List[List[Dict]]:
+    """Seskupí produkty se stejným klíčem generování (zachová pořadí prvních výskytů)"""
+    name_processor = ProductNameProcessor()
+    groups = {}
+    for product in products:
+        key = generation_key(generation_data(product, farm_data, farm_id), name_processor)
+        groups.setdefault(key, []).append(product)
+    return list(groups.values())
+
+
+def needs_generation(product: Dict, overwrite: bool = False) -> bool:
+    """Zda má hromadná úloha produkt zpracovat (nepotvrzený, bez obou popisů)"""
+    if product.get('is_confirmed'):
+        return False
+    return overwrite or not (product.get('Short Description') and product.get('Description'))
+
+
+def public_state(state: Dict) -> Dict:
+    """Stav úlohy pro API a Socket.IO - počet chyb a jejich SKU, bez seznamu hotových SKU"""
+    failed = state.get('failed', {})
+    public = {key: value for key, value in state.items() if key != 'processed'}
+    return {**public, 'failed': len(failed), 'failed_skus': sorted(failed)}
+
+
+class BulkGenerationJob:
+    """
+    Hromadné generování popisů všech nepotvrzených produktů jedné farmy.
+
+    Běží ve vlastním vlákně s asyncio smyčkou; souběžných generování je
+    nejvýše `concurrency`. Produkty se stejným klíčem generování (varianty
+    jednoho produktu) se generují jednou a výsledek dostanou všechny.
+    Výsledek se hned zapíše do katalogu, průběh se posílá přes emit()
+    a stav úlohy se průběžně ukládá do souboru <farm_id>.generation.json.
+
+    Zrušená nebo přerušená úloha (restart serveru) jde spustit znovu -
+    zpracuje se jen zbytek. Hotové SKU se ukládají do stavu (processed),
+    takže ani přegenerování (overwrite) je při obnovení nezpracuje znovu.
+    """
+
+    def __init__(self, farm_id: str, backend: CatalogBackend, state_path: str, concurrency: int = None,
+                 overwrite: bool = False, emit: Callable[[str, Dict], None] = None,
+                 generator_factory: Callable = AsyncTextGenerator, app=None, previous: Optional[Dict] = None):
+        self.farm_id = farm_id
+        self.backend = backend
+        self.state_path = state_path
+        self.concurrency = max(1, concurrency or Config.BULK_GENERATION_CONCURRENCY)
+        self.overwrite = overwrite
+        self.emit = emit or (lambda event, payload: None)
+        self.generator_factory = generator_factory
+        self.app = app
+        self._cancel = threading.Event()
+        self._last_save = 0.0
+
+        now = datetime.utcnow().isoformat()
+        self.state = {
+            'job_id': uuid.uuid4().hex,
+            'farm_id': farm_id,
+            'status': 'pending',
+            'total': 0,
+            'done': 0,
+            'failed': {},
+            'processed': [],
+            'groups': 0,
+            'api_calls_saved': 0,
+            'concurrency': self.concurrency,
+            'overwrite': overwrite,
+            'started_at': now,
+            'updated_at': now,
+            'finished_at': None,
+            'resumed': 0
+        }
+        if previous:
+            # Pokračování předchozí úlohy - zachováme identitu a počítadla
+            self.state.update(job_id=previous['job_id'], done=previous.get('done', 0),
+                              processed=list(previous.get('processed', [])),
+                              started_at=previous.get('started_at', now), resumed=previous.get('resumed', 0) + 1)
+
+    @property
+    def running(self) -> bool:
+        return self.state['status'] in ('pending', 'running')
+
+    def cancel(self) -> None:
+        """Zastaví úlohu - rozpracované produkty se dokončí, další se nezačnou"""
+        self._cancel.set()
+
+    def run(self) -> Dict:
+        """Spustí úlohu (blokuje do dokončení) a vrátí její konečný stav"""
+        try:
+            asyncio.run(self._run())
+        except Exception as e:
+            logger.error(f'Hromadné generování farmy {self.farm_id} selhalo: {str(e)}', exc_info=True)
+            self._finish('failed', error=str(e))
+        return self.state
+
+    def candidates(self) -> List[Dict]:
+        processed = set(self.state['processed'])
+        with self._app_context():
+            return [p for p in self.backend.iter_products(self.farm_id, confirmed=False)
+                    if p.get('Shop SKU') not in processed and needs_generation(p, self.overwrite)]
+
+    async def _run(self) -> None:
+        with self._app_context():
+            farm_data = self.backend.farm_info(self.farm_id)
+        products = await asyncio.to_thread(self.candidates)
+        # Varianty se stejným promptem (jiná hmotnost/balení) se generují jednou
+        groups = group_products(products, farm_data, self.farm_id)
+        calls_per_generation = 1 if Config.COMBINED_GENERATION else 2
+        self.state['failed'] = {}
+        self.state['total'] = self.state['done'] + len(products)
+        self.state.update(groups=len(groups), api_calls_saved=(len(products) - len(groups)) * calls_per_generation)
+        self._set_status('running')
+        logger.info(f'Hromadné generování farmy {self.farm_id}: {len(products)} produktů v {len(groups)} skupinách '
+                    f"(ušetřeno {self.state['api_calls_saved']} volání API), souběžnost {self.concurrency}")
+
+        generator = self.generator_factory()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def process(group: List[Dict]) -> None:
+            async with semaphore:
+                if self._cancel.is_set():
+                    return
+                await self._process(generator, group, farm_data)
+
+        try:
+            await asyncio.gather(*(process(group) for group in groups))
+        finally:
+            if hasattr(generator, 'aclose'):
+                await generator.aclose()
+
+        self._finish('cancelled' if self._cancel.is_set() else 'completed')
+
+    async def _process(self, generator, group: List[Dict], farm_data: Dict) -> None:
+        skus = [product.get('Shop SKU') for product in group]
+        try:
+            # Přegenerování (overwrite) nesmí vrátit stejné texty z LLM cache
+            with telemetry.context(farm_id=self.farm_id, sku=skus[0], endpoint='bulk_generation'):
+                result = await generator.generate_descriptions(generation_data(group[0], farm_data, self.farm_id),
+                                                               bypass_cache=self.overwrite)
+            missing = await asyncio.to_thread(self._persist, skus, result)
+        except Exception as e:
+            logger.warning(f"Generování produktů {', '.join(skus)} farmy {self.farm_id} selhalo: {str(e)}")
+            for sku in skus:
+                self.state['failed'][sku] = str(e)
+                self._emit_product(sku, 'failed', error=str(e))
+        else:
+            for sku in skus:
+                if sku in missing:
+                    self.state['failed'][sku] = 'Produkt mezitím zmizel z katalogu'
+                    self._emit_product(sku, 'failed', error=self.state['failed'][sku])
+                else:
+                    self.state['done'] += 1
+                    self.state['processed'].append(sku)
+                    self._emit_product(sku, 'done', **result)
+        self._save_state()
+
+    def _persist(self, skus: List[str], result: Dict) -> List[str]:
+        """Zapíše popisy všem produktům skupiny; vrací SKU, které v katalogu už nejsou"""
+        fields = {'Short Description': result['short_description'], 'Description': result['long_description']}
+        with self._app_context():
+            acks = self.backend.update_products(self.farm_id, [(sku, fields) for sku in skus])
+        return [ack.sku for ack in acks if not ack.found]
+
+    def _emit_product(self, sku: str, status: str, **extra) -> None:
+        self.emit('bulk_product', {'farm_id': self.farm_id, 'sku': sku, 'status': status, **extra,
+                                   **self._progress()})
+
+    def _progress(self) -> Dict:
+        return {'done': self.state['done'], 'failed': len(self.state['failed']), 'total': self.state['total'],
+                'api_calls_saved': self.state['api_calls_saved']}
+
+    def _set_status(self, status: str) -> None:
+        self.state['status'] = status
+        self._save_state(force=True)
+        self.emit('bulk_status', self.to_dict())
+
+    def _finish(self, status: str, error: str = None) -> None:
+        self.state['finished_at'] = datetime.utcnow().isoformat()
+        if error:
+            self.state['error'] = error
+        self._set_status(status)
+        logger.info(f'Hromadné generování farmy {self.farm_id} skončilo ({status}): {self._progress()}')
+
+    def _save_state(self, force: bool = False) -> None:
+        """Uloží stav úlohy (atomicky, nejvýše jednou za sekundu mimo změny stavu)"""
+        now = time.monotonic()
+        if not force and now - self._last_save < 1.0:
+            return
+        self._last_save = now
+        self.state['updated_at'] = datetime.utcnow().isoformat()
+        try:
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.state_path), prefix=f'.{self.farm_id}.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_path, self.state_path)
+        except OSError as e:
+            logger.warning(f'Nepodařilo se uložit stav úlohy {self.state_path}: {str(e)}')
+
+    def _app_context(self):
+        # SQL úložiště potřebuje aplikační kontext i ve vláknech úlohy
+        return self.app.app_context() if self.app is not None else nullcontext()
+
+    def to_dict(self) -> Dict:
+        failed = dict(self.state['failed'])  # kopie - úloha stav mění ve svém vlákně
+        return public_state({**self.state, 'failed': failed})
+
+
+class BulkGenerationManager:
+    """
+    Evidence hromadných úloh - nejvýše jedna běžící úloha na farmu.
+
+    Úloha běží v procesu, který ji spustil; ostatní procesy vidí jen její
+    uložený stav. Stav 'running' bez živé úlohy se hlásí jako 'interrupted'.
+    """
+
+    def __init__(self, jobs_dir: str = None):
+        self.jobs_dir = jobs_dir or os.path.join(Config.DATA_DIR, 'jobs')
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def state_path(self, farm_id: str) -> str:
+        return os.path.join(self.jobs_dir, f'{farm_id}.generation.json')
+
+    def start(self, farm_id: str, backend: CatalogBackend, app=None, overwrite: bool = False,
+              concurrency: int = None, emit: Callable = None, generator_factory: Callable = AsyncTextGenerator,
+              wait: bool = False) -> BulkGenerationJob:
+        """
+        Spustí (nebo obnoví) hromadné generování farmy ve vlákně na pozadí.
+
+        Raises:
+            RuntimeError: Pokud pro farmu už úloha běží
+        """
+        with self._lock:
+            job = self._jobs.get(farm_id)
+            if job is not None and job.running:
+                raise RuntimeError(f'Hromadné generování farmy {farm_id} už běží')
+
+            previous = self._stored_state(farm_id)
+            if previous is None or previous['status'] not in RESUMABLE_STATES:
+                previous = None
+            job = BulkGenerationJob(farm_id, backend, self.state_path(farm_id), concurrency=concurrency,
+                                    overwrite=overwrite, emit=emit, generator_factory=generator_factory,
+                                    app=app, previous=previous)
+            self._jobs[farm_id] = job
+
+        thread = threading.Thread(target=job.run, name=f'bulk-generation-{farm_id}', daemon=True)
+        thread.start()
+        if wait:
+            thread.join()
+        return job
+
+    def cancel(self, farm_id: str) -> bool:
+        """Požádá běžící úlohu farmy o zastavení; False pokud žádná neběží"""
+        job = self._jobs.get(farm_id)
+        if job is None or not job.running:
+            return False
+        job.cancel()
+        return True
+
+    def status(self, farm_id: str) -> Optional[Dict]:
+        """Stav poslední úlohy farmy (živé nebo uložené); None pokud žádná nebyla"""
+        job = self._jobs.get(farm_id)
+        if job is not None:
+            return job.to_dict()
+        state = self._stored_state(farm_id)
+        if state is None:
+            return None
+        return public_state(state)
+
+    def _stored_state(self, farm_id: str) -> Optional[Dict]:
+        try:
+            with open(self.state_path(farm_id), 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if state.get('status') in ('pending', 'running') and farm_id not in self._jobs:
+            state['status'] = 'interrupted'
+        return state
+
+
+bulk_generation = BulkGenerationManager()
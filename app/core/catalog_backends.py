@@ -0,0 +1,391 @@
+import logging
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from flask import current_app, has_app_context
+from sqlalchemy import and_, case, func, insert
+from app import db
+from app.config.config import Config
+from app.core.models import Farm, Product, CATALOG_COLUMNS
+from app.core.farm_catalog import FarmCatalogStore, catalog_store, HEADER_SKU
+from app.core.catalog_writer import FarmCatalogWriter, CommitAck, catalog_writer
+from app.core.catalog_journal import JOURNALED_FIELDS
+from app.core.catalog_summary import SUMMARY_COUNTERS
+from app.core.stats_cache import stats_cache
+
+# Klíče souhrnu katalogu, které vrací CatalogBackend.summary()
+SUMMARY_KEYS = SUMMARY_COUNTERS + ('modified_at', 'version')
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogBackend:
+    """
+    Rozhraní úložiště katalogů farem.
+
+    Produkty se předávají jako řádky Mirakl katalogu (slovníky se sloupci
+    'Shop SKU', 'Name', ...), bez hlavičkového řádku šablony. Úpravy jsou
+    omezené na pole z JOURNALED_FIELDS a vrací CommitAck.
+    """
+
+    name = None
+
+    def exists(self, farm_id: str) -> bool:
+        raise NotImplementedError
+
+    def farm_info(self, farm_id: str) -> Dict:
+        """Vrátí {'farm_id', 'name', 'description'} farmy; nevyplněné name/description chybí"""
+        raise NotImplementedError
+
+    def find_product(self, farm_id: str, sku: str) -> Optional[Dict]:
+        raise NotImplementedError
+
+    def iter_products(self, farm_id: str, confirmed: Optional[bool] = None,
+                      category: Optional[str] = None) -> Iterator[Dict]:
+        """Postupně vrací produkty v pořadí katalogu (pro streamování)"""
+        raise NotImplementedError
+
+    def list_products(self, farm_id: str, confirmed: Optional[bool] = None,
+                      category: Optional[str] = None) -> List[Dict]:
+        return list(self.iter_products(farm_id, confirmed=confirmed, category=category))
+
+    def list_page(self, farm_id: str, limit: int, after_sku: Optional[str] = None,
+                  confirmed: Optional[bool] = None, category: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Vrátí stránku produktů za produktem after_sku (kurzor podle pořadí v katalogu).
+
+        Returns:
+            (produkty, SKU posledního produktu stránky nebo None, pokud už další nejsou)
+
+        Raises:
+            KeyError: Pokud produkt after_sku v katalogu není
+        """
+        raise NotImplementedError
+
+    def count_products(self, farm_id: str, confirmed: Optional[bool] = None) -> int:
+        raise NotImplementedError
+
+    def summary(self, farm_id: str) -> Dict:
+        """
+        Souhrn katalogu: počty products, confirmed, with_images, with_descriptions,
+        čas poslední změny (modified_at) a verze katalogu (version).
+        """
+        raise NotImplementedError
+
+    def farm_stats(self, user_id: Optional[int] = None) -> Dict[str, Dict]:
+        """
+        Počty produktů všech farem (nebo farem uživatele).
+
+        Returns:
+            {farm_id: {'is_active': ..., 'products': ..., 'confirmed': ...}}
+        """
+        raise NotImplementedError
+
+    def update_product(self, farm_id: str, sku: str, fields: Dict) -> CommitAck:
+        raise NotImplementedError
+
+    def update_products(self, farm_id: str, edits: List[Tuple[str, Dict]]) -> List[CommitAck]:
+        """Hromadná úprava produktů jedné farmy (jeden zápis místo zápisu na produkt)"""
+        return [self.update_product(farm_id, sku, fields) for sku, fields in edits]
+
+    def save_catalog(self, farm_id: str, data: Dict) -> None:
+        """Nahradí celý katalog farmy (data ve formátu <farm_id>.json)"""
+        raise NotImplementedError
+
+    def delete_catalog(self, farm_id: str) -> None:
+        raise NotImplementedError
+
+
+def _page(rows: Iterator[Dict], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    page = list(islice(rows, limit + 1))
+    if len(page) > limit:
+        page = page[:limit]
+        return page, page[-1]['Shop SKU']
+    return page, None
+
+
+def _matches(row: Dict, confirmed: Optional[bool], category: Optional[str]) -> bool:
+    if confirmed is not None and bool(row.get('is_confirmed', False)) != confirmed:
+        return False
+    if category is not None and row.get('Category') != category:
+        return False
+    return True
+
+
+class JsonCatalogBackend(CatalogBackend):
+    """Katalogy v JSON souborech app/data/farms/<farm_id>/<farm_id>.json"""
+
+    name = 'json'
+
+    def __init__(self, store: FarmCatalogStore, writer: FarmCatalogWriter):
+        self.store = store
+        self.writer = writer
+
+    def exists(self, farm_id: str) -> bool:
+        return self.store.exists(farm_id)
+
+    def farm_info(self, farm_id: str) -> Dict:
+        data = self.store.get(farm_id)
+        # Chybějící klíč se nedoplňuje - výchozí hodnoty řeší generation_data
+        return {'farm_id': farm_id, **{key: data[key] for key in ('name', 'description') if key in data}}
+
+    def find_product(self, farm_id: str, sku: str) -> Optional[Dict]:
+        return self.store.find_product(farm_id, sku)
+
+    def iter_products(self, farm_id: str, confirmed: Optional[bool] = None,
+                      category: Optional[str] = None, start: int = 0) -> Iterator[Dict]:
+        products = self.store.get(farm_id).get('products', [])
+        for product in islice(products, start, None):
+            if product.get('Shop SKU') != HEADER_SKU and _matches(product, confirmed, category):
+                yield product
+
+    def list_page(self, farm_id: str, limit: int, after_sku: Optional[str] = None,
+                  confirmed: Optional[bool] = None, category: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        start = 0
+        if after_sku is not None:
+            # Pozice kurzoru z indexu SKU - bez průchodu předchozími stránkami
+            position = self.store.product_position(farm_id, after_sku)
+            if position is None:
+                raise KeyError(after_sku)
+            start = position + 1
+        return _page(self.iter_products(farm_id, confirmed, category, start=start), limit)
+
+    def count_products(self, farm_id: str, confirmed: Optional[bool] = None) -> int:
+        # Počty bez načítání katalogu ze souhrnu farmy
+        summary = self.store.summary(farm_id)
+        if confirmed is None:
+            return summary['products']
+        return summary['confirmed'] if confirmed else summary['products'] - summary['confirmed']
+
+    def summary(self, farm_id: str) -> Dict:
+        summary = self.store.summary(farm_id)
+        return {key: summary[key] for key in SUMMARY_KEYS}
+
+    def farm_stats(self, user_id: Optional[int] = None) -> Dict[str, Dict]:
+        farms = db.session.query(Farm.farm_id, Farm.is_active)
+        if user_id is not None:
+            farms = farms.filter(Farm.user_id == user_id)
+
+        stats = {}
+        for farm_id, is_active in farms:
+            products = confirmed = 0
+            if self.store.exists(farm_id):
+                summary = self.store.summary(farm_id)
+                products, confirmed = summary['products'], summary['confirmed']
+            stats[farm_id] = {'is_active': bool(is_active), 'products': products, 'confirmed': confirmed}
+        return stats
+
+    def update_product(self, farm_id: str, sku: str, fields: Dict) -> CommitAck:
+        ack = self.writer.write(farm_id, sku, fields)
+        stats_cache.invalidate()
+        return ack
+
+    def update_products(self, farm_id: str, edits: List[Tuple[str, Dict]]) -> List[CommitAck]:
+        acks = self.writer.write_many(farm_id, edits)
+        stats_cache.invalidate()
+        return acks
+
+    def save_catalog(self, farm_id: str, data: Dict) -> None:
+        self.store.save(farm_id, data)
+        stats_cache.invalidate()
+
+    def delete_catalog(self, farm_id: str) -> None:
+        # Soubory maže volající spolu s adresářem farmy
+        self.store.invalidate(farm_id)
+        stats_cache.invalidate()
+
+
+class SqlCatalogBackend(CatalogBackend):
+    """
+    Katalogy v tabulce product.
+
+    Často používané sloupce katalogu jsou typované (viz CATALOG_COLUMNS),
+    ostatní Mirakl sloupce jsou v JSON sloupci mirakl_columns. Vyhledání
+    podle SKU, filtry a počty běží přes indexy (farm_id, ...) místo
+    parsování celého souboru. Vyžaduje existující záznam Farm.
+    """
+
+    name = 'sql'
+
+    def exists(self, farm_id: str) -> bool:
+        return self._farm_pk(farm_id) is not None
+
+    def farm_info(self, farm_id: str) -> Dict:
+        farm = Farm.query.filter_by(farm_id=farm_id).first()
+        if farm is None:
+            raise FileNotFoundError(f'Farma {farm_id} neexistuje')
+        info = {'farm_id': farm.farm_id, 'name': farm.name, 'description': farm.description}
+        return {key: value for key, value in info.items() if value is not None}
+
+    def find_product(self, farm_id: str, sku: str) -> Optional[Dict]:
+        product = self._product(farm_id, sku)
+        return product.to_catalog_row() if product else None
+
+    def iter_products(self, farm_id: str, confirmed: Optional[bool] = None,
+                      category: Optional[str] = None) -> Iterator[Dict]:
+        query = self._query(farm_id, confirmed, category).order_by(Product.position)
+        for product in query.yield_per(500):
+            yield product.to_catalog_row()
+
+    def list_page(self, farm_id: str, limit: int, after_sku: Optional[str] = None,
+                  confirmed: Optional[bool] = None, category: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        query = self._query(farm_id, confirmed, category)
+        if after_sku is not None:
+            position = self._query(farm_id).filter(Product.sku == after_sku).with_entities(Product.position).scalar()
+            if position is None:
+                raise KeyError(after_sku)
+            query = query.filter(Product.position > position)
+        products = query.order_by(Product.position).limit(limit + 1).all()
+        return _page((p.to_catalog_row() for p in products), limit)
+
+    def count_products(self, farm_id: str, confirmed: Optional[bool] = None) -> int:
+        return self._query(farm_id, confirmed).count()
+
+    def summary(self, farm_id: str) -> Dict:
+        has_descriptions = and_(Product.short_description != '', Product.long_description != '')
+        row = self._query(farm_id).with_entities(
+            func.count(Product.id),
+            func.sum(case((Product.is_confirmed == True, 1), else_=0)),  # noqa: E712
+            func.sum(case((Product.image_path != '', 1), else_=0)),
+            func.sum(case((has_descriptions, 1), else_=0)),
+            func.max(Product.modified_at)
+        ).one()
+        modified_at = row[4]
+        return {
+            'products': row[0],
+            'confirmed': row[1] or 0,
+            'with_images': row[2] or 0,
+            'with_descriptions': row[3] or 0,
+            'modified_at': modified_at.isoformat() if modified_at else None,
+            # Verze = čas poslední změny produktu farmy
+            'version': int(modified_at.timestamp() * 1000) if modified_at else 0
+        }
+
+    def update_product(self, farm_id: str, sku: str, fields: Dict) -> CommitAck:
+        return self.update_products(farm_id, [(sku, fields)])[0]
+
+    def update_products(self, farm_id: str, edits: List[Tuple[str, Dict]]) -> List[CommitAck]:
+        for sku, fields in edits:
+            unknown = set(fields) - JOURNALED_FIELDS
+            if unknown:
+                raise ValueError(f"Pole {', '.join(sorted(unknown))} nelze zapsat do žurnálu")
+
+        # Všechny produkty jedním dotazem a jedním commitem
+        skus = [sku for sku, _ in edits]
+        products = {product.sku: product for product in self._query(farm_id).filter(Product.sku.in_(skus))}
+        acks = []
+        try:
+            for sku, fields in edits:
+                product = products.get(sku)
+                if product is not None:
+                    self._apply(product, fields)
+                acks.append((sku, product))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats_cache.invalidate()
+        return [CommitAck(farm_id, sku, product.to_catalog_row() if product is not None else None, len(edits))
+                for sku, product in acks]
+
+    def save_catalog(self, farm_id: str, data: Dict) -> None:
+        farm_pk = self._farm_pk(farm_id)
+        if farm_pk is None:
+            raise FileNotFoundError(f'Farma {farm_id} neexistuje')
+
+        rows = []
+        seen = set()
+        for position, row in enumerate(data.get('products', [])):
+            sku = row.get('Shop SKU')
+            if not sku or sku == HEADER_SKU:
+                continue
+            if sku in seen:
+                # Stejně jako index JSON katalogu platí první výskyt SKU
+                logger.warning(f'Duplicitní SKU {sku} ve farmě {farm_id} přeskočeno')
+                continue
+            seen.add(sku)
+            # executemany vyžaduje stejné klíče ve všech řádcích
+            values = dict.fromkeys(CATALOG_COLUMNS.values())
+            values.update(Product.catalog_values(row))
+            values['name'] = values['name'] or ''
+            values['is_confirmed'] = bool(values['is_confirmed'])
+            values.update(farm_id=farm_pk, position=position)
+            rows.append(values)
+
+        try:
+            Product.query.filter_by(farm_id=farm_pk).delete()
+            if rows:
+                # Hromadný INSERT (executemany) místo jednotlivých objektů
+                db.session.execute(insert(Product), rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats_cache.invalidate()
+        logger.info(f'Katalog farmy {farm_id} uložen do databáze ({len(rows)} produktů)')
+
+    def delete_catalog(self, farm_id: str) -> None:
+        farm_pk = self._farm_pk(farm_id)
+        if farm_pk is not None:
+            Product.query.filter_by(farm_id=farm_pk).delete()
+        stats_cache.invalidate()
+
+    def farm_stats(self, user_id: Optional[int] = None) -> Dict[str, Dict]:
+        # Jeden GROUP BY přes farmu a stav potvrzení (farmy bez produktů díky LEFT JOIN)
+        query = db.session.query(
+            Farm.farm_id, Farm.is_active, Product.is_confirmed, func.count(Product.id)
+        ).outerjoin(Product, Product.farm_id == Farm.id).group_by(Farm.id, Product.is_confirmed)
+        if user_id is not None:
+            query = query.filter(Farm.user_id == user_id)
+
+        stats = {}
+        for farm_id, is_active, is_confirmed, count in query:
+            farm = stats.setdefault(farm_id, {'is_active': bool(is_active), 'products': 0, 'confirmed': 0})
+            farm['products'] += count
+            if is_confirmed:
+                farm['confirmed'] += count
+        return stats
+
+    def _farm_pk(self, farm_id: str) -> Optional[int]:
+        return db.session.query(Farm.id).filter_by(farm_id=farm_id).scalar()
+
+    def _query(self, farm_id: str, confirmed: Optional[bool] = None, category: Optional[str] = None):
+        query = Product.query.join(Farm).filter(Farm.farm_id == farm_id)
+        if confirmed is not None:
+            query = query.filter(Product.is_confirmed == confirmed)
+        if category is not None:
+            query = query.filter(Product.category == category)
+        return query
+
+    def _product(self, farm_id: str, sku: str) -> Optional[Product]:
+        return self._query(farm_id).filter(Product.sku == sku).first()
+
+    def _apply(self, product: Product, fields: Dict) -> None:
+        values = Product.catalog_values(fields)
+        extra = values.pop('mirakl_columns')
+        for column, value in values.items():
+            setattr(product, column, value)
+        # Nový slovník, aby SQLAlchemy změnu JSON sloupce zaznamenala
+        columns = dict(product.mirakl_columns or {})
+        for key, value in extra.items():
+            if key not in CATALOG_COLUMNS or key not in columns:
+                columns[key] = value
+        product.mirakl_columns = columns
+
+
+_backends = {
+    JsonCatalogBackend.name: JsonCatalogBackend(catalog_store, catalog_writer),
+    SqlCatalogBackend.name: SqlCatalogBackend()
+}
+
+
+def get_catalog_backend(name: str = None) -> CatalogBackend:
+    """Vrátí úložiště katalogů podle konfigurace CATALOG_BACKEND"""
+    if name is None:
+        if has_app_context():
+            name = current_app.config.get('CATALOG_BACKEND', Config.CATALOG_BACKEND)
+        else:
+            name = Config.CATALOG_BACKEND
+    try:
+        return _backends[name]
+    except KeyError:
+        raise ValueError(f'Neznámé úložiště katalogů: {name}')
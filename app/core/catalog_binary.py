@@ -0,0 +1,269 @@
+import os
+import json
+import mmap
+import struct
+import tempfile
+import logging
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+# Binární formát katalogu farmy (<farm_id>.catalog.bin):
+#
+#   hlavička   '<4sHII'  magic, verze, délka metadat, počet řádků
+#   metadata   JSON      údaje farmy bez products + slovník sloupců 'columns'
+#   offsety    '<I' * (počet řádků + 1)  začátky řádků v datové části
+#   řádky      '<H' počet polí, adresář polí '<HBI' * n (sloupec, typ, délka), hodnoty
+#
+# Názvy sloupců jsou uložené jen jednou ve slovníku, prázdné řetězce nemají
+# žádná data. Řádky i jednotlivá pole se dekódují až při přístupu.
+MAGIC = b'SCAT'
+VERSION = 1
+BINARY_SUFFIX = '.catalog.bin'
+
+_HEADER = struct.Struct('<4sHII')
+_OFFSET = struct.Struct('<I')
+_COUNT = struct.Struct('<H')
+_FIELD = struct.Struct('<HBI')
+_INT = struct.Struct('<q')
+_FLOAT = struct.Struct('<d')
+
+_EMPTY, _STR, _TRUE, _FALSE, _NONE, _INT_TAG, _FLOAT_TAG, _JSON = range(8)
+
+
+def _encode_value(value) -> tuple:
+    if isinstance(value, str):
+        return (_STR, value.encode('utf-8')) if value else (_EMPTY, b'')
+    if value is True:
+        return _TRUE, b''
+    if value is False:
+        return _FALSE, b''
+    if value is None:
+        return _NONE, b''
+    if isinstance(value, int) and -2 ** 63 <= value < 2 ** 63:
+        return _INT_TAG, _INT.pack(value)
+    if isinstance(value, float):
+        return _FLOAT_TAG, _FLOAT.pack(value)
+    return _JSON, json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+def _decode_value(tag: int, data: bytes):
+    if tag == _STR:
+        return data.decode('utf-8')
+    if tag == _EMPTY:
+        return ''
+    if tag == _TRUE:
+        return True
+    if tag == _FALSE:
+        return False
+    if tag == _NONE:
+        return None
+    if tag == _INT_TAG:
+        return _INT.unpack(data)[0]
+    if tag == _FLOAT_TAG:
+        return _FLOAT.unpack(data)[0]
+    return json.loads(data.decode('utf-8'))
+
+
+def encode_catalog(farm_data: Dict) -> bytes:
+    """Zakóduje katalog farmy (formát <farm_id>.json) do binárního formátu"""
+    columns = {}
+    offsets = [0]
+    chunks = []
+    position = 0
+
+    for row in farm_data.get('products', []):
+        directory = []
+        values = []
+        for key, value in row.items():
+            index = columns.setdefault(key, len(columns))
+            tag, data = _encode_value(value)
+            directory.append(_FIELD.pack(index, tag, len(data)))
+            values.append(data)
+        chunk = _COUNT.pack(len(directory)) + b''.join(directory) + b''.join(values)
+        chunks.append(chunk)
+        position += len(chunk)
+        offsets.append(position)
+
+    if len(columns) > 0xFFFF or position > 0xFFFFFFFF:
+        raise ValueError('Katalog je pro binární formát příliš velký')
+
+    meta = {key: value for key, value in farm_data.items() if key != 'products'}
+    meta['columns'] = list(columns)
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+
+    return b''.join([
+        _HEADER.pack(MAGIC, VERSION, len(meta_bytes), len(chunks)),
+        meta_bytes,
+        struct.pack(f'<{len(offsets)}I', *offsets),
+        *chunks
+    ])
+
+
+class LazyRow(Mapping):
+    """
+    Řádek binárního katalogu chovající se jako slovník.
+
+    Adresář polí se načte při prvním přístupu, hodnota pole až při jeho
+    čtení - výpis SKU a názvů tak nedekóduje nutriční ani nabídkové sloupce.
+    """
+
+    __slots__ = ('_buf', '_start', '_columns', '_fields', '_values')
+
+    def __init__(self, buf, start: int, columns: List[str]):
+        self._buf = buf
+        self._start = start
+        self._columns = columns
+        self._fields = None
+        self._values = {}
+
+    def _directory(self) -> Dict:
+        if self._fields is None:
+            count, = _COUNT.unpack_from(self._buf, self._start)
+            position = self._start + _COUNT.size
+            data_start = position + count * _FIELD.size
+            fields = {}
+            for index, tag, length in _FIELD.iter_unpack(self._buf[position:data_start]):
+                fields[self._columns[index]] = (tag, data_start, length)
+                data_start += length
+            self._fields = fields
+        return self._fields
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        tag, start, length = self._directory()[key]
+        value = _decode_value(tag, self._buf[start:start + length])
+        self._values[key] = value
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._directory())
+
+    def __len__(self) -> int:
+        return len(self._directory())
+
+    def to_dict(self) -> Dict:
+        buf = self._buf
+        values = self._values
+        row = {}
+        for key, (tag, start, length) in self._directory().items():
+            if key in values:
+                row[key] = values[key]
+            elif tag == _STR:
+                row[key] = buf[start:start + length].decode('utf-8')
+            elif tag == _EMPTY:
+                row[key] = ''
+            else:
+                row[key] = _decode_value(tag, buf[start:start + length])
+        return row
+
+    def __repr__(self):
+        return f'<LazyRow {self.get("Shop SKU")}>'
+
+
+class BinaryCatalog:
+    """
+    Katalog farmy v binárním formátu, namapovaný do paměti (mmap).
+
+    Použití:
+        with BinaryCatalog(path) as catalog:
+            names = list(catalog.column('Name'))
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, meta_len, row_count = _HEADER.unpack_from(self._buf, 0)
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path} není binární katalog (verze {VERSION})')
+            meta_start = _HEADER.size
+            self.meta = json.loads(self._buf[meta_start:meta_start + meta_len].decode('utf-8'))
+        except Exception:
+            self._buf.close()
+            raise
+        self.columns = self.meta.pop('columns')
+        self._row_count = row_count
+        self._offsets_start = meta_start + meta_len
+        self._data_start = self._offsets_start + (row_count + 1) * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self) -> None:
+        self._buf.close()
+
+    def row(self, index: int) -> LazyRow:
+        if not 0 <= index < self._row_count:
+            raise IndexError(index)
+        offset, = _OFFSET.unpack_from(self._buf, self._offsets_start + index * _OFFSET.size)
+        return LazyRow(self._buf, self._data_start + offset, self.columns)
+
+    def rows(self) -> Iterator[LazyRow]:
+        for index in range(self._row_count):
+            yield self.row(index)
+
+    def column(self, key: str, default=None) -> Iterator:
+        """Hodnoty jednoho sloupce přes všechny řádky (ostatní pole se nedekódují)"""
+        for row in self.rows():
+            yield row.get(key, default)
+
+    def to_dict(self) -> Dict:
+        """Převede katalog zpět do formátu <farm_id>.json"""
+        data = dict(self.meta)
+        data['products'] = [row.to_dict() for row in self.rows()]
+        return data
+
+
+def dump_catalog(farm_data: Dict, path: str) -> None:
+    """Atomicky zapíše katalog v binárním formátu (temp soubor + fsync + rename)"""
+    payload = encode_catalog(farm_data)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.catalog.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def is_binary_catalog(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_catalog(path: str) -> Dict:
+    """Načte katalog farmy z JSON nebo binárního souboru (podle obsahu)"""
+    if is_binary_catalog(path):
+        with BinaryCatalog(path) as catalog:
+            return catalog.to_dict()
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def convert_catalog(src: str, dst: str) -> None:
+    """Převede katalog mezi formáty; cílový formát určuje přípona dst"""
+    farm_data = load_catalog(src)
+    if dst.endswith(BINARY_SUFFIX):
+        dump_catalog(farm_data, dst)
+    else:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dst) or '.', prefix='.catalog.', suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(farm_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, dst)
+    logger.info(f'Katalog {src} převeden do {dst}')
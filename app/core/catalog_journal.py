@@ -0,0 +1,131 @@
+import os
+import json
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pole produktu, jejichž změny se zapisují do žurnálu místo přepisu celého katalogu
+JOURNALED_FIELDS = {
+    'is_confirmed',
+    'Short Description',
+    'Description',
+    'mirakl_image_1',
+    'image_path'
+}
+
+
+class CatalogJournal:
+    """
+    Append-only žurnál úprav katalogu farmy (<farm_id>.journal.jsonl).
+
+    Každý řádek je jeden JSON záznam {"sku": ..., "set": {...}, "ts": ...}.
+    Čtenáři přehrávají žurnál nad základním snapshotem <farm_id>.json,
+    kompaktor ho pak do snapshotu zapracuje a žurnál smaže. Zápis úpravy
+    tak stojí úměrně velikosti úpravy, ne velikosti katalogu.
+
+    Třída sama nezamyká - o zámky se stará FarmCatalogStore.
+    """
+
+    def __init__(self, farm_dir: str, farm_id: str):
+        self.path = os.path.join(farm_dir, f'{farm_id}.journal.jsonl')
+
+    def stat(self) -> Tuple[Optional[int], int]:
+        """Vrátí identitu žurnálu (inode, velikost); (None, 0) pokud neexistuje"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None, 0
+        return st.st_ino, st.st_size
+
+    def append(self, edits: List[Dict]) -> int:
+        """
+        Trvale připíše úpravy na konec žurnálu jedním zápisem (write + fsync).
+
+        Args:
+            edits: Seznam úprav ve tvaru {'sku': ..., 'set': {pole: hodnota}}
+
+        Returns:
+            Velikost žurnálu po zápisu
+        """
+        ts = datetime.utcnow().isoformat()
+        lines = []
+        for edit in edits:
+            unknown = set(edit['set']) - JOURNALED_FIELDS
+            if unknown:
+                raise ValueError(f"Pole {', '.join(sorted(unknown))} nelze zapsat do žurnálu")
+            record = {'sku': edit['sku'], 'set': edit['set'], 'ts': ts}
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        payload = ('\n'.join(lines) + '\n').encode('utf-8')
+
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            size = os.fstat(fd).st_size
+            if size and not self._ends_with_newline(size):
+                # Předchozí zápis byl přerušen - useknutý řádek uzavřeme,
+                # aby se nový záznam nepřilepil k němu
+                payload = b'\n' + payload
+            os.write(fd, payload)
+            os.fsync(fd)
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+    def read_from(self, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Načte záznamy od daného offsetu.
+
+        Returns:
+            (záznamy, offset za posledním kompletním řádkem)
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset)
+                chunk = f.read()
+        except FileNotFoundError:
+            return [], 0
+
+        end = chunk.rfind(b'\n') + 1  # nekompletní poslední řádek necháme na příště
+        records = []
+        for line in chunk[:end].splitlines():
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f'Poškozený záznam v žurnálu {self.path} přeskočen')
+        return records, offset + end
+
+    def remove(self) -> None:
+        """Smaže žurnál (po zapracování do snapshotu)"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _ends_with_newline(self, size: int) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) == b'\n'
+
+
+def apply_edits(products_by_sku, edits: List[Dict]) -> int:
+    """
+    Aplikuje záznamy žurnálu na řádky katalogu.
+
+    Args:
+        products_by_sku: Funkce sku -> řádek produktu (nebo None)
+        edits: Záznamy žurnálu
+
+    Returns:
+        Počet aplikovaných záznamů
+    """
+    applied = 0
+    for edit in edits:
+        product = products_by_sku(edit.get('sku'))
+        if product is None:
+            continue
+        product.update(edit.get('set', {}))
+        applied += 1
+    return applied
@@ -0,0 +1,79 @@
+import os
+import json
+import logging
+import tempfile
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Počítadla souhrnu katalogu (hlavičkový řádek šablony se nepočítá)
+SUMMARY_COUNTERS = ('products', 'confirmed', 'with_images', 'with_descriptions')
+
+
+def product_flags(product: dict) -> Dict[str, int]:
+    """Příspěvek jednoho produktu do počítadel souhrnu"""
+    return {
+        'products': 1,
+        'confirmed': int(bool(product.get('is_confirmed'))),
+        'with_images': int(bool(product.get('mirakl_image_1'))),
+        'with_descriptions': int(bool(product.get('Short Description')) and bool(product.get('Description')))
+    }
+
+
+def count_products(products: Iterable[dict]) -> Dict[str, int]:
+    """Spočítá počítadla souhrnu pro seznam produktů"""
+    counters = dict.fromkeys(SUMMARY_COUNTERS, 0)
+    for product in products:
+        for key, value in product_flags(product).items():
+            counters[key] += value
+    return counters
+
+
+class CatalogSummary:
+    """
+    Malý souhrn katalogu farmy (<farm_id>.summary.json) vedle snapshotu.
+
+    Obsahuje počítadla, čas poslední změny a verzi katalogu. Pole 'source'
+    zaznamenává identitu snapshotu a žurnálu, ze kterých souhrn vznikl -
+    pokud nesouhlasí se stavem na disku (zápis jiným nástrojem, ztracený
+    zápis souhrnu), souhrn se přepočítá. Souhrn se dá kdykoli smazat.
+
+    Třída sama nezamyká - o zámky se stará FarmCatalogStore.
+    """
+
+    def __init__(self, farm_dir: str, farm_id: str):
+        self.farm_id = farm_id
+        self.path = os.path.join(farm_dir, f'{farm_id}.summary.json')
+
+    def load(self) -> Optional[Dict]:
+        """Načte souhrn; None pokud neexistuje nebo je poškozený"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logger.warning(f'Poškozený souhrn katalogu {self.path}, bude přepočítán')
+            return None
+
+    def write(self, counters: Dict[str, int], source: list, version: int, modified_at: str) -> Dict:
+        """
+        Atomicky zapíše souhrn (temp soubor + rename).
+
+        Args:
+            counters: Počítadla SUMMARY_COUNTERS
+            source: Identita snapshotu a žurnálu [mtime_ns, size, journal_ino, journal_size]
+        """
+        summary = {'farm_id': self.farm_id, **counters, 'modified_at': modified_at,
+                   'version': version, 'source': source}
+
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=f'.{self.farm_id}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(summary, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return summary
@@ -0,0 +1,184 @@
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from app.config.config import Config
+from app.core.farm_catalog import FarmCatalogStore, catalog_store
+from app.core.catalog_journal import JOURNALED_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+class CommitAck:
+    """Potvrzení, že úprava produktu byla trvale zapsána"""
+
+    def __init__(self, farm_id: str, sku: str, row: Optional[dict], batch_size: int):
+        self.farm_id = farm_id
+        self.sku = sku
+        self.row = row
+        self.batch_size = batch_size
+        self.committed_at = datetime.utcnow()
+
+    @property
+    def found(self) -> bool:
+        """Zda produkt s daným SKU v katalogu existoval"""
+        return self.row is not None
+
+    def to_dict(self) -> Dict:
+        return {
+            'farm_id': self.farm_id,
+            'sku': self.sku,
+            'found': self.found,
+            'batch_size': self.batch_size,
+            'committed_at': self.committed_at.isoformat()
+        }
+
+
+class _PendingEdit:
+    __slots__ = ('edit', 'wake', 'done', 'ack', 'error')
+
+    def __init__(self, edit: Dict):
+        self.edit = edit
+        # Probudí čekající vlákno: úprava je zapsaná (done), nebo mu leader předal vedení
+        self.wake = threading.Event()
+        self.done = False
+        self.ack = None
+        self.error = None
+
+
+class _FarmQueue:
+    __slots__ = ('pending', 'committing')
+
+    def __init__(self):
+        self.pending = []
+        self.committing = False
+
+
+class FarmCatalogWriter:
+    """
+    Group-commit zapisovač úprav katalogů farem.
+
+    Úpravy stejné farmy, které dorazí během krátkého okna, se zapíší
+    jedním trvalým zápisem do žurnálu (jeden write + fsync). Zápis provádí
+    vlákno, které do prázdné fronty přišlo první (leader); ostatní jen
+    čekají na své potvrzení. Leader zapíše jen úpravy, které ve frontě
+    byly po jeho okně, a vedení pak předá vláknu s nejstarší čekající
+    úpravou - při trvalém přísunu úprav tak žádný požadavek nezapisuje
+    cizí dávky donekonečna. Nepotřebuje vlastní vlákna na pozadí a funguje
+    stejně pro vláknové i green-thread workery.
+    """
+
+    def __init__(self, store: FarmCatalogStore, window: float = None, max_batch: int = 500):
+        self.store = store
+        self.window = Config.CATALOG_COMMIT_WINDOW if window is None else window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._queues = {}
+        self.batches = 0
+        self.edits = 0
+
+    def write(self, farm_id: str, sku: str, fields: Dict, timeout: float = 30) -> CommitAck:
+        """
+        Zařadí úpravu produktu do dávky a počká na její trvalý zápis.
+
+        Raises:
+            ValueError: Pokud úprava obsahuje pole mimo žurnál
+            TimeoutError: Pokud zápis nebyl potvrzen včas
+        """
+        return self.write_many(farm_id, [(sku, fields)], timeout)[0]
+
+    def write_many(self, farm_id: str, edits: List[Tuple[str, Dict]], timeout: float = 30) -> List[CommitAck]:
+        """Zařadí najednou více úprav jedné farmy (hromadný import) a počká na jejich zápis"""
+        # Neplatná úprava nesmí shodit celou dávku ostatních požadavků
+        for sku, fields in edits:
+            unknown = set(fields) - JOURNALED_FIELDS
+            if unknown:
+                raise ValueError(f"Pole {', '.join(sorted(unknown))} nelze zapsat do žurnálu")
+
+        pending = [_PendingEdit({'sku': sku, 'set': fields}) for sku, fields in edits]
+
+        with self._lock:
+            queue = self._queues.setdefault(farm_id, _FarmQueue())
+            queue.pending.extend(pending)
+            leader = not queue.committing
+            if leader:
+                queue.committing = True
+
+        if leader:
+            self._commit_loop(farm_id, queue)
+
+        expires = time.monotonic() + timeout
+        for item in pending:
+            while not item.done:
+                if not item.wake.wait(max(0.0, expires - time.monotonic())) and not self._withdraw(queue, item, pending):
+                    raise TimeoutError(f"Zápis úpravy produktu {item.edit['sku']} farmy {farm_id} nebyl potvrzen")
+                if not item.done:
+                    # Předchozí leader předal vedení - úprava je na řadě jako první
+                    item.wake.clear()
+                    self._commit_loop(farm_id, queue)
+            if item.error is not None:
+                raise item.error
+        return [item.ack for item in pending]
+
+    def stats(self) -> Dict:
+        """Počet zapsaných dávek a úprav"""
+        with self._lock:
+            return {'batches': self.batches, 'edits': self.edits}
+
+    def _commit_loop(self, farm_id: str, queue: _FarmQueue) -> None:
+        # Krátké okno, během kterého se k dávce připojí další požadavky
+        if self.window:
+            time.sleep(self.window)
+
+        # Zapíše se jen to, co ve frontě je teď; pozdější úpravy zapíše další leader
+        with self._lock:
+            remaining = len(queue.pending)
+        while remaining:
+            with self._lock:
+                batch = queue.pending[:min(remaining, self.max_batch)]
+                del queue.pending[:len(batch)]
+            remaining -= len(batch)
+            self._commit(farm_id, batch)
+
+        with self._lock:
+            if not queue.pending:
+                queue.committing = False
+                return
+            queue.pending[0].wake.set()
+
+    def _withdraw(self, queue: _FarmQueue, item: _PendingEdit, pending: List[_PendingEdit]) -> bool:
+        """
+        Po vypršení čekání vyřadí nezapsané úpravy požadavku z fronty.
+
+        Vrací True, pokud úprava mezitím dostala vedení nebo potvrzení - pak
+        se čekání nevzdává. Jinak už vedení nikdy nedostane (předává se pod
+        stejným zámkem), takže fronta na opuštěném požadavku neuvízne.
+        """
+        with self._lock:
+            if item.wake.is_set():
+                return True
+            withdrawn = set(map(id, pending))
+            queue.pending = [other for other in queue.pending if id(other) not in withdrawn]
+            return False
+
+    def _commit(self, farm_id: str, batch: List[_PendingEdit]) -> None:
+        try:
+            rows = self.store.update_products(farm_id, [p.edit for p in batch])
+            for pending, row in zip(batch, rows):
+                pending.ack = CommitAck(farm_id, pending.edit['sku'], row, len(batch))
+            with self._lock:
+                self.batches += 1
+                self.edits += len(batch)
+            logger.debug(f'Zapsána dávka {len(batch)} úprav katalogu farmy {farm_id}')
+        except Exception as e:
+            logger.error(f'Chyba při zápisu dávky úprav farmy {farm_id}: {str(e)}', exc_info=True)
+            for pending in batch:
+                pending.error = e
+        finally:
+            for pending in batch:
+                pending.done = True
+                pending.wake.set()
+
+
+catalog_writer = FarmCatalogWriter(catalog_store)
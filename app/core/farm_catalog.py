@@ -0,0 +1,483 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from app.config.config import Config
+from datetime import datetime
+from app.core.catalog_journal import CatalogJournal, apply_edits
+from app.core.catalog_summary import CatalogSummary, SUMMARY_COUNTERS, count_products
+
+try:
+    import fcntl
+except ImportError:  # Windows - zamykání jen v rámci procesu
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+# Hodnota Shop SKU v šablonovém (hlavičkovém) řádku katalogu
+HEADER_SKU = 'shop_sku'
+
+
+def _data_rows(farm_data: dict) -> List[dict]:
+    return [p for p in farm_data.get('products', []) if p.get('Shop SKU') != HEADER_SKU]
+
+
+class _CatalogEntry:
+    """Naparsovaný katalog farmy spolu s identitou souborů, ze kterých vznikl"""
+
+    __slots__ = ('data', 'mtime_ns', 'size', 'journal_ino', 'journal_offset', '_sku_index')
+
+    def __init__(self, data: dict, mtime_ns: int, size: int):
+        self.data = data
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.journal_ino = None
+        self.journal_offset = 0
+        self._sku_index = None
+
+    @property
+    def sku_index(self) -> Dict[str, int]:
+        """Index SKU -> pozice řádku, sestavený jednou pro danou verzi katalogu"""
+        if self._sku_index is None:
+            index = {}
+            for position, product in enumerate(self.data.get('products', [])):
+                sku = product.get('Shop SKU')
+                # Při duplicitách platí první výskyt, stejně jako při lineárním hledání
+                if sku and sku != HEADER_SKU and sku not in index:
+                    index[sku] = position
+            self._sku_index = index
+        return self._sku_index
+
+    def find(self, sku: str) -> Optional[dict]:
+        position = self.sku_index.get(sku)
+        if position is None:
+            return None
+        return self.data['products'][position]
+
+    def replay(self, journal: CatalogJournal, journal_ino: Optional[int]) -> None:
+        """Přehraje nové záznamy žurnálu od posledního známého offsetu"""
+        edits, offset = journal.read_from(self.journal_offset)
+        apply_edits(self.find, edits)
+        self.journal_ino = journal_ino
+        self.journal_offset = offset
+
+
+class _FarmLock:
+    """
+    Zámek katalogu jedné farmy - mezi vlákny (RLock) i mezi procesy
+    (flock na souboru .<farm_id>.lock, pokud je fcntl k dispozici).
+    """
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def acquire(self):
+        self._lock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None and os.path.isdir(os.path.dirname(self.lock_path)):
+                self._fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR, 0o644)
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+        except Exception:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._lock.release()
+            raise
+        self._depth += 1
+        return True
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self._lock.release()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class FarmCatalogStore:
+    """
+    Sdílená in-process cache katalogů farem (app/data/farms/<farm_id>/<farm_id>.json).
+
+    Katalog se parsuje jen jednou a dokud se soubor nezmění (mtime/velikost),
+    vrací se stejný objekt. Vlastní zápisy cache rovnou aktualizují. Velikost
+    cache je omezena součtem velikostí JSON souborů a nejdéle nepoužité
+    katalogy se uvolňují jako první (LRU).
+
+    Úpravy jednotlivých produktů (update_product) se nezapisují přepisem
+    celého JSONu, ale do append-only žurnálu farmy. Čtení vrací snapshot
+    s přehraným žurnálem a kompaktor žurnál průběžně zapracovává zpět
+    do snapshotu.
+
+    Vrácená data jsou sdílená mezi požadavky a nesmí se měnit přímo -
+    úpravy jdou přes update_product(), nový katalog přes save().
+    """
+
+    def __init__(self, base_dir: str = None, max_bytes: int = None):
+        self.base_dir = base_dir or os.path.join(Config.DATA_DIR, 'farms')
+        self.max_bytes = Config.FARM_CATALOG_CACHE_BYTES if max_bytes is None else max_bytes
+        self._entries = OrderedDict()  # farm_id -> _CatalogEntry, pořadí = LRU
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._farm_locks = {}
+        self._compactor = None
+        self.hits = 0
+        self.misses = 0
+
+    def catalog_path(self, farm_id: str) -> str:
+        """Cesta k JSON souboru katalogu farmy"""
+        return os.path.join(self.base_dir, farm_id, f'{farm_id}.json')
+
+    def journal(self, farm_id: str) -> CatalogJournal:
+        """Žurnál úprav katalogu farmy"""
+        return CatalogJournal(os.path.join(self.base_dir, farm_id), farm_id)
+
+    def summary_file(self, farm_id: str) -> CatalogSummary:
+        """Souhrn katalogu farmy (<farm_id>.summary.json)"""
+        return CatalogSummary(os.path.join(self.base_dir, farm_id), farm_id)
+
+    def exists(self, farm_id: str) -> bool:
+        """Zjistí, zda katalog farmy existuje na disku"""
+        return os.path.exists(self.catalog_path(farm_id))
+
+    def farm_lock(self, farm_id: str) -> _FarmLock:
+        """Zámek pro read-modify-write operace nad katalogem jedné farmy"""
+        with self._lock:
+            lock = self._farm_locks.get(farm_id)
+            if lock is None:
+                lock_path = os.path.join(self.base_dir, farm_id, f'.{farm_id}.lock')
+                lock = self._farm_locks[farm_id] = _FarmLock(lock_path)
+            return lock
+
+    def get(self, farm_id: str) -> dict:
+        """
+        Vrátí naparsovaný katalog farmy včetně úprav ze žurnálu.
+
+        Raises:
+            FileNotFoundError: Pokud katalog farmy neexistuje
+        """
+        return self._get_entry(farm_id).data
+
+    def summary(self, farm_id: str) -> Dict:
+        """
+        Vrátí souhrn katalogu farmy (počty produktů, čas změny, verze).
+
+        Aktuální souhrn se jen přečte ze souboru bez načítání katalogu;
+        chybějící nebo zastaralý souhrn se přepočítá z katalogu.
+
+        Raises:
+            FileNotFoundError: Pokud katalog farmy neexistuje
+        """
+        summary_file = self.summary_file(farm_id)
+        summary = summary_file.load()
+        if summary is not None and summary.get('source') == self._source(farm_id):
+            return summary
+
+        with self.farm_lock(farm_id):
+            summary = summary_file.load()
+            if summary is not None and summary.get('source') == self._source(farm_id):
+                return summary
+            entry = self._get_entry(farm_id)
+            logger.info(f'Přepočítávám souhrn katalogu farmy {farm_id}')
+            return self._write_summary(farm_id, count_products(_data_rows(entry.data)), summary)
+
+    def find_product(self, farm_id: str, sku: str) -> Optional[dict]:
+        """Vrátí řádek produktu podle SKU v konstantním čase, nebo None"""
+        return self._get_entry(farm_id).find(sku)
+
+    def product_position(self, farm_id: str, sku: str) -> Optional[int]:
+        """Vrátí pozici produktu v seznamu products (např. pro stránkování)"""
+        return self._get_entry(farm_id).sku_index.get(sku)
+
+    def update_product(self, farm_id: str, sku: str, fields: Dict) -> Optional[dict]:
+        """
+        Zapíše úpravu polí produktu do žurnálu a promítne ji do cache.
+
+        Returns:
+            Upravený řádek produktu, nebo None pokud produkt neexistuje
+        """
+        return self.update_products(farm_id, [{'sku': sku, 'set': fields}])[0]
+
+    def update_products(self, farm_id: str, edits: List[Dict]) -> List[Optional[dict]]:
+        """
+        Zapíše více úprav jedním zápisem do žurnálu.
+
+        Args:
+            edits: Seznam úprav ve tvaru {'sku': ..., 'set': {pole: hodnota}}
+
+        Returns:
+            Upravené řádky ve stejném pořadí (None pro neexistující SKU)
+        """
+        with self.farm_lock(farm_id):
+            # Nejdřív dorovnáme cache se žurnálem (mohl ho doplnit jiný proces)
+            entry = self._get_entry(farm_id)
+            rows = [entry.find(edit['sku']) for edit in edits]
+            valid = [edit for edit, row in zip(edits, rows) if row is not None]
+            if not valid:
+                return rows
+
+            source = self._source(farm_id)
+            touched = list({id(row): row for row in rows if row is not None}.values())
+            before = count_products(touched)
+
+            journal = self.journal(farm_id)
+            offset = journal.append(valid)
+            apply_edits(entry.find, valid)
+            entry.journal_ino = journal.stat()[0]
+            entry.journal_offset = offset
+
+            # Souhrn upravíme jen o rozdíl upravených řádků
+            after = count_products(touched)
+            previous = self.summary_file(farm_id).load()
+            if previous is not None and previous.get('source') == source:
+                counters = {key: previous[key] + after[key] - before[key] for key in SUMMARY_COUNTERS}
+            else:
+                counters = count_products(_data_rows(entry.data))
+            self._write_summary(farm_id, counters, previous)
+            return rows
+
+    def save(self, farm_id: str, farm_data: dict) -> None:
+        """
+        Atomicky zapíše celý katalog farmy (nový nebo znovu nahraný CSV)
+        a aktualizuje cache. Případný žurnál se zahazuje, protože nový
+        katalog úpravy starého nahrazuje.
+        """
+        os.makedirs(os.path.dirname(self.catalog_path(farm_id)), exist_ok=True)
+
+        with self.farm_lock(farm_id):
+            with self._lock:
+                previous = self._entries.get(farm_id)
+            self._write_snapshot(farm_id, farm_data)
+            self.journal(farm_id).remove()
+
+            entry = self._snapshot_entry(farm_id, farm_data)
+            if previous is not None and previous.data is farm_data:
+                # Úpravy řádků na místě nemění SKU ani pořadí, index zůstává platný
+                entry._sku_index = previous._sku_index
+            self._store(farm_id, entry)
+            self._write_summary(farm_id, count_products(_data_rows(farm_data)), self.summary_file(farm_id).load())
+
+    def compact(self, farm_id: str) -> bool:
+        """
+        Zapracuje žurnál farmy do snapshotu (temp soubor + fsync + rename)
+        a žurnál smaže.
+
+        Returns:
+            True pokud bylo co kompaktovat
+        """
+        with self.farm_lock(farm_id):
+            journal = self.journal(farm_id)
+            if journal.stat()[0] is None or not self.exists(farm_id):
+                return False
+
+            entry = self._get_entry(farm_id)
+            source = self._source(farm_id)
+            self._write_snapshot(farm_id, entry.data)
+            journal.remove()
+
+            compacted = self._snapshot_entry(farm_id, entry.data)
+            compacted._sku_index = entry._sku_index
+            self._store(farm_id, compacted)
+
+            # Obsah katalogu se nezměnil - souhrn jen převezme novou identitu souborů
+            previous = self.summary_file(farm_id).load()
+            if previous is not None and previous.get('source') == source:
+                counters = {key: previous[key] for key in SUMMARY_COUNTERS}
+                self._write_summary(farm_id, counters, previous, changed=False)
+            else:
+                self._write_summary(farm_id, count_products(_data_rows(entry.data)), previous)
+            logger.info(f'Žurnál katalogu farmy {farm_id} zapracován do snapshotu')
+            return True
+
+    def compact_all(self, min_bytes: int = 0) -> int:
+        """Kompaktuje žurnály všech farem, které přesáhly min_bytes"""
+        compacted = 0
+        try:
+            farm_ids = os.listdir(self.base_dir)
+        except FileNotFoundError:
+            return 0
+
+        for farm_id in farm_ids:
+            _, size = self.journal(farm_id).stat()
+            if size and size >= min_bytes:
+                try:
+                    if self.compact(farm_id):
+                        compacted += 1
+                except Exception as e:
+                    logger.error(f'Chyba při kompaktování katalogu farmy {farm_id}: {str(e)}', exc_info=True)
+        return compacted
+
+    def start_compactor(self, interval: float, min_bytes: int) -> None:
+        """Spustí kompaktor žurnálů na pozadí (nejvýše jeden na instanci)"""
+        with self._lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return
+
+            def run():
+                while True:
+                    time.sleep(interval)
+                    self.compact_all(min_bytes)
+
+            self._compactor = threading.Thread(target=run, name='catalog-compactor', daemon=True)
+            self._compactor.start()
+
+    def invalidate(self, farm_id: Optional[str] = None) -> None:
+        """Zahodí katalog farmy (nebo všech farem) z cache"""
+        with self._lock:
+            if farm_id is None:
+                self._entries.clear()
+                self._bytes = 0
+                return
+            entry = self._entries.pop(farm_id, None)
+            if entry is not None:
+                self._bytes -= entry.size
+
+    def stats(self) -> Dict:
+        """Statistiky cache pro diagnostiku"""
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+    def _get_entry(self, farm_id: str) -> _CatalogEntry:
+        json_path = self.catalog_path(farm_id)
+        journal = self.journal(farm_id)
+        stat = os.stat(json_path)
+        journal_ino, journal_size = journal.stat()
+
+        entry = self._lookup(farm_id, stat)
+        if entry is not None and entry.journal_ino == journal_ino and entry.journal_offset == journal_size:
+            return entry
+
+        # Načítání a přehrávání žurnálu probíhá pod zámkem farmy, aby souběžné
+        # požadavky nenačítaly stejný soubor několikrát
+        with self.farm_lock(farm_id):
+            stat = os.stat(json_path)
+            journal_ino, journal_size = journal.stat()
+            entry = self._lookup(farm_id, stat)
+            if entry is not None:
+                if entry.journal_ino == journal_ino and entry.journal_offset == journal_size:
+                    return entry
+                if entry.journal_ino in (None, journal_ino) and entry.journal_offset <= journal_size:
+                    # Žurnál pouze narostl - stačí přehrát nové záznamy
+                    entry.replay(journal, journal_ino)
+                    return entry
+
+            with self._lock:
+                self.misses += 1
+            with open(json_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            logger.debug(f'Katalog farmy {farm_id} načten z disku ({stat.st_size} B)')
+
+            entry = _CatalogEntry(data, stat.st_mtime_ns, stat.st_size)
+            entry.replay(journal, journal_ino)
+            self._store(farm_id, entry)
+            return entry
+
+    def _source(self, farm_id: str) -> list:
+        """Identita snapshotu a žurnálu, ke které se vztahuje souhrn"""
+        stat = os.stat(self.catalog_path(farm_id))
+        journal_ino, journal_size = self.journal(farm_id).stat()
+        return [stat.st_mtime_ns, stat.st_size, journal_ino, journal_size]
+
+    def _write_summary(self, farm_id: str, counters: Dict[str, int], previous: Optional[Dict],
+                       changed: bool = True) -> Dict:
+        source = self._source(farm_id)
+        if previous is None:
+            # Bez předchozího souhrnu začíná verze od aktuálního času, aby nikdy neklesla
+            version = int(time.time() * 1000)
+            modified_at = datetime.utcfromtimestamp(self._last_write(farm_id)).isoformat()
+        elif changed:
+            version = previous['version'] + 1
+            modified_at = datetime.utcnow().isoformat()
+        else:
+            version = previous['version']
+            modified_at = previous['modified_at']
+
+        summary_file = self.summary_file(farm_id)
+        try:
+            return summary_file.write(counters, source, version, modified_at)
+        except OSError as e:
+            # Souhrn je jen odvozený údaj - chyba zápisu nesmí shodit zápis katalogu
+            logger.warning(f'Nepodařilo se zapsat souhrn katalogu farmy {farm_id}: {str(e)}')
+            return {'farm_id': farm_id, **counters, 'modified_at': modified_at, 'version': version, 'source': source}
+
+    def _last_write(self, farm_id: str) -> float:
+        mtime = os.path.getmtime(self.catalog_path(farm_id))
+        try:
+            return max(mtime, os.path.getmtime(self.journal(farm_id).path))
+        except FileNotFoundError:
+            return mtime
+
+    def _snapshot_entry(self, farm_id: str, farm_data: dict) -> _CatalogEntry:
+        stat = os.stat(self.catalog_path(farm_id))
+        return _CatalogEntry(farm_data, stat.st_mtime_ns, stat.st_size)
+
+    def _write_snapshot(self, farm_id: str, farm_data: dict) -> None:
+        json_path = self.catalog_path(farm_id)
+        farm_dir = os.path.dirname(json_path)
+        fd, tmp_path = tempfile.mkstemp(dir=farm_dir, prefix=f'.{farm_id}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(farm_data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, json_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            # Data v paměti mohla být změněna, ale zápis selhal
+            self.invalidate(farm_id)
+            raise
+
+    def _lookup(self, farm_id: str, stat: os.stat_result) -> Optional[_CatalogEntry]:
+        with self._lock:
+            entry = self._entries.get(farm_id)
+            if entry is None:
+                return None
+            if entry.mtime_ns != stat.st_mtime_ns or entry.size != stat.st_size:
+                # Soubor byl změněn mimo tuto cache
+                self._entries.pop(farm_id)
+                self._bytes -= entry.size
+                return None
+            self._entries.move_to_end(farm_id)
+            self.hits += 1
+            return entry
+
+    def _store(self, farm_id: str, entry: _CatalogEntry) -> None:
+        with self._lock:
+            old = self._entries.pop(farm_id, None)
+            if old is not None:
+                self._bytes -= old.size
+
+            if entry.size > self.max_bytes:
+                # Katalog se do rozpočtu nevejde vůbec, necacheujeme ho
+                return
+
+            self._entries[farm_id] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes and self._entries:
+                evicted_id, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                logger.debug(f'Katalog farmy {evicted_id} uvolněn z cache (LRU)')
+
+
+catalog_store = FarmCatalogStore()
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Dict, Optional
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def request_key(request: Dict) -> str:
+    """
+    Klíč cache z parametrů chat completion požadavku.
+
+    Hash pokrývá model, systémový i uživatelský prompt (messages),
+    temperature, max_tokens a případný response_format - změna
+    kteréhokoli dá nový klíč.
+    """
+    material = {key: request.get(key) for key in ('model', 'messages', 'temperature', 'max_tokens')}
+    if 'response_format' in request:
+        material['response_format'] = request['response_format']
+    encoded = json.dumps(material, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """
+    Perzistentní cache vygenerovaných textů adresovaná obsahem požadavku.
+
+    Ukládá se do SQLite souboru (sdílený mezi procesy, WAL režim). Záznam
+    platí ttl sekund; při překročení max_entries se mažou nejdéle
+    nepoužité záznamy. Prázdná cesta cache vypíná.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, max_entries: int = None):
+        self.path = Config.LLM_CACHE_PATH if path is None else path
+        self.ttl = Config.LLM_CACHE_TTL if ttl is None else ttl
+        self.max_entries = Config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, key: str) -> Optional[str]:
+        """Vrátí uložený text nebo None (chybí, vypršel, cache vypnutá)"""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                row = conn.execute('SELECT response, created_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+                if row is None or (self.ttl and row[1] < now - self.ttl):
+                    self.misses += 1
+                    return None
+                conn.execute('UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                # Cache nesmí shodit generování - pokračujeme bez ní
+                logger.warning(f'Čtení z LLM cache {self.path} selhalo: {str(e)}')
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def contains(self, key: str) -> bool:
+        """Zda je platný záznam v cache (nepočítá se do zásahů a neprodlužuje použití)"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            try:
+                row = self._connect().execute('SELECT created_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            except sqlite3.Error:
+                return False
+        return row is not None and not (self.ttl and row[0] < time.time() - self.ttl)
+
+    def set(self, key: str, response: str, model: str = None) -> None:
+        """Uloží text odpovědi (přepíše starší záznam se stejným klíčem)"""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute('INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_used, hits) '
+                             'VALUES (?, ?, ?, ?, ?, 0)', (key, model, response, now, now))
+                conn.commit()
+                self._writes += 1
+                # Úklid jen občas, ne při každém zápisu
+                if self._writes % 100 == 1:
+                    self._evict(conn, now)
+            except sqlite3.Error as e:
+                logger.warning(f'Zápis do LLM cache {self.path} selhal: {str(e)}')
+
+    def record_bypass(self) -> None:
+        with self._lock:
+            self.bypassed += 1
+
+    def clear(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            conn = self._connect()
+            conn.execute('DELETE FROM llm_cache')
+            conn.commit()
+
+    def stats(self) -> Dict:
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                try:
+                    entries = self._connect().execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses,
+                'bypassed': self.bypassed, 'evictions': self.evictions}
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        removed = 0
+        if self.ttl:
+            removed += conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (now - self.ttl,)).rowcount
+        if self.max_entries:
+            removed += conn.execute(
+                'DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            ).rowcount
+        conn.commit()
+        if removed:
+            self.evictions += removed
+            logger.info(f'LLM cache: odstraněno {removed} záznamů')
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS llm_cache ('
+                         'key TEXT PRIMARY KEY, model TEXT, response TEXT NOT NULL, '
+                         'created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_llm_cache_last_used ON llm_cache (last_used)')
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+
+llm_cache = LLMCache()
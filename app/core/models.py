@@ -43,10 +43,36 @@ class Farm(db.Model):
             'modified_at': self.modified_at.isoformat() if self.modified_at else None
         }
 
+# Mapování sloupců Mirakl katalogu na typované sloupce tabulky product.
+# Ostatní sloupce katalogu se ukládají do JSON sloupce mirakl_columns.
+CATALOG_COLUMNS = {
+    'Shop SKU': 'sku',
+    'Name': 'name',
+    'Category': 'category',
+    'Weight': 'weight',
+    'Farm ingredients': 'ingredients',
+    'Short Description': 'short_description',
+    'Description': 'long_description',
+    'mirakl_image_1': 'image_path',
+    'is_confirmed': 'is_confirmed'
+}
+
 class Product(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('farm_id', 'sku', name='uq_product_farm_sku'),
+        db.Index('ix_product_farm_confirmed', 'farm_id', 'is_confirmed'),
+        db.Index('ix_product_farm_category', 'farm_id', 'category'),
+        db.Index('ix_product_farm_position', 'farm_id', 'position'),
+        db.Index('ix_product_created_at', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    sku = db.Column(db.String(50), unique=True, nullable=False)
-    name = db.Column(db.String(100), nullable=False)
+    sku = db.Column(db.String(50), nullable=False)
+    name = db.Column(db.String(255), nullable=False)
+    category = db.Column(db.String(255))
+    weight = db.Column(db.String(50))
+    position = db.Column(db.Integer)  # Pořadí řádku v původním katalogu
+    mirakl_columns = db.Column(db.JSON)  # Zbylé sloupce Mirakl katalogu
     ingredients = db.Column(db.Text)
     original_description = db.Column(db.Text)
     short_description = db.Column(db.Text)
@@ -100,5 +126,31 @@ class Product(db.Model):
             'farm_id': self.farm_id
         }
     
+    @staticmethod
+    def catalog_values(row: dict) -> dict:
+        """Rozdělí řádek Mirakl katalogu na hodnoty typovaných sloupců a zbytek"""
+        values = {}
+        extra = {}
+        for key, value in row.items():
+            column = CATALOG_COLUMNS.get(key)
+            if column == 'is_confirmed':
+                values[column] = bool(value)
+            elif column:
+                values[column] = value
+            # Typované sloupce zůstávají v JSON jako None, aby se zachovalo pořadí sloupců
+            extra[key] = None if column else value
+        values['mirakl_columns'] = extra
+        return values
+    
+    def to_catalog_row(self) -> dict:
+        """Převede produkt zpět na řádek Mirakl katalogu"""
+        row = dict(self.mirakl_columns or {})
+        for key, column in CATALOG_COLUMNS.items():
+            value = getattr(self, column)
+            # Sloupce, které původní řádek neměl, nepřidáváme
+            if key in row or value not in (None, False):
+                row[key] = bool(value) if column == 'is_confirmed' else value
+        return row
+    
     def __repr__(self):
         return f'<Product {self.sku}: {self.name}>' 
\ No newline at end of file
@@ -0,0 +1,171 @@
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from typing import Dict
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from app.config.config import Config
+from app.core.rate_limiter import GovernedTransport, AsyncGovernedTransport, openai_governor
+
+logger = logging.getLogger(__name__)
+
+try:
+    import h2  # noqa: F401 - HTTP/2 v httpx vyžaduje balíček h2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+class ConnectionStats:
+    """
+    Počítadla využití spojení k OpenAI API.
+
+    Nová TCP spojení a TLS handshaky se zachytí přes trace rozšíření
+    httpcore; požadavky bez nového spojení šly po existujícím keep-alive
+    spojení.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self.http2_responses = 0
+
+    def trace(self, event: str, info: Dict) -> None:
+        if event == 'connection.connect_tcp.complete':
+            self._increment('connections')
+        elif event == 'connection.start_tls.complete':
+            self._increment('tls_handshakes')
+
+    async def trace_async(self, event: str, info: Dict) -> None:
+        self.trace(event, info)
+
+    def on_request(self, request: httpx.Request) -> None:
+        self._increment('requests')
+        request.extensions['trace'] = self.trace
+
+    async def on_request_async(self, request: httpx.Request) -> None:
+        self._increment('requests')
+        request.extensions['trace'] = self.trace_async
+
+    def on_response(self, response: httpx.Response) -> None:
+        if response.http_version == 'HTTP/2':
+            self._increment('http2_responses')
+
+    async def on_response_async(self, response: httpx.Response) -> None:
+        self.on_response(response)
+
+    def _increment(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            reused = max(self.requests - self.connections, 0)
+            return {
+                'requests': self.requests,
+                'connections': self.connections,
+                'tls_handshakes': self.tls_handshakes,
+                'reused_requests': reused,
+                'reuse_ratio': round(reused / self.requests, 3) if self.requests else None,
+                'http2_responses': self.http2_responses
+            }
+
+
+class OpenAIClientRegistry:
+    """
+    Sdílení OpenAI klientů (a jejich poolu HTTP spojení) v rámci procesu.
+
+    Synchronní klient je jeden pro celý proces - httpx.Client je bezpečný
+    pro vlákna i green thready (eventlet/gevent po monkey-patchi). Async
+    klient je vázaný na event loop, proto se drží jeden na každou smyčku.
+    Klienti vznikají líně při prvním použití a po forku (gunicorn --preload)
+    se vytvoří znovu, aby procesy nesdílely sockety. Každý požadavek
+    prochází přes openai_governor (rate limit a adaptivní souběžnost).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = None
+        self._client = None
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._http2_warned = False
+        self.stats = ConnectionStats()
+
+    def client(self) -> OpenAI:
+        """Sdílený synchronní OpenAI klient"""
+        with self._lock:
+            self._check_fork()
+            if self._client is None:
+                transport = GovernedTransport(httpx.HTTPTransport(limits=self._limits(), http2=self._http2()),
+                                              openai_governor)
+                http_client = httpx.Client(
+                    transport=transport, timeout=self._timeout(),
+                    event_hooks={'request': [self.stats.on_request], 'response': [self.stats.on_response]}
+                )
+                self._client = OpenAI(**self._client_kwargs(), http_client=http_client)
+                logger.info(f'Vytvořen sdílený OpenAI klient (pool {Config.OPENAI_MAX_CONNECTIONS} spojení)')
+            return self._client
+
+    def async_client(self) -> AsyncOpenAI:
+        """Sdílený async OpenAI klient pro právě běžící event loop"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._check_fork()
+            client = self._async_clients.get(loop)
+            if client is None:
+                transport = AsyncGovernedTransport(
+                    httpx.AsyncHTTPTransport(limits=self._limits(), http2=self._http2()), openai_governor
+                )
+                http_client = httpx.AsyncClient(
+                    transport=transport, timeout=self._timeout(),
+                    event_hooks={'request': [self.stats.on_request_async], 'response': [self.stats.on_response_async]}
+                )
+                client = AsyncOpenAI(**self._client_kwargs(), http_client=http_client)
+                self._async_clients[loop] = client
+            return client
+
+    async def close_async_client(self) -> None:
+        """Zavře async klienta běžící smyčky (volá se před jejím ukončením)"""
+        with self._lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.close()
+
+    def to_dict(self) -> Dict:
+        return {**self.stats.to_dict(), 'async_clients': len(self._async_clients), 'http2': self._http2(),
+                'governor': openai_governor.to_dict()}
+
+    def _check_fork(self) -> None:
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._client = None
+            self._async_clients = weakref.WeakKeyDictionary()
+
+    def _client_kwargs(self) -> Dict:
+        kwargs = {'api_key': Config.OPENAI_API_KEY}
+        if Config.OPENAI_BASE_URL:
+            kwargs['base_url'] = Config.OPENAI_BASE_URL
+        return kwargs
+
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=Config.OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE,
+                            keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY)
+
+    def _timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(Config.OPENAI_TIMEOUT, connect=Config.OPENAI_CONNECT_TIMEOUT)
+
+    def _http2(self) -> bool:
+        if Config.OPENAI_HTTP2 and not HTTP2_AVAILABLE:
+            if not self._http2_warned:
+                self._http2_warned = True
+                logger.warning('OPENAI_HTTP2 je zapnuté, ale chybí balíček h2 - používám HTTP/1.1')
+            return False
+        return Config.OPENAI_HTTP2
+
+
+openai_clients = OpenAIClientRegistry()
@@ -0,0 +1,237 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime
+from typing import Callable, Dict, Optional
+from app.config.config import Config
+from app.core.catalog_backends import CatalogBackend
+from app.core.bulk_generation import generation_data, group_products, needs_generation
+from app.core.llm_cache import llm_cache
+from app.core.rate_limiter import openai_governor
+from app.core.telemetry import telemetry
+from app.generators.text_generator import TextGenerator
+
+logger = logging.getLogger(__name__)
+
+# Po tolika neúspěšných generováních za sebou (API nedostupné) se farma odloží
+MAX_CONSECUTIVE_FAILURES = 3
+
+
+class InteractiveGate:
+    """
+    Přednost interaktivního generování před předgenerováním na pozadí.
+
+    Interaktivní požadavky se obalí interactive(); předgenerování před
+    každým voláním OpenAI počká ve wait_idle(), dokud žádné neběží a od
+    posledního neuplynulo `quiet` sekund. Platí v rámci procesu - mezi
+    workery se o kapacitu dělí sdílený rate limiter.
+    """
+
+    def __init__(self, quiet: float = None):
+        self.quiet = Config.PREGENERATION_QUIET if quiet is None else quiet
+        self.active = 0
+        self._last = 0.0
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def interactive(self):
+        with self._cond:
+            self.active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self.active -= 1
+                self._last = time.monotonic()
+                self._cond.notify_all()
+
+    def wait_idle(self, stop: threading.Event = None) -> None:
+        with self._cond:
+            while not (stop is not None and stop.is_set()):
+                if self.active:
+                    self._cond.wait(0.5)
+                    continue
+                remaining = self._last + self.quiet - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+
+class PregenerationManager:
+    """
+    Spekulativní předgenerování popisů po nahrání katalogu farmy.
+
+    Farmy čekají ve frontě, jedno vlákno na pozadí je zpracovává postupně
+    a produkt po produktu (varianty se stejným promptem jednou). Výsledek
+    jde jen do LLM cache - katalog se nemění, ale pozdější generování
+    uživatelem vrátí popisy okamžitě. Produkty s popisy, potvrzené
+    a už nacachované (nezměněné při opětovném nahrání) se přeskočí.
+
+    Před každým voláním se čeká, až nepoběží interaktivní generování
+    a sdílená souběžnost OpenAI bude mít rezervu. Každá farma má denní
+    rozpočet volání (PREGENERATION_FARM_BUDGET), stav se ukládá do
+    <farm_id>.pregeneration.json.
+    """
+
+    def __init__(self, state_dir: str = None, generator_factory: Callable = TextGenerator,
+                 gate: InteractiveGate = None, budget: int = None, cache=None):
+        self.state_dir = state_dir or os.path.join(Config.DATA_DIR, 'pregeneration')
+        self.generator_factory = generator_factory
+        self.gate = gate or interactive_gate
+        self.budget = Config.PREGENERATION_FARM_BUDGET if budget is None else budget
+        self.cache = cache or llm_cache
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()  # farm_id -> (backend, app)
+        self._stop = threading.Event()
+        self._thread = None
+        self._generator = None
+        self.current = None
+
+    @property
+    def enabled(self) -> bool:
+        # Bez LLM cache by se výsledek neměl kam uložit
+        return Config.PREGENERATION_ENABLED and self.budget > 0 and self.cache.enabled
+
+    def state_path(self, farm_id: str) -> str:
+        return os.path.join(self.state_dir, f'{farm_id}.pregeneration.json')
+
+    def enqueue(self, farm_id: str, backend: CatalogBackend, app=None) -> bool:
+        """Zařadí farmu k předgenerování (znovu nahraná farma nahradí rozpracovaný běh)"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            self._pending.pop(farm_id, None)
+            self._pending[farm_id] = (backend, app)
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._worker, name='pregeneration', daemon=True)
+                self._thread.start()
+        logger.info(f'Farma {farm_id} zařazena k předgenerování popisů')
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run_farm(self, farm_id: str, backend: CatalogBackend, app=None) -> Dict:
+        """Předgeneruje popisy jedné farmy (blokuje); vrací uložený stav"""
+        state = self._load(farm_id)
+        state.update(status='running', candidates=0, generated=0, cached=0, failed=0,
+                     started_at=datetime.utcnow().isoformat(), finished_at=None)
+        with self._app_context(app):
+            farm_data = backend.farm_info(farm_id)
+            products = [p for p in backend.iter_products(farm_id, confirmed=False) if needs_generation(p)]
+        groups = group_products(products, farm_data, farm_id)
+        state['candidates'] = len(groups)
+        self._save(farm_id, state)
+
+        generator = self._get_generator()
+        failures = 0
+        for group in groups:
+            if self._stop.is_set() or farm_id in self._pending:
+                state['status'] = 'superseded' if farm_id in self._pending else 'stopped'
+                break
+            data = generation_data(group[0], farm_data, farm_id)
+            if generator.descriptions_cached(data):
+                state['cached'] += 1
+                continue
+            if state['used'] >= self.budget:
+                state['status'] = 'budget_exhausted'
+                break
+
+            self._wait_turn()
+            if self._stop.is_set():
+                state['status'] = 'stopped'
+                break
+            with telemetry.context(farm_id=farm_id, sku=group[0].get('Shop SKU'), endpoint='pregeneration'):
+                generator.generate_descriptions(data)
+            state['used'] += 1
+            # Fallback popis se do cache neukládá - nenacachovaný výsledek znamená selhání
+            if generator.descriptions_cached(data):
+                state['generated'] += 1
+                failures = 0
+            else:
+                state['failed'] += 1
+                failures += 1
+                if failures >= MAX_CONSECUTIVE_FAILURES:
+                    state['status'] = 'failed'
+                    break
+            self._save(farm_id, state)
+        else:
+            state['status'] = 'completed'
+
+        state['finished_at'] = datetime.utcnow().isoformat()
+        self._save(farm_id, state)
+        logger.info(f"Předgenerování farmy {farm_id} skončilo ({state['status']}): vygenerováno "
+                    f"{state['generated']}, v cache {state['cached']} z {state['candidates']}")
+        return state
+
+    def state(self, farm_id: str) -> Optional[Dict]:
+        try:
+            with open(self.state_path(farm_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'enabled': self.enabled, 'current': self.current, 'queued': list(self._pending),
+                    'interactive_active': self.gate.active}
+
+    def _worker(self) -> None:
+        while True:
+            with self._lock:
+                if self._stop.is_set() or not self._pending:
+                    self.current = self._thread = None
+                    return
+                farm_id, (backend, app) = self._pending.popitem(last=False)
+                self.current = farm_id
+            try:
+                self.run_farm(farm_id, backend, app)
+            except Exception as e:
+                logger.error(f'Předgenerování farmy {farm_id} selhalo: {str(e)}', exc_info=True)
+
+    def _wait_turn(self) -> None:
+        """Počká na klid interaktivních požadavků a polovinu volné souběžnosti OpenAI"""
+        concurrency = openai_governor.concurrency
+        while not self._stop.is_set():
+            self.gate.wait_idle(self._stop)
+            if concurrency.active < max(1, int(concurrency.limit) // 2):
+                return
+            time.sleep(0.2)
+
+    def _get_generator(self):
+        if self._generator is None:
+            self._generator = self.generator_factory()
+        return self._generator
+
+    def _load(self, farm_id: str) -> Dict:
+        """Uložený stav farmy; čerpání rozpočtu se každý den nuluje"""
+        state = self.state(farm_id) or {'farm_id': farm_id}
+        today = date.today().isoformat()
+        if state.get('day') != today:
+            state.update(day=today, used=0)
+        return state
+
+    def _save(self, farm_id: str, state: Dict) -> None:
+        state['updated_at'] = datetime.utcnow().isoformat()
+        try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.state_dir, prefix=f'.{farm_id}.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path(farm_id))
+        except OSError as e:
+            logger.warning(f'Nepodařilo se uložit stav předgenerování {farm_id}: {str(e)}')
+
+    def _app_context(self, app):
+        # SQL úložiště potřebuje aplikační kontext i ve vlákně na pozadí
+        return app.app_context() if app is not None else nullcontext()
+
+
+interactive_gate = InteractiveGate()
+pregeneration = PregenerationManager()
@@ -1,11 +1,16 @@
 import os
-import json
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional
 from werkzeug.utils import secure_filename
 from app import db
 from app.core.models import Product, Farm
 from app.config.config import Config
-from app.generators.text_generator import TextGenerator, GenerationError
+from app.core.farm_catalog import catalog_store
+from app.core.catalog_backends import get_catalog_backend
+from app.core.bulk_generation import generation_data
+from app.core.single_flight import single_flight
+from app.core.telemetry import telemetry
+from app.core.pregeneration import interactive_gate
+from app.generators.text_generator import TextGenerator, GenerationError, ParagraphStream
 from flask import current_app
 
 class ProductManager:
@@ -15,40 +20,14 @@ class ProductManager:
         
     def get_product(self, farm_id: str, sku: str) -> Optional[dict]:
         """Načte produkt podle SKU a farmy"""
-        # Načtení JSON souboru s produkty pro konkrétní farmu
-        json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'farms', farm_id, f'{farm_id}.json')
+        backend = get_catalog_backend()
+        if not backend.exists(farm_id):
+            raise ValueError(f"Data farmy {farm_id} nenalezena (úložiště {backend.name})")
         
-        print(f"Hledám soubor: {json_path}")
-        
-        if not os.path.exists(json_path):
-            print(f"Soubor nenalezen na cestě: {json_path}")
-            raise ValueError(f"Data farmy {farm_id} nenalezena v {json_path}")
-        
-        print(f"Soubor nalezen, načítám data...")
-        
-        with open(json_path, 'r', encoding='utf-8') as f:
-            farm_data = json.load(f)
-            products = farm_data.get('products', [])
-            
-            print(f"Načteno {len(products)} produktů")
-            print(f"Hledám produkt s SKU: {sku}")
-            
-            # Najít produkt podle SKU
-            for product in products:
-                current_sku = product.get('Shop SKU')
-                print(f"Kontroluji produkt s SKU: {current_sku}")
-                
-                # Přeskočit šablonu
-                if current_sku == 'shop_sku':
-                    print("Přeskakuji šablonu")
-                    continue
-                    
-                if current_sku == sku:
-                    print(f"Produkt nalezen: {product.get('Name')}")
-                    return product
-                    
-            print(f"Produkt s SKU {sku} nebyl nalezen")
+        product = backend.find_product(farm_id, sku)
+        if product is None:
             raise ValueError(f"Produkt {sku} nenalezen ve farmě {farm_id}")
+        return product
     
     def get_farm_products(self, farm_id: int, include_inactive: bool = False) -> List[Product]:
         """Vrátí seznam produktů farmy"""
@@ -91,129 +70,132 @@ class ProductManager:
         try:
             current_app.logger.info(f"Začátek ukládání obrázku pro farmu {farm_id}, SKU {sku}")
             
-            # Načtení JSON souboru
-            json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'farms', farm_id, f'{farm_id}.json')
-            current_app.logger.info(f"Cesta k JSON souboru: {json_path}")
-            
-            if not os.path.exists(json_path):
-                current_app.logger.error(f"JSON soubor pro farmu {farm_id} neexistuje")
-                raise ValueError(f"JSON soubor pro farmu {farm_id} neexistuje")
-            
-            with open(json_path, 'r', encoding='utf-8') as f:
-                farm_data = json.load(f)
-                current_app.logger.info("JSON soubor úspěšně načten")
+            backend = get_catalog_backend()
+            if not backend.exists(farm_id):
+                current_app.logger.error(f"Katalog farmy {farm_id} neexistuje")
+                raise ValueError(f"Katalog farmy {farm_id} neexistuje")
             
             # Najít produkt
-            for product in farm_data.get('products', []):
-                if product.get('Shop SKU') == sku:
-                    current_app.logger.info(f"Nalezen produkt s SKU {sku}")
-                    
-                    # Vytvoření cesty pro obrázek
-                    images_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'farms', farm_id, f'{farm_id}_images')
-                    os.makedirs(images_dir, exist_ok=True)
-                    current_app.logger.info(f"Adresář pro obrázky: {images_dir}")
-                    
-                    # Uložení obrázku
-                    filename = f"{sku}.jpg"
-                    image_path = os.path.join(images_dir, filename)
-                    image_file.save(image_path)
-                    current_app.logger.info(f"Obrázek uložen do: {image_path}")
-                    
-                    # Vždy použijeme produkční URL pro ukládání do JSONu
-                    server_url = "http://161.35.70.99/products"
-                    image_url = f"{server_url}/{farm_id}_images/{filename}"
-                    current_app.logger.info(f"Vytvořena URL obrázku: {image_url}")
-                    
-                    # Uložení KOMPLETNÍ URL do JSONu
-                    old_url = product.get('mirakl_image_1', '')
-                    product['mirakl_image_1'] = image_url
-                    product['image_path'] = image_url  # Ukládáme stejnou URL i do image_path
-                    current_app.logger.info(f"Stará URL: {old_url}")
-                    current_app.logger.info(f"Nová URL uložena do JSONu: {image_url}")
-                    
-                    # Uložení změn do JSONu
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(farm_data, f, ensure_ascii=False, indent=2)
-                    current_app.logger.info("Změny úspěšně uloženy do JSONu")
-                    
-                    # Pro lokální prostředí vrátíme lokální URL pro zobrazení v prohlížeči
-                    if os.environ.get('FLASK_ENV') == 'development':
-                        return f"http://127.0.0.1:5001/products/{farm_id}_images/{filename}"
-                    
-                    # V produkci vrátíme stejnou URL jako je v JSONu
-                    return image_url
+            product = backend.find_product(farm_id, sku)
+            if product is None:
+                raise ValueError(f"Produkt {sku} nebyl nalezen v katalogu")
+            current_app.logger.info(f"Nalezen produkt s SKU {sku}")
+            
+            # Vytvoření cesty pro obrázek
+            images_dir = os.path.join(catalog_store.base_dir, farm_id, f'{farm_id}_images')
+            os.makedirs(images_dir, exist_ok=True)
+            current_app.logger.info(f"Adresář pro obrázky: {images_dir}")
+            
+            # Uložení obrázku
+            filename = f"{sku}.jpg"
+            image_path = os.path.join(images_dir, filename)
+            image_file.save(image_path)
+            current_app.logger.info(f"Obrázek uložen do: {image_path}")
+            
+            # Vždy použijeme produkční URL pro ukládání do JSONu
+            server_url = "http://161.35.70.99/products"
+            image_url = f"{server_url}/{farm_id}_images/{filename}"
+            current_app.logger.info(f"Vytvořena URL obrázku: {image_url}")
+            
+            # Uložení KOMPLETNÍ URL do katalogu
+            old_url = product.get('mirakl_image_1', '')
+            backend.update_product(farm_id, sku, {
+                'mirakl_image_1': image_url,
+                'image_path': image_url  # Ukládáme stejnou URL i do image_path
+            })
+            current_app.logger.info(f"Stará URL: {old_url}")
+            current_app.logger.info(f"Nová URL uložena do katalogu: {image_url}")
             
-            raise ValueError(f"Produkt {sku} nebyl nalezen v JSON souboru")
+            # Pro lokální prostředí vrátíme lokální URL pro zobrazení v prohlížeči
+            if os.environ.get('FLASK_ENV') == 'development':
+                return f"http://127.0.0.1:5001/products/{farm_id}_images/{filename}"
+            
+            # V produkci vrátíme stejnou URL jako je v JSONu
+            return image_url
             
         except Exception as e:
             raise ValueError(f"Chyba při ukládání obrázku: {str(e)}")
-        
-        return None
     
     def confirm_product(self, farm_id: str, sku: str) -> bool:
         """Potvrdí produkt"""
         try:
-            # Načtení JSON souboru
-            json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'farms', farm_id, f'{farm_id}.json')
-            with open(json_path, 'r', encoding='utf-8') as f:
-                farm_data = json.load(f)
-            
-            # Najít produkt
-            for product in farm_data.get('products', []):
-                if product.get('Shop SKU') == sku:
-                    # Nastavení potvrzení
-                    product['is_confirmed'] = True
-                    
-                    # Uložení JSONu
-                    with open(json_path, 'w', encoding='utf-8') as f:
-                        json.dump(farm_data, f, ensure_ascii=False, indent=2)
-                    
-                    return True
+            # Nastavení potvrzení
+            if not get_catalog_backend().update_product(farm_id, sku, {'is_confirmed': True}).found:
+                raise ValueError(f"Produkt {sku} nenalezen")
             
-            raise ValueError(f"Produkt {sku} nenalezen")
+            return True
             
         except Exception as e:
             raise ValueError(f"Chyba při potvrzování produktu: {str(e)}")
     
-    def generate_product_content(self, farm_id: str, sku: str, content_type: str = None) -> dict:
-        """Generování obsahu pro produkt"""
+    def generate_product_content(self, farm_id: str, sku: str, content_type: str = None, bypass_cache: bool = False) -> dict:
+        """
+        Generování obsahu pro produkt (bypass_cache=True při regeneraci - vždy nové volání OpenAI).
+        
+        Souběžné stejné požadavky (dvojklik, dvě otevřené záložky, jiný worker)
+        počkají na jedno generování a dostanou stejný výsledek. Předgenerování
+        na pozadí mezitím ustoupí (interactive_gate).
+        """
+        key = f"{farm_id}:{sku}:{content_type or 'both'}:{'regenerate' if bypass_cache else 'generate'}"
         try:
-            product = self.get_product(farm_id, sku)
-            
-            # Načtení dat o farmě ze stejného souboru
-            json_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'farms', farm_id, f'{farm_id}.json')
-            
-            with open(json_path, 'r', encoding='utf-8') as f:
-                farm_data = json.load(f)
+            with interactive_gate.interactive():
+                result, shared = single_flight.do(
+                    key, lambda: self._generate_content(farm_id, sku, content_type, bypass_cache)
+                )
+            if shared:
+                current_app.logger.info(f"Generování {key} sdíleno se souběžným požadavkem")
+            return result
                 
-            product_data = {
-                'name': product.get('Name', ''),
-                'ingredients': product.get('Farm ingredients', ''),
-                'farm_description': farm_data.get('description', 'Rodinná farma s tradicí.'),
-                'farm_name': farm_data.get('name', farm_id)
-            }
+        except Exception as e:
+            raise GenerationError(f"Chyba při generování obsahu: {str(e)}")
+    
+    def _generate_content(self, farm_id: str, sku: str, content_type: str, bypass_cache: bool) -> dict:
+        product = self.get_product(farm_id, sku)
+        
+        farm_data = get_catalog_backend().farm_info(farm_id)
             
-            # Generování popisků podle typu
+        product_data = generation_data(product, farm_data, farm_id)
+        
+        # Generování popisků podle typu
+        with telemetry.context(farm_id=farm_id, sku=sku):
             if content_type == 'short':
                 return {
-                    'short_description': self.text_generator.generate_short_description(product_data)
+                    'short_description': self.text_generator.generate_short_description(product_data, bypass_cache)
                 }
             elif content_type == 'long':
                 return {
-                    'long_description': self.text_generator.generate_long_description(product_data)
+                    'long_description': self.text_generator.generate_long_description(product_data, bypass_cache)
                 }
             else:
-                # Generování obou popisků
-                short_desc = self.text_generator.generate_short_description(product_data)
-                long_desc = self.text_generator.generate_long_description(product_data)
-                
-                return {
-                    'long_description': long_desc,
-                    'short_description': short_desc
-                }
-                
-        except Exception as e:
-            raise GenerationError(f"Chyba při generování obsahu: {str(e)}")
+                # Generování obou popisků (jedno volání, při nezdaru dvě)
+                return self.text_generator.generate_descriptions(product_data, bypass_cache)
+    
+    def stream_long_description(self, farm_id: str, sku: str, on_piece: Callable[[int, str], None],
+                                bypass_cache: bool = False) -> str:
+        """
+        Streamované generování dlouhého popisu produktu.
+        
+        Každý došlý kousek textu předá on_piece(index odstavce, text). Hotový
+        popis naformátuje, uloží do katalogu a vrátí. Když se popis vygenerovat
+        nepodaří, vyhodí GenerationError a uložený popis zůstane beze změny.
+        """
+        product = self.get_product(farm_id, sku)
+        backend = get_catalog_backend()
+        product_data = generation_data(product, backend.farm_info(farm_id), farm_id)
+        
+        paragraphs = ParagraphStream()
+        chunks = []
+        with telemetry.context(farm_id=farm_id, sku=sku), interactive_gate.interactive():
+            for delta in self.text_generator.stream_long_description(product_data, bypass_cache):
+                chunks.append(delta)
+                for paragraph, text in paragraphs.feed(delta):
+                    on_piece(paragraph, text)
+        
+        long_description = self.text_generator.finish_long_description(''.join(chunks))
+        if not long_description:
+            raise GenerationError("Generování nevrátilo žádný popis")
+        backend.update_product(farm_id, sku, {'Description': long_description})
+        return long_description
     
     def bulk_update_products(self, products_data: List[Dict]) -> bool:
         """Hromadná aktualizace produktů"""
@@ -1,4 +1,79 @@
 import re
+from functools import lru_cache
+from typing import Iterable, List
+import numpy as np
+import pandas as pd
+
+UNKNOWN_PRODUCT = "unknown_product"
+
+# Slova odstraňovaná z názvů (i uvnitř delších slov, stejně jako dřívější str.replace)
+REMOVE_WORDS = (
+    'bio',
+    'selský',
+    'farmářský',
+    'domácí',
+    'tradiční',
+    'čerstvý',
+    'přírodní',
+    'pravý',
+    'originální',
+    'extra',
+    'premium'
+)
+SIMPLIFY_CACHE_SIZE = 131072
+
+_REMOVE_PATTERN = re.compile('|'.join(map(re.escape, REMOVE_WORDS)))
+# Velikost/hmotnost (např. "1 kg", "500g", "5 l")
+_WEIGHT_PATTERN = re.compile(r'\s*\d+\s*[kgl][gl]?\b')
+_SPACES_PATTERN = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=SIMPLIFY_CACHE_SIZE)
+def _simplify(product_name: str) -> str:
+    name = _REMOVE_PATTERN.sub('', product_name.lower())
+    name = _WEIGHT_PATTERN.sub('', name)
+    return _SPACES_PATTERN.sub(' ', name).strip()
+
+
+def simplify_product_name(product_name: str, alt_name: str = None) -> str:
+    """
+    Zjednodušený název produktu bez přívlastků a hmotnosti (sdílený všemi procesory názvů).
+
+    Jeden předkompilovaný výraz místo postupného str.replace každého slova;
+    výsledky se pamatují (LRU), protože se stejný název zjednodušuje pro
+    krátký i dlouhý prompt a pro klíč hromadného generování.
+    """
+    # Použití alternativního názvu, pokud je k dispozici
+    if alt_name:
+        product_name = alt_name
+
+    # Kontrola prázdného nebo neplatného názvu
+    if not product_name or not isinstance(product_name, str):
+        return UNKNOWN_PRODUCT
+
+    return _simplify(product_name)
+
+
+def simplify_many(names: Iterable) -> List[str]:
+    """
+    Zjednodušení celého sloupce názvů (import katalogu, hledání duplicit).
+
+    Stejný výsledek jako simplify_product_name pro každý název, ale
+    vektorově přes pandas a každý různý název jen jednou.
+    """
+    codes, uniques = pd.factorize(pd.Series(list(names), dtype=object))
+    uniques = pd.Series(uniques, dtype=object)
+    valid = uniques.str.len() > 0  # jen neprázdné řetězce
+
+    simplified = pd.Series(UNKNOWN_PRODUCT, index=uniques.index, dtype=object)
+    simplified[valid] = (uniques[valid].str.lower()
+                         .str.replace(_REMOVE_PATTERN, '', regex=True)
+                         .str.replace(_WEIGHT_PATTERN, '', regex=True)
+                         .str.replace(_SPACES_PATTERN, ' ', regex=True)
+                         .str.strip())
+    # Chybějící hodnoty (None, NaN) mají kód -1 - ukazuje na přidaný poslední prvek
+    return np.append(simplified.to_numpy(), UNKNOWN_PRODUCT)[codes].tolist()
+
 
 class ProductNameProcessor:
     def __init__(self):
@@ -14,43 +89,7 @@ class ProductNameProcessor:
             for_image: Pokud True, přeloží název do angličtiny pro generování obrázků
             alt_name: Alternativní název (pokud je poskytnut)
         """
-        # Použití alternativního názvu, pokud je k dispozici
-        if alt_name:
-            product_name = alt_name
-
-        # Kontrola prázdného nebo neplatného názvu
-        if not product_name or not isinstance(product_name, str):
-            return "unknown_product"
-
-        # Seznam slov k odstranění
-        remove_words = [
-            'bio', 
-            'selský', 
-            'farmářský', 
-            'domácí', 
-            'tradiční', 
-            'čerstvý',
-            'přírodní', 
-            'pravý', 
-            'originální', 
-            'extra', 
-            'premium'
-        ]
-
-        # Převedení na malá písmena pro porovnání
-        name_lower = product_name.lower()
-
-        # Odstranění přívlastků
-        for word in remove_words:
-            name_lower = name_lower.replace(word.lower(), '').strip()
-
-        # Odstranění velikosti/hmotnosti (např. "1 kg", "500g", "5 l")
-        name_lower = re.sub(r'\s*\d+\s*[kgl][gl]?\b', '', name_lower)
-
-        # Odstranění vícenásobných mezer
-        simplified_name = ' '.join(name_lower.split())
-
-        return simplified_name
+        return simplify_product_name(product_name, alt_name)
 
     def validate_product_name(self, name: str) -> bool:
         """Validace názvu produktu."""
@@ -0,0 +1,419 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Optional
+import httpx
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(body: Dict) -> int:
+    """
+    Odhad spotřeby tokenů požadavku: prompt (~3 znaky na token u češtiny)
+    plus rezerva na odpověď (max_tokens). Po odpovědi se odhad opraví
+    podle skutečného usage.
+    """
+    prompt_chars = 0
+    messages = body.get('messages') or []
+    for message in messages:
+        content = message.get('content') if isinstance(message, dict) else None
+        if isinstance(content, str):
+            prompt_chars += len(content)
+    return prompt_chars // 3 + 4 * len(messages) + int(body.get('max_tokens') or 256)
+
+
+class TokenBucketStore:
+    """
+    Dva token buckety (požadavky/min a tokeny/min) sdílené mezi procesy.
+
+    Stav je v malé SQLite tabulce; rezervace probíhá v transakci
+    BEGIN IMMEDIATE, takže se workery navzájem nepředbíhají. Prázdná cesta
+    = stav jen v paměti procesu. Limit 0 daný bucket vypíná.
+    """
+
+    def __init__(self, path: str = None, rpm: int = None, tpm: int = None):
+        self.path = Config.OPENAI_LIMITER_PATH if path is None else path
+        self.rpm = Config.OPENAI_RPM_LIMIT if rpm is None else rpm
+        self.tpm = Config.OPENAI_TPM_LIMIT if tpm is None else tpm
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Pokusí se rezervovat jeden požadavek a `tokens` tokenů.
+
+        Returns:
+            0 při úspěchu, jinak počet sekund, po kterých má smysl to zkusit znovu
+        """
+        if not self.rpm and not self.tpm:
+            return 0.0
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+        with self._transaction() as conn:
+            now = time.time()
+            state = self._load(conn, now)
+            if state['blocked_until'] > now:
+                return state['blocked_until'] - now
+
+            wait = 0.0
+            if self.rpm and state['requests'] < 1:
+                wait = max(wait, (1 - state['requests']) * 60.0 / self.rpm)
+            if self.tpm and state['tokens'] < tokens:
+                wait = max(wait, (tokens - state['tokens']) * 60.0 / self.tpm)
+            if wait == 0.0:
+                state['requests'] -= 1
+                state['tokens'] -= tokens
+            self._store(conn, state, now)
+            return wait
+
+    def adjust(self, tokens: int) -> None:
+        """Opraví odhad po odpovědi (kladné = dočerpat, záporné = vrátit)"""
+        if not self.tpm or not tokens:
+            return
+        with self._transaction() as conn:
+            now = time.time()
+            state = self._load(conn, now)
+            state['tokens'] -= tokens
+            self._store(conn, state, now)
+
+    def block(self, seconds: float) -> None:
+        """Po 429 pozastaví požadavky všech workerů na zadanou dobu"""
+        with self._transaction() as conn:
+            now = time.time()
+            state = self._load(conn, now)
+            state['blocked_until'] = max(state['blocked_until'], now + seconds)
+            self._store(conn, state, now)
+
+    def _load(self, conn: sqlite3.Connection, now: float) -> Dict:
+        rows = {name: (level, updated) for name, level, updated in conn.execute('SELECT name, level, updated FROM limiter')}
+        state = {'blocked_until': rows.get('blocked_until', (0.0, now))[0]}
+        for name, capacity in (('requests', self.rpm), ('tokens', self.tpm)):
+            level, updated = rows.get(name, (capacity, now))
+            # Doplnění bucketu za uplynulý čas (kapacita = limit za minutu)
+            state[name] = min(capacity, level + (now - updated) * capacity / 60.0)
+        return state
+
+    def _store(self, conn: sqlite3.Connection, state: Dict, now: float) -> None:
+        conn.executemany('INSERT OR REPLACE INTO limiter (name, level, updated) VALUES (?, ?, ?)',
+                         [(name, level, now) for name, level in state.items()])
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path or ':memory:', timeout=10, check_same_thread=False,
+                                   isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS limiter (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD řízení počtu souběžných požadavků v procesu.
+
+    Po úspěšném požadavku limit roste o 1/limit (zhruba +1 za kolo),
+    po 429 nebo skoku latence se limit zmenší na polovinu - nejvýše
+    jednou za `cooldown` sekund, aby jedna vlna chyb limit nesrazila na 1.
+    Latence se porovnává normalizovaná na max_tokens požadavku.
+    """
+
+    def __init__(self, initial: int = None, minimum: int = 1, maximum: int = None,
+                 latency_factor: float = 3.0, cooldown: float = 2.0):
+        self.minimum = minimum
+        self.maximum = Config.OPENAI_CONCURRENCY_MAX if maximum is None else maximum
+        self.limit = float(Config.OPENAI_CONCURRENCY_INITIAL if initial is None else initial)
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.active = 0
+        self.baseline = None  # EWMA normalizované latence
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.active < int(self.limit):
+                self.active += 1
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Počká na volný slot; False pokud se neuvolní do timeout sekund"""
+        expires = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.active >= int(self.limit):
+                if expires is not None and time.monotonic() >= expires:
+                    return False
+                self._cond.wait(0.5 if expires is None else min(0.5, max(expires - time.monotonic(), 0)))
+            self.active += 1
+            return True
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> bool:
+        expires = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire():
+            if expires is not None and time.monotonic() >= expires:
+                return False
+            await asyncio.sleep(0.05)
+        return True
+
+    def release(self, latency: Optional[float], max_tokens: int, throttled: bool = False) -> None:
+        with self._cond:
+            self.active -= 1
+            normalized = latency / max(max_tokens, 1) if latency is not None else None
+            if throttled:
+                self._decrease('429')
+            elif normalized is not None and self.baseline and normalized > self.latency_factor * self.baseline:
+                self._decrease('latence')
+            elif normalized is not None:
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+                self.baseline = normalized if self.baseline is None else 0.9 * self.baseline + 0.1 * normalized
+            self._cond.notify_all()
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit / 2)
+        self.decreases += 1
+        logger.info(f'OpenAI souběžnost snížena na {int(self.limit)} ({reason})')
+
+    def to_dict(self) -> Dict:
+        with self._cond:
+            return {'limit': int(self.limit), 'active': self.active, 'decreases': self.decreases}
+
+
+class OpenAIGovernor:
+    """Společné řízení všech volání OpenAI: rate limit (sdílený) a adaptivní souběžnost"""
+
+    def __init__(self, bucket: TokenBucketStore = None, concurrency: AdaptiveConcurrency = None):
+        self.bucket = bucket or TokenBucketStore()
+        self.concurrency = concurrency or AdaptiveConcurrency()
+        self.throttled = 0
+        self.waited = 0.0
+
+    def before(self, body: Dict, timeout: Optional[float] = None) -> int:
+        """
+        Počká na volný slot a rezervu v bucketech; vrací rezervované tokeny.
+
+        Čekání je omezené timeoutem požadavku (pool timeout) - když by trvalo
+        déle, vyhodí httpx.PoolTimeout, aby požadavek nepřekročil svůj rozpočet.
+        """
+        expires = None if timeout is None else time.monotonic() + timeout
+        if not self.concurrency.acquire(timeout):
+            raise httpx.PoolTimeout('Žádný volný slot pro volání OpenAI')
+        try:
+            tokens = estimate_tokens(body)
+            while True:
+                wait = self.bucket.reserve(tokens)
+                if not wait:
+                    return tokens
+                self._check_wait(wait, expires)
+                self.waited += wait
+                time.sleep(min(wait, 1.0))
+        except BaseException:
+            self.concurrency.release(None, 0)
+            raise
+
+    async def before_async(self, body: Dict, timeout: Optional[float] = None) -> int:
+        expires = None if timeout is None else time.monotonic() + timeout
+        if not await self.concurrency.acquire_async(timeout):
+            raise httpx.PoolTimeout('Žádný volný slot pro volání OpenAI')
+        try:
+            tokens = estimate_tokens(body)
+            while True:
+                # SQLite zámek může při souběhu workerů čekat - mimo smyčku událostí
+                wait = await asyncio.to_thread(self.bucket.reserve, tokens)
+                if not wait:
+                    return tokens
+                self._check_wait(wait, expires)
+                self.waited += wait
+                await asyncio.sleep(min(wait, 1.0))
+        except BaseException:
+            self.concurrency.release(None, 0)
+            raise
+
+    def _check_wait(self, wait: float, expires: Optional[float]) -> None:
+        if expires is not None and time.monotonic() + wait > expires:
+            raise httpx.PoolTimeout(f'Rate limit OpenAI uvolní kapacitu až za {wait:.1f} s')
+
+    def after(self, body: Dict, reserved: int, latency: Optional[float], status: Optional[int],
+              used_tokens: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        throttled = status == 429
+        self.concurrency.release(latency if status and status < 400 else None,
+                                 int(body.get('max_tokens') or 256), throttled)
+        if throttled:
+            self.throttled += 1
+            self.bucket.block(retry_after or 1.0)
+            used_tokens = 0  # odmítnutý požadavek se do limitu nepočítá
+        if used_tokens is not None:
+            self.bucket.adjust(used_tokens - reserved)
+
+    async def after_async(self, body: Dict, reserved: int, latency: Optional[float], status: Optional[int],
+                          used_tokens: Optional[int] = None, retry_after: Optional[float] = None) -> None:
+        # Zápis do SQLite (block/adjust) může čekat na zámek - mimo smyčku událostí
+        await asyncio.to_thread(self.after, body, reserved, latency, status, used_tokens, retry_after)
+
+    def to_dict(self) -> Dict:
+        return {**self.concurrency.to_dict(), 'throttled': self.throttled, 'waited_seconds': round(self.waited, 1),
+                'rpm_limit': self.bucket.rpm, 'tpm_limit': self.bucket.tpm}
+
+
+def _request_body(request: httpx.Request) -> Dict:
+    try:
+        return json.loads(request.content or b'{}')
+    except (ValueError, httpx.RequestNotRead):
+        return {}
+
+
+def _governed(request: httpx.Request) -> bool:
+    # Limity účtu se týkají generování; nahrávání souborů apod. jde mimo
+    return request.method == 'POST' and request.url.path.endswith('/chat/completions')
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _pool_timeout(request: httpx.Request) -> Optional[float]:
+    return (request.extensions.get('timeout') or {}).get('pool')
+
+
+def _used_tokens(response: httpx.Response) -> Optional[int]:
+    # Streamované odpovědi nečteme - zůstane odhad
+    if response.status_code >= 400 or 'application/json' not in response.headers.get('content-type', ''):
+        return None
+    try:
+        return response.json().get('usage', {}).get('total_tokens')
+    except ValueError:
+        return None
+
+
+class _GovernedStream(httpx.SyncByteStream):
+    """Tělo streamované odpovědi - slot souběžnosti drží, dokud se stream nezavře"""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    def __iter__(self):
+        for chunk in self._stream:
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                on_close()
+
+
+class _AsyncGovernedStream(httpx.AsyncByteStream):
+    """Async varianta _GovernedStream - on_close je korutinová funkce"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            on_close, self._on_close = self._on_close, None
+            if on_close is not None:
+                await on_close()
+
+
+class GovernedTransport(httpx.BaseTransport):
+    """httpx transport, který každý požadavek pustí přes OpenAIGovernor"""
+
+    def __init__(self, transport: httpx.BaseTransport, governor: OpenAIGovernor):
+        self.transport = transport
+        self.governor = governor
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        if not _governed(request):
+            return self.transport.handle_request(request)
+        body = _request_body(request)
+        reserved = self.governor.before(body, _pool_timeout(request))
+        start = time.monotonic()
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException:
+            self.governor.after(body, reserved, None, None)
+            raise
+        if 'application/json' in response.headers.get('content-type', ''):
+            response.read()
+            self.governor.after(body, reserved, time.monotonic() - start, response.status_code,
+                                _used_tokens(response), _retry_after(response))
+        else:
+            # Stream (SSE) se čte až po návratu - požadavek běží, dokud ho klient nezavře
+            response.stream = _GovernedStream(response.stream, lambda: self.governor.after(
+                body, reserved, time.monotonic() - start, response.status_code, None, _retry_after(response)))
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncGovernedTransport(httpx.AsyncBaseTransport):
+    """Async varianta GovernedTransport"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, governor: OpenAIGovernor):
+        self.transport = transport
+        self.governor = governor
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if not _governed(request):
+            return await self.transport.handle_async_request(request)
+        body = _request_body(request)
+        reserved = await self.governor.before_async(body, _pool_timeout(request))
+        start = time.monotonic()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            await self.governor.after_async(body, reserved, None, None)
+            raise
+        if 'application/json' in response.headers.get('content-type', ''):
+            await response.aread()
+            await self.governor.after_async(body, reserved, time.monotonic() - start, response.status_code,
+                                _used_tokens(response), _retry_after(response))
+        else:
+            response.stream = _AsyncGovernedStream(response.stream, lambda: self.governor.after_async(
+                body, reserved, time.monotonic() - start, response.status_code, None, _retry_after(response)))
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+openai_governor = OpenAIGovernor()
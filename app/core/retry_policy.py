@@ -0,0 +1,145 @@
+import time
+import random
+import asyncio
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+import openai
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class DeadlineExceeded(Exception):
+    """Do časového rozpočtu požadavku se už další pokus nevejde"""
+
+
+class Deadline:
+    """Časový rozpočet jednoho požadavku (monotónní hodiny)"""
+
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+
+def is_retryable(error: Exception) -> bool:
+    """Přechodné chyby (timeout, spojení, 429, 5xx) má smysl zkusit znovu, ostatní ne"""
+    if isinstance(error, openai.RateLimitError):
+        # Vyčerpaný kredit se opakováním nespraví
+        return getattr(error, 'code', None) != 'insufficient_quota'
+    if isinstance(error, openai.APIConnectionError):  # včetně APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409) or error.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Prodleva požadovaná serverem (Retry-After / retry-after-ms) v sekundách"""
+    response = getattr(error, 'response', None)
+    if not isinstance(response, httpx.Response):
+        return None
+    headers = response.headers
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Opakování volání OpenAI v rámci časového rozpočtu (deadline).
+
+    Prodleva mezi pokusy je exponenciální s plným rozptylem (full jitter),
+    aby se souběžně selhávající požadavky nerozjely znovu naráz; pokud
+    server pošle Retry-After, čeká se aspoň tak dlouho. Každý pokus dostane
+    timeout omezený zbytkem rozpočtu. Jakmile se prodleva a minimální
+    pokus do zbytku nevejdou, opakování končí hned - volající tak nikdy
+    nečeká déle než rozpočet, ať dělá upstream cokoliv.
+    """
+
+    def __init__(self, attempts: int = None, base: float = None, cap: float = None, min_attempt: float = None):
+        self.attempts = Config.GENERATION_RETRY_ATTEMPTS if attempts is None else attempts
+        self.base = Config.GENERATION_RETRY_BASE if base is None else base
+        self.cap = Config.GENERATION_RETRY_CAP if cap is None else cap
+        self.min_attempt = Config.GENERATION_MIN_ATTEMPT if min_attempt is None else min_attempt
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.deadline_exceeded = 0
+        self.not_retryable = 0
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Prodleva před dalším pokusem (attempt = index právě selhaného pokusu)"""
+        jittered = random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+        server = retry_after(error)
+        return jittered if server is None else max(server, jittered)
+
+    def timeout(self, deadline: Deadline) -> float:
+        return min(Config.OPENAI_TIMEOUT, deadline.remaining())
+
+    def call(self, fn: Callable[[float], Any], deadline: Deadline, attempts: int = None) -> Any:
+        """Zavolá fn(timeout) s opakováním; po vyčerpání vyhodí poslední chybu"""
+        attempt = 0
+        while True:
+            self._check(deadline, attempt)
+            try:
+                return fn(self.timeout(deadline))
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline, attempts)
+                time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn: Callable[[float], Awaitable[Any]], deadline: Deadline,
+                         attempts: int = None) -> Any:
+        attempt = 0
+        while True:
+            self._check(deadline, attempt)
+            try:
+                return await fn(self.timeout(deadline))
+            except Exception as e:
+                delay = self._next_delay(attempt, e, deadline, attempts)
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        return {'retries': self.retries, 'deadline_exceeded': self.deadline_exceeded,
+                'not_retryable': self.not_retryable}
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _check(self, deadline: Deadline, attempt: int) -> None:
+        if deadline.remaining() < self.min_attempt:
+            self._count('deadline_exceeded')
+            raise DeadlineExceeded(f'Rozpočet vyčerpán po {attempt} pokusech')
+
+    def _next_delay(self, attempt: int, error: Exception, deadline: Deadline, attempts: Optional[int]) -> float:
+        """Prodleva před dalším pokusem; když další pokus nemá smysl, vyhodí chybu znovu"""
+        if not is_retryable(error):
+            self._count('not_retryable')
+            raise error
+        if attempt + 1 >= (attempts or self.attempts):
+            raise error
+        delay = self.delay(attempt, error)
+        if delay + self.min_attempt > deadline.remaining():
+            self._count('deadline_exceeded')
+            raise DeadlineExceeded(f'Další pokus se nevejde do rozpočtu (prodleva {delay:.1f} s)') from error
+        self._count('retries')
+        logger.warning(f'Přechodná chyba OpenAI, pokus {attempt + 2} za {delay:.1f} s: {str(error)}')
+        return delay
+
+
+generation_retry = RetryPolicy()
@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class FlightError(Exception):
+    """Operace, na kterou se čekalo, selhala v jiném procesu"""
+
+
+class _Call:
+    __slots__ = ('done', 'result', 'error', 'followers')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Slučování souběžných stejných operací (single-flight).
+
+    První volající s daným klíčem (leader) operaci provede, ostatní
+    souběžní volající počkají a dostanou stejný výsledek nebo výjimku.
+    Po dokončení se nic nepamatuje - pozdější volání operaci provede znovu.
+
+    V procesu stačí zámek a Event. Mezi procesy (více workerů) drží
+    leader lease v SQLite souboru a výsledek (JSON) tam zapíše; volající
+    z jiných procesů ho načtou polováním. Lease vyprší, pokud leader
+    spadne - další čekající pak operaci převezme. Prázdná cesta = jen
+    v rámci procesu.
+    """
+
+    def __init__(self, path: str = None, lease: float = None, poll_interval: float = 0.2, retain: float = 30):
+        self.path = Config.SINGLE_FLIGHT_PATH if path is None else path
+        self.lease = Config.SINGLE_FLIGHT_LEASE if lease is None else lease
+        self.poll_interval = poll_interval
+        self.retain = retain  # jak dlouho zůstane výsledek pro pomalejší čekající
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._calls = {}
+        self._conn = None
+        self._pid = None
+        self.leaders = 0
+        self.shared_local = 0
+        self.shared_remote = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Provede fn(), nebo počká na souběžné provádění se stejným klíčem.
+
+        Returns:
+            (výsledek, zda byl sdílený s jiným voláním)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+                self.shared_local += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result, shared = self._run(key, fn)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, shared or call.followers > 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leaders': self.leaders, 'shared_local': self.shared_local,
+                    'shared_remote': self.shared_remote, 'distributed': bool(self.path)}
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def _run(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        if not self.path:
+            self._count('leaders')
+            return fn(), False
+
+        flight_id = uuid.uuid4().hex
+        while True:
+            if self._acquire(key, flight_id):
+                break
+            # Vede jiný proces - čekáme na jeho výsledek
+            status, payload = self._wait_remote(key)
+            if status == 'done':
+                self._count('shared_remote')
+                return json.loads(payload), True
+            if status == 'error':
+                self._count('shared_remote')
+                raise FlightError(payload)
+            # Lease vypršel (leader spadl) - zkusíme operaci převzít
+
+        self._count('leaders')
+        try:
+            result = fn()
+        except Exception as e:
+            self._finish(key, flight_id, 'error', str(e))
+            raise
+        self._finish(key, flight_id, 'done', json.dumps(result, ensure_ascii=False))
+        return result, False
+
+    def _wait_remote(self, key: str) -> Tuple[Optional[str], Optional[str]]:
+        while True:
+            time.sleep(self.poll_interval)
+            with self._transaction() as conn:
+                row = conn.execute('SELECT status, result, expires FROM flights WHERE key = ?', (key,)).fetchone()
+            if row is None or (row[0] == 'running' and row[2] <= time.time()):
+                return None, None
+            if row[0] != 'running':
+                return row[0], row[1]
+
+    def _acquire(self, key: str, flight_id: str) -> bool:
+        """Získá lease pro klíč; False pokud operaci právě provádí jiný proces"""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute('SELECT status, expires FROM flights WHERE key = ?', (key,)).fetchone()
+            if row is not None and row[0] == 'running' and row[1] > now:
+                return False
+            conn.execute('INSERT OR REPLACE INTO flights (key, flight_id, status, result, expires) '
+                         "VALUES (?, ?, 'running', NULL, ?)", (key, flight_id, now + self.lease))
+            # Úklid dokončených letů, jejichž výsledek už nikdo nečeká
+            conn.execute("DELETE FROM flights WHERE status != 'running' AND expires < ?", (now,))
+        return True
+
+    def _finish(self, key: str, flight_id: str, status: str, payload: str) -> None:
+        try:
+            with self._transaction() as conn:
+                conn.execute('UPDATE flights SET status = ?, result = ?, expires = ? WHERE key = ? AND flight_id = ?',
+                             (status, payload, time.time() + self.retain, key, flight_id))
+        except sqlite3.Error as e:
+            # Čekající ostatních procesů operaci po vypršení lease provedou samy
+            logger.warning(f'Zápis výsledku single-flight {key} selhal: {str(e)}')
+
+    @contextmanager
+    def _transaction(self):
+        with self._db_lock:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS flights (key TEXT PRIMARY KEY, flight_id TEXT NOT NULL, '
+                         'status TEXT NOT NULL, result TEXT, expires REAL NOT NULL)')
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+
+single_flight = SingleFlight()
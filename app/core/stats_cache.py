@@ -0,0 +1,60 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable
+from app.config.config import Config
+
+
+class StatsCache:
+    """
+    Krátkodobá cache vypočtených statistik (dashboard, přehledy).
+
+    Hodnota platí nejvýše ttl sekund a zároveň jen do dalšího zápisu
+    produktů - každý zápis zvýší generaci a tím zneplatní všechny položky.
+    Jiné procesy zápis nevidí, u nich platí jen TTL.
+    """
+
+    def __init__(self, ttl: float = None, max_entries: int = 1024):
+        self.ttl = Config.DASHBOARD_STATS_TTL if ttl is None else ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # klíč -> (generace, platnost do, hodnota)
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable):
+        """Vrátí platnou hodnotu z cache, jinak ji spočítá a uloží"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] == self._generation and cached[1] > now:
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            # Výsledek spočítaný před souběžným zápisem neukládáme
+            if generation == self._generation and self.ttl > 0:
+                self._entries[key] = (generation, now + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self) -> None:
+        """Zneplatní všechny položky (volá se po zápisu produktů)"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses,
+                    'generation': self._generation}
+
+
+stats_cache = StatsCache()
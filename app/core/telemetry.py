@@ -0,0 +1,256 @@
+import os
+import json
+import time
+import heapq
+import logging
+import threading
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Union
+from flask import has_request_context, request
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)  # s
+# Cena v USD za 1M tokenů (vstup, výstup); neznámý model se nepočítá
+MODEL_PRICES = {'gpt-4o': (2.50, 10.00)}
+
+_context = ContextVar('telemetry_context', default={})
+
+
+def call_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1e6
+
+
+class Histogram:
+    """Histogram latencí s pevnými hranicemi (kumulativní počty jako u Promethea)"""
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q: float) -> Union[float, str, None]:
+        """Horní hranice koše, do kterého spadá kvantil q (odhad); '+Inf' nad posledním košem"""
+        if not self.count:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return '+Inf'  # float('inf') by jsonify zapsal jako neplatné Infinity
+
+    def to_dict(self) -> Dict:
+        cumulative, buckets = 0, []
+        for bound, count in zip(list(self.bounds) + ['+Inf'], self.counts):
+            cumulative += count
+            buckets.append([bound, cumulative])
+        return {'count': self.count, 'sum': round(self.total, 3), 'p50': self.quantile(0.5),
+                'p95': self.quantile(0.95), 'p99': self.quantile(0.99), 'buckets': buckets}
+
+
+class MetricGroup:
+    """Souhrn volání jedné skupiny (farma, endpoint nebo typ popisu)"""
+
+    def __init__(self):
+        self.calls = self.attempts = self.cache_hits = self.fallbacks = self.errors = 0
+        self.prompt_tokens = self.completion_tokens = 0
+        self.cost = 0.0
+        self.warnings = Counter()
+        self.latency = Histogram()
+
+    def add(self, event: Dict) -> None:
+        self.calls += 1
+        self.attempts += event.get('attempts', 0)
+        self.cache_hits += bool(event.get('cache_hit'))
+        self.fallbacks += bool(event.get('fallback'))
+        self.errors += bool(event.get('error'))
+        self.prompt_tokens += event.get('prompt_tokens', 0)
+        self.completion_tokens += event.get('completion_tokens', 0)
+        self.cost += event.get('cost', 0.0)
+        self.warnings.update(event.get('warnings', ()))
+        self.latency.observe(event.get('latency', 0.0))
+
+    def to_dict(self) -> Dict:
+        return {'calls': self.calls, 'attempts': self.attempts, 'cache_hits': self.cache_hits,
+                'fallbacks': self.fallbacks, 'errors': self.errors, 'prompt_tokens': self.prompt_tokens,
+                'completion_tokens': self.completion_tokens, 'cost_usd': round(self.cost, 4),
+                'warnings': dict(self.warnings), 'latency': self.latency.to_dict()}
+
+
+class Aggregates:
+    """Souhrny událostí podle farmy, endpointu a typu popisu plus nejpomalejší a nejdražší volání"""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.total = MetricGroup()
+        self.groups = {'farm': {}, 'endpoint': {}, 'type': {}}
+        self._slowest = []
+        self._expensive = []
+        self._seq = 0
+
+    def add(self, event: Dict) -> None:
+        self.total.add(event)
+        for dimension, groups in self.groups.items():
+            key = event.get(dimension) or 'other'
+            groups.setdefault(key, MetricGroup()).add(event)
+        if event.get('attempts'):  # zásahy cache do žebříčků nepatří
+            self._seq += 1
+            summary = {k: event.get(k) for k in ('ts', 'farm', 'sku', 'endpoint', 'type', 'latency',
+                                                  'prompt_tokens', 'completion_tokens', 'cost')}
+            self._push(self._slowest, event.get('latency', 0.0), summary)
+            self._push(self._expensive, event.get('cost', 0.0), summary)
+
+    def _push(self, heap: List, value: float, summary: Dict) -> None:
+        item = (value, self._seq, summary)
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif value > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def to_dict(self) -> Dict:
+        result = {'total': self.total.to_dict()}
+        for dimension, groups in self.groups.items():
+            result[f'by_{dimension}'] = {key: group.to_dict() for key, group in sorted(groups.items())}
+        result['slowest'] = [item[2] for item in sorted(self._slowest, reverse=True)]
+        result['most_expensive'] = [item[2] for item in sorted(self._expensive, reverse=True)]
+        return result
+
+
+class GenerationCall:
+    """
+    Měření jednoho logického volání generátoru (včetně opakování).
+
+    Používá se jako context manager; při výjimce se volání zaznamená
+    s chybou a výjimka pokračuje dál.
+    """
+
+    def __init__(self, telemetry: 'Telemetry', description_type: str, model: str):
+        self.telemetry = telemetry
+        self.description_type = description_type
+        self.model = model
+        self.attempts = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated = False
+        self.cache_hit = False
+        self.fallback = False
+        self.error = None
+        self.warnings = []
+        self._start = time.monotonic()
+
+    def add_usage(self, usage) -> None:
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, 'prompt_tokens', 0) or 0
+            self.completion_tokens += getattr(usage, 'completion_tokens', 0) or 0
+
+    def __enter__(self) -> 'GenerationCall':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None and self.error is None:
+            self.error = str(exc) or exc_type.__name__
+        self.telemetry.record(self.to_event())
+
+    def to_event(self) -> Dict:
+        context = _context.get()
+        endpoint = context.get('endpoint')
+        if endpoint is None and has_request_context():
+            endpoint = request.endpoint
+        event = {'ts': round(time.time(), 3), 'farm': context.get('farm_id'), 'sku': context.get('sku'),
+                 'endpoint': endpoint, 'type': self.description_type, 'model': self.model,
+                 'latency': round(time.monotonic() - self._start, 3), 'attempts': self.attempts,
+                 'prompt_tokens': self.prompt_tokens, 'completion_tokens': self.completion_tokens,
+                 'cost': round(call_cost(self.model, self.prompt_tokens, self.completion_tokens), 6),
+                 'cache_hit': self.cache_hit, 'fallback': self.fallback, 'estimated': self.estimated,
+                 'warnings': self.warnings, 'error': self.error}
+        # Kompaktní záznam: prázdné a nulové hodnoty se vynechají
+        return {key: value for key, value in event.items() if value or key in ('latency', 'attempts')}
+
+
+class Telemetry:
+    """
+    Metriky volání OpenAI při generování popisů.
+
+    Každé volání (GenerationCall) se přičte do souhrnů procesu a zapíše jako
+    řádek JSON do lokálního logu událostí (sdílený všemi workery, při
+    překročení velikosti se rotuje na .1). Farmu, SKU a endpoint doplní
+    kontext nastavený volajícím (context()), endpoint jinak Flask požadavek.
+    Prázdná cesta logu zápis vypíná.
+    """
+
+    def __init__(self, log_path: str = None, max_bytes: int = None, top: int = 10):
+        self.log_path = Config.TELEMETRY_LOG_PATH if log_path is None else log_path
+        self.max_bytes = Config.TELEMETRY_LOG_MAX_BYTES if max_bytes is None else max_bytes
+        self.top = top
+        self._lock = threading.Lock()
+        self.aggregates = Aggregates(top)
+
+    @contextmanager
+    def context(self, **fields):
+        """Farma, SKU nebo endpoint pro volání uvnitř bloku (platí i pro async úlohy)"""
+        token = _context.set({**_context.get(), **fields})
+        try:
+            yield
+        finally:
+            _context.reset(token)
+
+    def track(self, description_type: str, model: str) -> GenerationCall:
+        return GenerationCall(self, description_type, model)
+
+    def record(self, event: Dict) -> None:
+        with self._lock:
+            self.aggregates.add(event)
+            if self.log_path:
+                self._write(event)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return self.aggregates.to_dict()
+
+    def read_log(self, since: float = 0) -> Iterator[Dict]:
+        """Události z logu (i z rotovaného souboru) novější než since"""
+        for path in (f'{self.log_path}.1', self.log_path):
+            if not self.log_path or not os.path.exists(path):
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # useknutý řádek při souběžném zápisu
+                    if event.get('ts', 0) >= since:
+                        yield event
+
+    def aggregate_log(self, since: float = 0) -> Dict:
+        """Souhrny ze všech workerů (přepočet z logu událostí)"""
+        aggregates = Aggregates(self.top)
+        for event in self.read_log(since):
+            aggregates.add(event)
+        return aggregates.to_dict()
+
+    def _write(self, event: Dict) -> None:
+        line = json.dumps(event, ensure_ascii=False, separators=(',', ':')) + '\n'
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            if self.max_bytes and os.path.exists(self.log_path) and os.path.getsize(self.log_path) > self.max_bytes:
+                os.replace(self.log_path, f'{self.log_path}.1')
+            # Jeden zápis v režimu append - řádky z různých workerů se neprolnou
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line)
+        except OSError as e:
+            logger.warning(f'Zápis telemetrie do {self.log_path} selhal: {str(e)}')
+
+
+telemetry = Telemetry()
@@ -0,0 +1,95 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Iterable, Optional
+from app.config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class TranslationStore:
+    """
+    Perzistentní slovník překladů názvů produktů do angličtiny.
+
+    Klíčem je zjednodušený český název (malými písmeny). Ukládá se do
+    SQLite souboru sdíleného mezi procesy (WAL režim), takže přežije
+    restart a překlad jednoho workeru vidí ostatní. Prázdná cesta
+    úložiště vypíná (překlady pak drží jen paměť procesu).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = Config.TRANSLATION_STORE_PATH if path is None else path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def get(self, text: str) -> Optional[str]:
+        return self.get_many([text]).get(text.lower())
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, str]:
+        """Vrátí nalezené překlady podle klíče (název malými písmeny)"""
+        keys = sorted({text.lower() for text in texts})
+        if not self.enabled or not keys:
+            return {}
+        found = {}
+        with self._lock:
+            try:
+                conn = self._connect()
+                # Po částech kvůli limitu počtu parametrů SQLite
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    placeholders = ','.join('?' * len(chunk))
+                    found.update(conn.execute(
+                        f'SELECT source, translation FROM translations WHERE source IN ({placeholders})', chunk
+                    ))
+            except sqlite3.Error as e:
+                logger.warning(f'Čtení překladů z {self.path} selhalo: {str(e)}')
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set_many(self, translations: Dict[str, str]) -> None:
+        if not self.enabled or not translations:
+            return
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.executemany('INSERT OR REPLACE INTO translations (source, translation, created_at) VALUES (?, ?, ?)',
+                                 [(source.lower(), translation, now) for source, translation in translations.items()])
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f'Zápis překladů do {self.path} selhal: {str(e)}')
+
+    def stats(self) -> Dict:
+        entries = 0
+        if self.enabled:
+            with self._lock:
+                try:
+                    entries = self._connect().execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+                except sqlite3.Error:
+                    pass
+        return {'entries': entries, 'hits': self.hits, 'misses': self.misses}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS translations ('
+                         'source TEXT PRIMARY KEY, translation TEXT NOT NULL, created_at REAL NOT NULL)')
+            conn.commit()
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+
+translation_store = TranslationStore()
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+import numpy as np
+import pandas as pd
+
+# Zakázaná slova a kmeny jejich tvarů (pády, rody, příslovce: kvalitní, jemně, lásce, ...)
+FORBIDDEN_STEMS = {
+    'textura': ('textur',),
+    'kvalita': ('kvalit',),
+    'konzistence': ('konzistenc',),
+    'vůně': ('vůn',),
+    'láska': ('lásk', 'lásc'),
+    'jemný': ('jemn',),
+    'ekologický': ('ekologick', 'ekologičt'),
+    'skvělý': ('skvěl',),
+    'ideální': ('ideáln',),
+    'úspěšný': ('úspěšn',),
+    'výrazný': ('výrazn',),
+    'křupavý': ('křupav',),
+    'krémový': ('krémov',),
+}
+# Nejdelší koncovka za kmenem (ekologick|ého, konzistenc|emi, kvalit|ního)
+MAX_SUFFIX = 5
+SHORT_MAX_LENGTH = 150
+
+_PERCENT = re.compile(r'(\d)%')
+_EXCLAMATION = re.compile(r'\s*!+')
+_SENTENCE_END = re.compile(r'[.?…](?=\s|$)')
+
+
+class ValidationResult(NamedTuple):
+    text: str
+    warnings: List[str]  # problémy, které zůstaly (např. zakázané slovo)
+    repairs: List[str]  # provedené opravy
+
+
+class OutputValidator:
+    """
+    Kontrola a oprava vygenerovaných popisů podle pravidel z promptů.
+
+    Zakázaná slova hledá jeden předkompilovaný regulární výraz (alternace
+    kmenů s omezenou koncovkou, celá slova bez ohledu na velikost písmen),
+    takže text se projde jednou a najdou se i skloňované tvary. Co jde
+    opravit deterministicky, repair() opraví bez dalšího volání OpenAI:
+    mezeru před %, vykřičníky a krátký popis delší než limit (zkrátí se
+    na konci poslední celé věty). audit() zkontroluje celý katalog farmy
+    vektorově přes pandas.
+    """
+
+    def __init__(self, forbidden_stems: Dict[str, Tuple[str, ...]] = None, short_max_length: int = SHORT_MAX_LENGTH):
+        forbidden_stems = FORBIDDEN_STEMS if forbidden_stems is None else forbidden_stems
+        self.short_max_length = short_max_length
+        self._stem_words = {stem: word for word, stems in forbidden_stems.items() for stem in stems}
+        # Delší kmeny dřív, aby vyhrály nad svými předponami
+        stems = sorted(self._stem_words, key=len, reverse=True)
+        self.forbidden_pattern = re.compile(
+            rf"(?<!\w)({'|'.join(map(re.escape, stems))})\w{{0,{MAX_SUFFIX}}}(?!\w)", re.IGNORECASE
+        )
+
+    def forbidden_words(self, text: str) -> List[str]:
+        """Zakázaná slova (základní tvar) nalezená v textu, v pořadí prvního výskytu"""
+        found = (self._stem_words[stem.lower()] for stem in self.forbidden_pattern.findall(text))
+        return list(dict.fromkeys(found))
+
+    def check(self, text: str, description_type: str) -> List[str]:
+        """Problémy textu jako kódy (short_too_long, forbidden:<slovo>, percent_format, exclamation)"""
+        warnings = []
+        if description_type == 'short' and len(text) > self.short_max_length:
+            warnings.append('short_too_long')
+        warnings.extend(f'forbidden:{word}' for word in self.forbidden_words(text))
+        if _PERCENT.search(text):
+            warnings.append('percent_format')
+        if '!' in text:
+            warnings.append('exclamation')
+        return warnings
+
+    def repair(self, text: str, description_type: str) -> ValidationResult:
+        """Opraví, co jde opravit bez nového generování; zbytek vrátí ve warnings"""
+        repairs = []
+        if _PERCENT.search(text):
+            text = _PERCENT.sub(r'\1 %', text)
+            repairs.append('percent_format')
+        if '!' in text:
+            text = _EXCLAMATION.sub('.', text)
+            repairs.append('exclamation')
+        if description_type == 'short' and len(text) > self.short_max_length:
+            trimmed = self._trim_to_sentence(text)
+            if trimmed:
+                text = trimmed
+                repairs.append('short_too_long')
+        return ValidationResult(text, self.check(text, description_type), repairs)
+
+    def _trim_to_sentence(self, text: str) -> str:
+        """Text do konce poslední celé věty v limitu ('' pokud první věta limit přesahuje)"""
+        end = 0
+        for match in _SENTENCE_END.finditer(text, 0, self.short_max_length):
+            end = match.end()
+        return text[:end].rstrip()
+
+    def audit(self, products: Iterable[Dict]) -> pd.DataFrame:
+        """
+        Kontrola popisů všech produktů jedním průchodem nad sloupci.
+
+        Vrací řádek na produkt: sku, name, is_confirmed, short_length
+        a příznaky problémů; forbidden je seznam nalezených zakázaných slov.
+        Produkty bez popisů se kontrolují jako prázdný text.
+        """
+        columns = ['Shop SKU', 'Name', 'is_confirmed', 'Short Description', 'Description']
+        frame = pd.DataFrame(list(products), columns=columns)
+        short = frame['Short Description'].fillna('').astype(str)
+        text = short + '\n' + frame['Description'].fillna('').astype(str)
+
+        report = pd.DataFrame({
+            'sku': frame['Shop SKU'],
+            'name': frame['Name'],
+            'is_confirmed': frame['is_confirmed'].eq(True),
+            'short_length': short.str.len(),
+        })
+        report['short_too_long'] = report['short_length'] > self.short_max_length
+        report['percent_format'] = text.str.contains(r'\d%', regex=True)
+        report['exclamation'] = text.str.contains('!', regex=False)
+
+        # Všechny výskyty všech slov naráz, pak seskupení zpět po produktech
+        matches = text.str.findall(self.forbidden_pattern).explode().dropna().str.lower().map(self._stem_words)
+        found = matches.groupby(level=0, sort=False).unique().reindex(report.index)
+        report['forbidden'] = [list(words) if isinstance(words, np.ndarray) else [] for words in found]
+
+        report['ok'] = ~(report['short_too_long'] | report['percent_format'] | report['exclamation']
+                         | report['forbidden'].astype(bool))
+        return report
+
+
+def audit_summary(report: pd.DataFrame) -> Dict:
+    """Počty problémů z auditu (pro API a dashboard)"""
+    forbidden = report['forbidden'].explode().dropna().value_counts()
+    return {
+        'products': int(len(report)),
+        'ok': int(report['ok'].sum()),
+        'short_too_long': int(report['short_too_long'].sum()),
+        'percent_format': int(report['percent_format'].sum()),
+        'exclamation': int(report['exclamation'].sum()),
+        'forbidden': {word: int(count) for word, count in forbidden.items()},
+    }
+
+
+output_validator = OutputValidator()
@@ -1,31 +1,219 @@
-import re
-import time
+import json
 import logging
-import httpx
-from typing import Dict
-from openai import OpenAI
+import asyncio
+from typing import Dict, Iterator, List, Optional, Tuple
 from app.config.config import Config
+from app.core.openai_clients import openai_clients
 from app.core.product_name_processor import ProductNameProcessor
+from app.core.llm_cache import llm_cache, request_key
+from app.core.retry_policy import Deadline, generation_retry
+from app.core.telemetry import telemetry, GenerationCall
+from app.generators.output_validator import output_validator
 
 logger = logging.getLogger(__name__)
 
-class ValidationError(Exception):
-    pass
+MODEL = "gpt-4o"
 
 class GenerationError(Exception):
     pass
 
+class ParagraphStream:
+    """
+    Průběžné dělení streamovaného textu na odstavce (oddělovač prázdný řádek).
+
+    feed() vrací kousky textu s indexem odstavce, do kterého patří, takže
+    klient může formátovat stejně jako _format_long_description ještě
+    před koncem generování.
+    """
+
+    def __init__(self):
+        self.paragraph = 0
+        self._pending = ''
+
+    def feed(self, delta: str) -> List[Tuple[int, str]]:
+        text = self._pending + delta
+        self._pending = ''
+        pieces = []
+        while True:
+            split = text.find('\n\n')
+            if split == -1:
+                break
+            if text[:split]:
+                pieces.append((self.paragraph, text[:split]))
+            self.paragraph += 1
+            text = text[split + 2:]
+        # Osamocený konec řádku může být první půlkou oddělovače
+        if text.endswith('\n'):
+            text, self._pending = text[:-1], '\n'
+        if text:
+            pieces.append((self.paragraph, text))
+        return pieces
+
+
 class TextGenerator:
     def __init__(self):
-        http_client = httpx.Client()
-        self.client = OpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            http_client=http_client
-        )
+        # Sdílený klient s poolem spojení - nový klient by znamenal nový TLS handshake.
+        # Opakování řídí RetryPolicy v rámci rozpočtu požadavku, ne SDK.
+        self.client = openai_clients.client().with_options(max_retries=0)
         self.name_processor = ProductNameProcessor()
+        self.cache = llm_cache
+        self.retry_policy = generation_retry
+        self.telemetry = telemetry
+        self.validator = output_validator
         
-    def generate_short_description(self, product_data: Dict) -> str:
+    def generate_short_description(self, product_data: Dict, bypass_cache: bool = False,
+                                   deadline: Deadline = None) -> str:
         """Generování krátkého popisu s upraveným názvem produktu."""
+        combined = None if bypass_cache else self._combined_cached(product_data)
+        if combined is not None:
+            with self.telemetry.track('short', MODEL) as call:
+                call.cache_hit = True
+                return self._repair_output(combined[0], 'short', call)
+        prompt = self._build_short_prompt(product_data)
+        return self._retry_generation(product_data, prompt, max_tokens=200, description_type='short',
+                                      bypass_cache=bypass_cache, deadline=deadline)
+        
+    def generate_long_description(self, product_data: Dict, bypass_cache: bool = False,
+                                  deadline: Deadline = None) -> str:
+        """Generování dlouhého popisu s upraveným názvem produktu."""
+        combined = None if bypass_cache else self._combined_cached(product_data)
+        if combined is not None:
+            with self.telemetry.track('long', MODEL) as call:
+                call.cache_hit = True
+                return self._format_long_description(self._repair_output(combined[1], 'long', call))
+        prompt = self._build_long_prompt(product_data)
+        text = self._retry_generation(product_data, prompt, max_tokens=1000, description_type='long',
+                                      bypass_cache=bypass_cache, deadline=deadline)
+        return self._format_long_description(text)
+    
+    def stream_long_description(self, product_data: Dict, bypass_cache: bool = False) -> Iterator[str]:
+        """
+        Streamované generování dlouhého popisu - vrací kousky surového textu.
+        
+        Výsledek z LLM cache (i z kombinovaného záznamu, viz _combined_cached)
+        se vrátí najednou. Když stream selže před prvním
+        kouskem (nebo nevrátí žádný text), použije se běžné generování
+        s opakováním ve zbytku rozpočtu. Fallback popis se nevrací - pokud
+        se popis vygenerovat nepodaří, vyhodí se GenerationError, aby volající
+        nepřepsal uložený popis zástupným textem. Opravu a formátování do
+        HTML (finish_long_description) dělá volající.
+        """
+        request = self._chat_request(self._build_long_prompt(product_data), max_tokens=1000)
+        deadline = Deadline(Config.GENERATION_DEADLINE)
+        chunks = []
+        combined = None if bypass_cache else self._combined_cached(product_data)
+        if combined is not None:
+            with self.telemetry.track('stream', request['model']) as call:
+                call.cache_hit = True
+            yield combined[1]
+            return
+        
+        with self.telemetry.track('stream', request['model']) as call:
+            key, cached = self._cache_lookup(request, bypass_cache)
+            if cached is not None:
+                call.cache_hit = True
+                yield cached
+                return
+            
+            try:
+                call.attempts += 1
+                stream = self.client.chat.completions.create(**request, stream=True,
+                                                             timeout=self.retry_policy.timeout(deadline))
+                for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        chunks.append(delta)
+                        yield delta
+            except Exception as e:
+                if chunks:
+                    raise GenerationError(f"Streamování popisu přerušeno: {str(e)}")
+                call.error = str(e)
+            else:
+                text = ''.join(chunks).strip()
+                if not text:
+                    call.error = 'Stream nevrátil žádný text'
+                # Stream nevrací usage - tokeny se odhadnou z délky textu
+                call.estimated = True
+                call.prompt_tokens = sum(len(message['content']) for message in request['messages']) // 3
+                call.completion_tokens = len(text) // 3
+                # Odeslané kousky už opravit nejde - opraví se až hotový popis (finish_long_description)
+                if text:
+                    call.warnings = self._validate_output(text, 'long')
+                    self.cache.set(key, text, model=request['model'])
+                    return
+        
+        logger.error(f"Streamování selhalo, generuji bez streamu: {call.error}")
+        yield self._retry_generation(product_data, request['messages'][1]['content'], max_tokens=1000,
+                                     description_type='long', bypass_cache=bypass_cache, deadline=deadline,
+                                     fallback=False)
+    
+    def generate_descriptions(self, product_data: Dict, bypass_cache: bool = False) -> Dict[str, str]:
+        """
+        Generování krátkého i dlouhého popisu jedním voláním s JSON odpovědí.
+        
+        Kontext produktu a farmy se posílá jen jednou. Pokud odpověď nejde
+        zpracovat (nebo je kombinovaný režim vypnutý), použijí se dvě
+        samostatná volání. Kombinované volání má vlastní časový rozpočet
+        (GENERATION_DEADLINE) a obě samostatná volání sdílí další - pomalé
+        kombinované volání tak nespotřebuje čas, který potřebuje záložní
+        cesta. Co se do rozpočtu nevejde, nahradí fallback popis.
+        """
+        if Config.COMBINED_GENERATION:
+            deadline = Deadline(Config.GENERATION_DEADLINE)
+            request = self._chat_request(self._build_combined_prompt(product_data), max_tokens=1200, json_mode=True)
+            with self.telemetry.track('combined', request['model']) as call:
+                key, cached = self._cache_lookup(request, bypass_cache)
+                call.cache_hit = cached is not None
+                try:
+                    text = cached
+                    if text is None:
+                        text = self._complete(request, self.retry_policy.timeout(deadline), call)
+                    result = self._parse_combined(text, call)
+                    if result is not None:
+                        if cached is None:  # zápis by zásahu vynuloval stáří i počet zásahů
+                            self.cache.set(key, text, model=request['model'])
+                        return result
+                    call.error = 'neplatný formát odpovědi'
+                    logger.warning("Kombinovaná odpověď nemá očekávaný formát, generuji popisy zvlášť")
+                except Exception as e:
+                    call.error = str(e)
+                    logger.error(f"Chyba při kombinovaném generování, generuji popisy zvlášť: {str(e)}")
+        
+        deadline = Deadline(Config.GENERATION_DEADLINE)
+        return {
+            'short_description': self.generate_short_description(product_data, bypass_cache, deadline),
+            'long_description': self.generate_long_description(product_data, bypass_cache, deadline)
+        }
+    
+    def _combined_cached(self, product_data: Dict) -> Optional[Tuple[str, str]]:
+        """
+        Surový krátký a dlouhý popis z kombinovaného záznamu v LLM cache (None, pokud chybí).
+        
+        Předgenerování i generate_descriptions plní jen kombinovaný záznam -
+        generování jednotlivých popisů a stream ho tak použijí bez volání OpenAI.
+        """
+        if not Config.COMBINED_GENERATION:
+            return None
+        request = self._chat_request(self._build_combined_prompt(product_data), max_tokens=1200, json_mode=True)
+        key = request_key(request)
+        # contains() nepočítá minutí - běžná cesta bez kombinovaného záznamu statistiky nezkreslí
+        if not self.cache.contains(key):
+            return None
+        text = self.cache.get(key)
+        return None if text is None else self._combined_fields(text)
+    
+    def descriptions_cached(self, product_data: Dict) -> bool:
+        """Zda by generate_descriptions vrátil oba popisy z LLM cache (bez volání OpenAI)"""
+        def cached(prompt: str, max_tokens: int, json_mode: bool = False) -> bool:
+            return self.cache.contains(request_key(self._chat_request(prompt, max_tokens, json_mode)))
+        
+        if Config.COMBINED_GENERATION and cached(self._build_combined_prompt(product_data), 1200, json_mode=True):
+            return True
+        return (cached(self._build_short_prompt(product_data), 200)
+                and cached(self._build_long_prompt(product_data), 1000))
+    
+    def _build_short_prompt(self, product_data: Dict) -> str:
+        """Prompt pro krátký popis (se zjednodušeným názvem produktu)."""
         # Zjednodušení názvu produktu
         simplified_name = self.name_processor.simplify_product_name(
             product_data['name'],
@@ -53,10 +241,10 @@ class TextGenerator:
         
         Odpověď musí mít PŘESNĚ 1-2 věty a MAXIMÁLNĚ 150 znaků.
         """
-        return self._retry_generation(product_data, prompt, max_tokens=200, description_type='short')
+        return prompt
         
-    def generate_long_description(self, product_data: Dict) -> str:
-        """Generování dlouhého popisu s upraveným názvem produktu."""
+    def _build_long_prompt(self, product_data: Dict) -> str:
+        """Prompt pro dlouhý popis (se zjednodušeným názvem produktu)."""
         # Zjednodušení názvu produktu
         simplified_name = self.name_processor.simplify_product_name(
             product_data['name'],
@@ -88,8 +276,7 @@ class TextGenerator:
         7. Piš ve třetí osobě
         8. Všechny procentní hodnoty musí mít mezeru před znakem "%"
         """
-        text = self._retry_generation(product_data, prompt, max_tokens=1000, description_type='long')
-        return self._format_long_description(text)
+        return prompt
     
     def _create_short_description_prompt(self, product_data: Dict) -> str:
         return f"""
@@ -141,9 +328,49 @@ class TextGenerator:
         8. Všechny procentní hodnoty musí mít mezeru před znakem "%"
         """
     
-    def _generate_with_gpt4(self, prompt: str, max_tokens: int) -> str:
-        response = self.client.chat.completions.create(
-            model="gpt-4o",
+    def _generate_with_gpt4(self, prompt: str, max_tokens: int, bypass_cache: bool = False,
+                            timeout: Optional[float] = None, call: GenerationCall = None) -> str:
+        request = self._chat_request(prompt, max_tokens)
+        key, cached = self._cache_lookup(request, bypass_cache)
+        if cached is not None:
+            if call is not None:
+                call.cache_hit = True
+            return cached
+        
+        text = self._complete(request, timeout or Config.OPENAI_TIMEOUT, call)
+        if not text:
+            raise GenerationError("OpenAI vrátilo prázdný text")
+        self.cache.set(key, text, model=request['model'])
+        return text
+    
+    def _complete(self, request: Dict, timeout: float, call: GenerationCall = None) -> str:
+        """Jeden pokus o chat completion; počet pokusů a tokeny se připíšou do měřeného volání"""
+        if call is not None:
+            call.attempts += 1
+        response = self.client.chat.completions.create(**request, timeout=timeout)
+        if call is not None:
+            call.add_usage(getattr(response, 'usage', None))
+        return response.choices[0].message.content.strip()
+    
+    def _cache_lookup(self, request: Dict, bypass_cache: bool) -> Tuple[str, Optional[str]]:
+        """
+        Vyhledání požadavku v LLM cache; vrací (klíč, uložený text nebo None).
+        
+        Při bypass_cache (regenerace) se cache nečte, nová odpověď ji ale přepíše.
+        """
+        key = request_key(request)
+        if bypass_cache:
+            self.cache.record_bypass()
+            return key, None
+        text = self.cache.get(key)
+        if text is not None:
+            logger.debug(f"LLM cache zásah ({key[:12]})")
+        return key, text
+    
+    def _chat_request(self, prompt: str, max_tokens: int, json_mode: bool = False) -> Dict:
+        """Parametry chat completion požadavku (společné pro sync i async klienta)."""
+        request = dict(
+            model=MODEL,
             messages=[
                 {
                     "role": "system", 
@@ -158,8 +385,78 @@ class TextGenerator:
             max_tokens=max_tokens,
             temperature=0.7
         )
+        if json_mode:
+            request['response_format'] = {"type": "json_object"}
+        return request
+    
+    def _build_combined_prompt(self, product_data: Dict) -> str:
+        """Prompt pro oba popisy najednou s odpovědí ve formátu JSON."""
+        simplified_name = self.name_processor.simplify_product_name(
+            product_data['name'],
+            alt_name=product_data.get('alt_name', '')
+        )
+
+        return f"""
+        Napiš dva popisy produktu: krátký a detailní.
         
-        return response.choices[0].message.content.strip()
+        Název produktu: {simplified_name}
+        Charakteristika produktu: {product_data.get('ingredients', '')}
+        Informace o dodavateli/farmě: {product_data.get('farm_description', '')}
+        
+        Krátký popis (short_description):
+        PŘESNĚ 1-2 věty a MAXIMÁLNĚ 150 znaků.
+        
+        Detailní popis (long_description) ve třech odstavcích:
+        1. Věcný popis produktu s důrazem na jeho vlastnosti a kvality.
+        2. Informace o původu - MUSÍ obsahovat název farmy ({product_data['farm_name']}) 
+           a relevantní informace o farmě z pole "Informace o dodavateli/farmě".
+        3. Běžné použití a jeden neobvyklý tip na přípravu.
+        
+        Pravidla pro oba popisy:
+        1. Piš věcně a informativně
+        2. Vyhýbej se přehnanému marketingu
+        3. Nepoužívej vykřičníky
+        4. Vyhýbej se opakování slov jako:
+           textura, kvalita, konzistence, vůně, láska, jemný, ekologický,
+           skvělý, ideální, úspěšný, výrazný, křupavý, krémový
+        5. Zahrň relevantní klíčová slova pro SEO
+        6. Zachovej autentický tón
+        7. Piš ve třetí osobě
+        8. Všechny procentní hodnoty musí mít mezeru před znakem "%"
+        
+        Odpověz pouze JSON objektem:
+        {{"short_description": "...", "long_description": ["1. odstavec", "2. odstavec", "3. odstavec"]}}
+        """
+    
+    def _parse_combined(self, text: str, call: GenerationCall = None) -> Optional[Dict[str, str]]:
+        """Zpracování kombinované JSON odpovědi (s opravou obou popisů); None pokud nemá očekávaný tvar."""
+        fields = self._combined_fields(text)
+        if fields is None:
+            return None
+        short_desc = self._repair_output(fields[0], 'short', call)
+        long_desc = self._repair_output(fields[1], 'long', call)
+        return {
+            'short_description': short_desc,
+            'long_description': self._format_long_description(long_desc)
+        }
+    
+    def _combined_fields(self, text: str) -> Optional[Tuple[str, str]]:
+        """Krátký a dlouhý popis (odstavce oddělené prázdným řádkem) z kombinované odpovědi bez úprav."""
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return None
+        if not isinstance(data, dict):
+            return None
+        
+        short_desc = data.get('short_description')
+        long_desc = data.get('long_description')
+        # Odstavce dlouhého popisu jako seznam, nebo text oddělený prázdnými řádky
+        if isinstance(long_desc, list) and all(isinstance(p, str) for p in long_desc):
+            long_desc = '\n\n'.join(p.strip() for p in long_desc if p.strip())
+        if not (isinstance(short_desc, str) and short_desc.strip() and isinstance(long_desc, str) and long_desc.strip()):
+            return None
+        return short_desc.strip(), long_desc.strip()
     
     def _format_long_description(self, text: str) -> str:
         """Formátování dlouhého popisu do HTML struktury."""
@@ -175,51 +472,151 @@ class TextGenerator:
         
         return formatted_text
     
-    def _validate_output(self, text: str, description_type: str) -> bool:
-        """Validace vygenerovaného textu."""
-        if description_type == 'short':
-            if len(text) > 150:
-                logger.warning("Krátký popis je delší než 150 znaků")
-                
-        # Kontrola zakázaných slov
-        forbidden_words = [
-            'textura', 'kvalita', 'konzistence', 'vůně', 'láska',
-            'jemný', 'ekologický', 'skvělý', 'ideální', 'úspěšný',
-            'výrazný', 'křupavý', 'krémový'
-        ]
-        
-        for word in forbidden_words:
-            if word in text.lower():
-                logger.warning(f"Text obsahuje zakázané slovo: {word}")
-                
-        # Kontrola formátování procent
-        if re.search(r'\d+%', text):  # Hledá číslo následované % bez mezery
-            logger.warning("Procentní hodnoty musí mít mezeru před znakem %")
-            
-        return True
+    def finish_long_description(self, text: str) -> str:
+        """Oprava a HTML formátování dlouhého popisu poskládaného ze streamu."""
+        return self._format_long_description(self._repair_output(text.strip(), 'long'))
+    
+    def _validate_output(self, text: str, description_type: str) -> List[str]:
+        """Validace vygenerovaného textu; vrací nalezené problémy (jen pro logování a telemetrii)."""
+        warnings = self.validator.check(text, description_type)
+        if warnings:
+            logger.warning(f"Problémy {description_type} popisu: {', '.join(warnings)}")
+        return warnings
     
-    def _retry_generation(self, product_data: Dict, prompt: str, max_tokens: int, description_type: str, max_retries: int = 3) -> str:
-        """Opakování generování v případě chyby."""
-        last_error = None
-        for attempt in range(max_retries):
+    def _repair_output(self, text: str, description_type: str, call: GenerationCall = None) -> str:
+        """
+        Deterministická oprava textu (mezera před %, vykřičníky, délka krátkého popisu).
+        
+        Zbylé problémy (zakázaná slova) se jen zalogují; do telemetrie jdou
+        spolu s provedenými opravami (repaired:<kód>).
+        """
+        result = self.validator.repair(text, description_type)
+        if result.warnings:
+            logger.warning(f"Problémy {description_type} popisu: {', '.join(result.warnings)}")
+        if call is not None:
+            call.warnings = call.warnings + result.warnings + [f'repaired:{code}' for code in result.repairs]
+        return result.text
+    
+    def _retry_generation(self, product_data: Dict, prompt: str, max_tokens: int, description_type: str,
+                          max_retries: int = None, bypass_cache: bool = False, deadline: Deadline = None,
+                          fallback: bool = True) -> str:
+        """
+        Opakování generování v případě přechodné chyby.
+
+        Opakuje se jen v rámci časového rozpočtu (viz RetryPolicy). Jakmile
+        se další pokus nevejde nebo chyba opakování nemá smysl, vrátí se
+        hned fallback popis - interaktivní požadavek tak nečeká déle než
+        GENERATION_DEADLINE. S fallback=False se místo něj vyhodí GenerationError.
+        """
+        deadline = deadline or Deadline(Config.GENERATION_DEADLINE)
+        with self.telemetry.track(description_type, MODEL) as call:
             try:
-                text = self._generate_with_gpt4(prompt, max_tokens)
-                self._validate_output(text, description_type)  # Pouze pro logování varování
-                return text  # Vždy vrátíme vygenerovaný text
+                text = self.retry_policy.call(
+                    lambda timeout: self._generate_with_gpt4(prompt, max_tokens, bypass_cache, timeout, call),
+                    deadline, max_retries
+                )
             except Exception as e:
-                if isinstance(e, ValidationError):
-                    # Pokud jde o ValidationError, vrátíme text i tak
-                    return text
-                last_error = str(e)
-                logger.error(f"Neočekávaná chyba při generování: {str(e)}")
-                if attempt < max_retries - 1:  # Pokud nejsme na posledním pokusu
-                    time.sleep(2 ** attempt)
-                    continue
-        
-        # Pokud všechny pokusy selhaly kvůli jiné chybě než validaci, vrátíme fallback
-        logger.error(f"Všechny pokusy o generování selhaly. Poslední chyba: {last_error}")
-        return self._get_fallback_description(product_data)
+                call.error = str(e)
+                if not fallback:
+                    logger.error(f"Generování selhalo: {str(e)}")
+                    raise GenerationError(f"Generování selhalo: {str(e)}")
+                logger.error(f"Generování selhalo, vracím fallback popis: {str(e)}")
+                call.fallback = True
+                return self._get_fallback_description(product_data)
+            return self._repair_output(text, description_type, call)
     
     def _get_fallback_description(self, product_data: Dict) -> str:
         """Vytvoření základního popisu v případě chyby."""
-        return f"{product_data['name']} - farmářský produkt z {product_data['farm_name']}." 
\ No newline at end of file
+        return f"{product_data['name']} - farmářský produkt z {product_data['farm_name']}." 
+
+
+class AsyncTextGenerator(TextGenerator):
+    """
+    Asynchronní varianta TextGenerator pro hromadné generování.
+
+    Používá stejné prompty, validaci i formátování, ale požadavky posílá
+    přes AsyncOpenAI - jedno vlákno tak obslouží mnoho souběžných volání.
+    Na rozdíl od synchronní verze po vyčerpání pokusů nevrací fallback
+    text, ale vyhodí GenerationError (hromadná úloha produkt přeskočí).
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Vytváří se uvnitř běžící smyčky - klient je sdílený pro celou smyčku
+        self.client = openai_clients.async_client().with_options(max_retries=0)
+
+    async def generate_short_description(self, product_data: Dict, bypass_cache: bool = False,
+                                         deadline: Deadline = None) -> str:
+        prompt = self._build_short_prompt(product_data)
+        return await self._retry_generation_async(prompt, max_tokens=200, description_type='short',
+                                                  bypass_cache=bypass_cache, deadline=deadline)
+
+    async def generate_long_description(self, product_data: Dict, bypass_cache: bool = False,
+                                        deadline: Deadline = None) -> str:
+        prompt = self._build_long_prompt(product_data)
+        text = await self._retry_generation_async(prompt, max_tokens=1000, description_type='long',
+                                                  bypass_cache=bypass_cache, deadline=deadline)
+        return self._format_long_description(text)
+
+    async def generate_descriptions(self, product_data: Dict, bypass_cache: bool = False) -> Dict[str, str]:
+        """Vygeneruje oba popisy jedním voláním, při nezdaru dvěma souběžnými (každá cesta s vlastním rozpočtem)."""
+        if Config.COMBINED_GENERATION:
+            deadline = Deadline(Config.BULK_GENERATION_DEADLINE)
+            request = self._chat_request(self._build_combined_prompt(product_data), max_tokens=1200, json_mode=True)
+            with self.telemetry.track('combined', request['model']) as call:
+                key, cached = self._cache_lookup(request, bypass_cache)
+                call.cache_hit = cached is not None
+                try:
+                    text = cached
+                    if text is None:
+                        text = await self._complete_async(request, self.retry_policy.timeout(deadline), call)
+                    result = self._parse_combined(text, call)
+                    if result is not None:
+                        if cached is None:  # zápis by zásahu vynuloval stáří i počet zásahů
+                            self.cache.set(key, text, model=request['model'])
+                        return result
+                    call.error = 'neplatný formát odpovědi'
+                    logger.warning("Kombinovaná odpověď nemá očekávaný formát, generuji popisy zvlášť")
+                except Exception as e:
+                    call.error = str(e)
+                    logger.error(f"Chyba při kombinovaném generování, generuji popisy zvlášť: {str(e)}")
+
+        deadline = Deadline(Config.BULK_GENERATION_DEADLINE)
+        short_desc, long_desc = await asyncio.gather(
+            self.generate_short_description(product_data, bypass_cache, deadline),
+            self.generate_long_description(product_data, bypass_cache, deadline)
+        )
+        return {'short_description': short_desc, 'long_description': long_desc}
+
+    async def _retry_generation_async(self, prompt: str, max_tokens: int, description_type: str,
+                                      max_retries: int = None, bypass_cache: bool = False,
+                                      deadline: Deadline = None) -> str:
+        request = self._chat_request(prompt, max_tokens)
+        with self.telemetry.track(description_type, request['model']) as call:
+            key, cached = self._cache_lookup(request, bypass_cache)
+            if cached is not None:
+                call.cache_hit = True
+                return self._repair_output(cached, description_type, call)
+
+            try:
+                text = await self.retry_policy.call_async(
+                    lambda timeout: self._complete_async(request, timeout, call),
+                    deadline or Deadline(Config.BULK_GENERATION_DEADLINE), max_retries
+                )
+            except Exception as e:
+                logger.error(f"Chyba při asynchronním generování: {str(e)}")
+                raise GenerationError(f"Generování selhalo: {str(e)}")
+            # Do cache jde odpověď API, oprava se provede při každém vrácení
+            self.cache.set(key, text, model=request['model'])
+            return self._repair_output(text, description_type, call)
+
+    async def _complete_async(self, request: Dict, timeout: float, call: GenerationCall = None) -> str:
+        if call is not None:
+            call.attempts += 1
+        response = await self.client.chat.completions.create(**request, timeout=timeout)
+        if call is not None:
+            call.add_usage(getattr(response, 'usage', None))
+        return response.choices[0].message.content.strip()
+
+    async def aclose(self) -> None:
+        await openai_clients.close_async_client()
@@ -1,21 +1,22 @@
-import re
+import json
 import logging
-import httpx
-from typing import Dict, Optional
-from openai import OpenAI
+import threading
+from typing import Dict, List, Optional
 from app.config.config import Config
+from app.core.openai_clients import openai_clients
+from app.core.farm_catalog import HEADER_SKU
+from app.core.product_name_processor import UNKNOWN_PRODUCT, simplify_product_name, simplify_many
+from app.core.translation_store import translation_store
+from app.core.retry_policy import Deadline, generation_retry
+from app.core.telemetry import telemetry
 
 logger = logging.getLogger(__name__)
 
 class ProductNameProcessor:
     def __init__(self):
-        self._translation_cache = {}  # Cache pro překlady
+        self._translation_cache = {}  # Cache překladů v procesu (před sdíleným translation_store)
         self._product_type_cache = {} # Cache pro typy produktů
-        http_client = httpx.Client()
-        self.client = OpenAI(
-            api_key=Config.OPENAI_API_KEY,
-            http_client=http_client
-        )
+        self.client = openai_clients.client()
         
     def _simplify_product_name(self, product_name: str, for_image: bool = False, alt_name: str = None) -> str:
         """
@@ -26,41 +27,7 @@ class ProductNameProcessor:
             for_image: Pokud True, přeloží název do angličtiny pro generování obrázků
             alt_name: Alternativní název (pokud je poskytnut)
         """
-        # Použití alternativního názvu, pokud je k dispozici
-        if alt_name:
-            product_name = alt_name
-
-        # Kontrola prázdného nebo neplatného názvu
-        if not product_name or not isinstance(product_name, str):
-            return "unknown_product"
-
-        # Seznam slov k odstranění
-        remove_words = [
-            'bio', 
-            'selský', 
-            'farmářský', 
-            'domácí', 
-            'tradiční', 
-            'čerstvý',
-            'přírodní', 
-            'pravý', 
-            'originální', 
-            'extra', 
-            'premium'
-        ]
-
-        # Převedení na malá písmena pro porovnání
-        name_lower = product_name.lower()
-
-        # Odstranění přívlastků
-        for word in remove_words:
-            name_lower = name_lower.replace(word.lower(), '').strip()
-
-        # Odstranění velikosti/hmotnosti (např. "1 kg", "500g", "5 l")
-        name_lower = re.sub(r'\s*\d+\s*[kgl][gl]?\b', '', name_lower)
-
-        # Odstranění vícenásobných mezer
-        simplified_name = ' '.join(name_lower.split())
+        simplified_name = simplify_product_name(product_name, alt_name)
 
         # Pokud je potřeba překlad pro generování obrázků
         if for_image:
@@ -69,40 +36,134 @@ class ProductNameProcessor:
         return simplified_name
 
     def _translate_to_english(self, text: str) -> str:
-        """Překlad názvu do angličtiny s využitím cache."""
-        cache_key = text.lower()
+        """Překlad názvu do angličtiny s využitím cache a sdíleného úložiště překladů."""
+        return self.translate_many([text]).get(text.lower(), text)
+
+    def translate_many(self, texts: List[str]) -> Dict[str, str]:
+        """
+        Hromadný překlad názvů do angličtiny.
         
-        # Kontrola cache
-        if cache_key in self._translation_cache:
-            return self._translation_cache[cache_key]
+        Nejdřív se použije cache procesu a sdílené úložiště překladů, chybějící
+        názvy se přeloží po dávkách (TRANSLATION_BATCH_SIZE názvů v jednom
+        volání OpenAI s JSON odpovědí) a uloží.
         
-        try:
-            prompt = f"""
-            Přelož následující název produktu do angličtiny:
-            {text}
+        Returns:
+            Slovník název malými písmeny -> anglický překlad (nepřeložené chybí)
+        """
+        keys = sorted({text.lower() for text in texts if text})
+        result = {key: self._translation_cache[key] for key in keys if key in self._translation_cache}
+        
+        missing = [key for key in keys if key not in result]
+        stored = translation_store.get_many(missing)
+        result.update(stored)
+        self._translation_cache.update(stored)
+        
+        missing = [key for key in missing if key not in stored]
+        batch_size = Config.TRANSLATION_BATCH_SIZE
+        for start in range(0, len(missing), batch_size):
+            translated = self._translate_batch(missing[start:start + batch_size])
+            translation_store.set_many(translated)
+            self._translation_cache.update(translated)
+            result.update(translated)
+        return result
+
+    def warm_translations(self, products: List[Dict]) -> int:
+        """Předem přeloží zjednodušené názvy všech produktů katalogu; vrací počet přeložených názvů"""
+        names = set(simplify_many(product.get('Name', '') for product in products
+                                  if product.get('Shop SKU') and product.get('Shop SKU') != HEADER_SKU))
+        names.discard(UNKNOWN_PRODUCT)
+        return len(self.translate_many(list(names)))
+
+    def _translate_batch(self, names: List[str]) -> Dict[str, str]:
+        """
+        Překlad dávky názvů jedním voláním OpenAI; názvy bez platného překladu ve výsledku chybí.
+        
+        Když odpověď nejde zpracovat (neplatný nebo limitem uříznutý JSON),
+        dávka se rozpůlí a poloviny se přeloží zvlášť - jeden problematický
+        název tak nepřipraví o překlad celou dávku.
+        """
+        translations = self._request_translations(names)
+        if translations is None:
+            if len(names) == 1:
+                return {}
+            logger.warning(f"Odpověď překladu {len(names)} názvů nejde zpracovat, dělím dávku")
+            middle = len(names) // 2
+            return {**self._translate_batch(names[:middle]), **self._translate_batch(names[middle:])}
+        
+        # Jen požadované názvy s neprázdným překladem
+        requested = set(names)
+        result = {str(name).lower(): translation.strip() for name, translation in translations.items()
+                  if str(name).lower() in requested and isinstance(translation, str) and translation.strip()}
+        if len(result) < len(names):
+            logger.warning(f"Překlad vrátil {len(result)} z {len(names)} názvů")
+        return result
+
+    def _request_translations(self, names: List[str]) -> Optional[Dict]:
+        """
+        Volání OpenAI pro dávku názvů s opakováním přechodných chyb (sdílená RetryPolicy).
+        
+        Returns:
+            Slovník překladů z odpovědi, {} pokud volání selhalo, None pokud
+            odpověď není úplný JSON s překlady
+        """
+        names_json = json.dumps(names, ensure_ascii=False)
+        prompt = f"""
+            Přelož následující názvy produktů do angličtiny:
+            {names_json}
             
             Pravidla pro překlad:
             1. Použij běžné anglické názvy pro potraviny
             2. Zachovej pouze základní název bez přívlastků
-            3. Odpověz pouze překladem, nic jiného nepřidávej
+            3. Odpověz JSON objektem {{"translations": {{"<název>": "<překlad>"}}}} se všemi názvy
             """
+        
+        with telemetry.track('translation', "gpt-4o") as call:
+            def attempt(timeout: float):
+                call.attempts += 1
+                return self.client.chat.completions.create(
+                    model=call.model,
+                    messages=[
+                        {"role": "system", "content": "Jsi překladatel názvů potravin."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    # Odpověď opakuje každý název jako klíč a přidá překlad - limit roste s délkou vstupu
+                    # (znak na token pokryje klíč i překlad, česká diakritika se tokenizuje hůř)
+                    max_tokens=len(names_json) + 10 * len(names) + 50,
+                    temperature=0.1,
+                    response_format={"type": "json_object"},
+                    timeout=timeout
+                )
             
-            response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "Jsi překladatel názvů potravin."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=50,
-                temperature=0.1
-            )
-            
-            translated_name = response.choices[0].message.content.strip()
-            
-            # Uložení do cache
-            self._translation_cache[cache_key] = translated_name
-            return translated_name
+            try:
+                response = generation_retry.call(attempt, Deadline(Config.GENERATION_DEADLINE))
+            except Exception as e:
+                logger.error(f"Chyba při překladu {len(names)} názvů: {str(e)}")
+                call.error = str(e)
+                return {}
             
+            call.add_usage(getattr(response, 'usage', None))
+            choice = response.choices[0]
+            try:
+                if getattr(choice, 'finish_reason', None) == 'length':
+                    raise ValueError('odpověď uřízl limit max_tokens')
+                translations = json.loads(choice.message.content).get('translations')
+                if not isinstance(translations, dict):
+                    raise ValueError('odpověď nemá objekt translations')
+            except (TypeError, ValueError, AttributeError) as e:
+                call.error = f'Neplatná odpověď překladu: {str(e)}'
+                return None
+        return translations
+
+
+def warm_translations_in_background(products: List[Dict]) -> threading.Thread:
+    """Spustí předběžný překlad názvů katalogu na pozadí (import nečeká na OpenAI)"""
+    def run():
+        try:
+            count = ProductNameProcessor().warm_translations(products)
+            logger.info(f"Úložiště překladů připraveno pro {count} názvů")
         except Exception as e:
-            logger.error(f"Chyba při překladu: {str(e)}")
-            return text 
\ No newline at end of file
+            logger.error(f"Předběžný překlad názvů selhal: {str(e)}", exc_info=True)
+    
+    thread = threading.Thread(target=run, name='translation-warmup', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,31 @@
+import os
+import sys
+from app.core.farm_catalog import catalog_store
+from app.core.catalog_binary import BINARY_SUFFIX, dump_catalog, load_catalog
+
+def convert_farm_catalogs(target='bin', farm_ids=None):
+    """
+    Převede katalogy farem mezi JSON a binárním formátem.
+
+    target='bin' zapíše <farm_id>.catalog.bin vedle JSON katalogu (včetně
+    úprav ze žurnálu), target='json' obnoví JSON katalog z binárního souboru.
+    """
+    base_dir = catalog_store.base_dir
+
+    for farm_id in farm_ids or sorted(os.listdir(base_dir)):
+        bin_path = os.path.join(base_dir, farm_id, f'{farm_id}{BINARY_SUFFIX}')
+
+        if target == 'bin':
+            if not catalog_store.exists(farm_id):
+                continue
+            dump_catalog(catalog_store.get(farm_id), bin_path)
+            json_size = os.path.getsize(catalog_store.catalog_path(farm_id))
+            print(f"Farma {farm_id}: {json_size} B JSON -> {os.path.getsize(bin_path)} B binárně")
+        else:
+            if not os.path.exists(bin_path):
+                continue
+            catalog_store.save(farm_id, load_catalog(bin_path))
+            print(f"Farma {farm_id}: JSON katalog obnoven z {bin_path}")
+
+if __name__ == '__main__':
+    convert_farm_catalogs(sys.argv[1] if len(sys.argv) > 1 else 'bin', sys.argv[2:])
@@ -0,0 +1,35 @@
+import os
+import sys
+from app import create_app
+from app.core.models import Farm
+from app.core.farm_catalog import catalog_store
+from app.core.catalog_backends import SqlCatalogBackend
+
+def migrate_farm_catalogs(farm_ids=None):
+    """Jednorázově nahraje JSON katalogy farem (včetně žurnálu) do tabulky product"""
+    backend = SqlCatalogBackend()
+    base_dir = catalog_store.base_dir
+    migrated = 0
+
+    for farm_id in farm_ids or sorted(os.listdir(base_dir)):
+        if not catalog_store.exists(farm_id):
+            continue
+
+        if not Farm.query.filter_by(farm_id=farm_id).first():
+            print(f"Farma {farm_id} nemá záznam v databázi, přeskakuji.")
+            continue
+
+        print(f"Nahrávám katalog farmy {farm_id}...")
+        farm_data = catalog_store.get(farm_id)
+        backend.save_catalog(farm_id, farm_data)
+        count = backend.count_products(farm_id)
+        print(f"Farma {farm_id}: {count} produktů v databázi.")
+        migrated += 1
+
+    print(f"Hotovo, převedeno {migrated} katalogů. Pro přepnutí nastavte CATALOG_BACKEND=sql.")
+    return migrated
+
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        migrate_farm_catalogs(sys.argv[1:])
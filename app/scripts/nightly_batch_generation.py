@@ -0,0 +1,48 @@
+import sys
+import time
+from app import create_app
+from app.core.models import Farm
+from app.core.catalog_backends import get_catalog_backend
+from app.core.batch_generation import batch_generation, ACTIVE_STATES
+
+POLL_INTERVAL = 60
+
+
+def nightly_batch_generation(farm_ids=None, overwrite=False, wait=False):
+    """
+    Dávkové (Batch API) generování popisů farem - spouští se z cronu.
+
+    Každé spuštění posune rozpracované běhy (odeslání, stažení a import
+    výsledků) a farmám bez rozpracovaného běhu připraví a odešle nový.
+    S wait=True čeká, dokud všechny běhy neskončí.
+    """
+    backend = get_catalog_backend()
+    farm_ids = farm_ids or [farm.farm_id for farm in Farm.query.filter_by(is_active=True).order_by(Farm.farm_id)]
+    states = {}
+
+    for farm_id in farm_ids:
+        if not backend.exists(farm_id):
+            print(f"Farma {farm_id} nemá katalog, přeskakuji.")
+            continue
+        state = batch_generation.state(farm_id)
+        if state is None or state['status'] not in ACTIVE_STATES:
+            state = batch_generation.prepare(farm_id, backend, overwrite=overwrite)
+            print(f"Farma {farm_id}: připraveno {state['total']} požadavků.")
+        states[farm_id] = batch_generation.advance(farm_id, backend)
+
+    while wait and any(state['status'] in ACTIVE_STATES for state in states.values()):
+        time.sleep(POLL_INTERVAL)
+        for farm_id, state in states.items():
+            if state['status'] in ACTIVE_STATES:
+                states[farm_id] = batch_generation.advance(farm_id, backend)
+
+    for farm_id, state in states.items():
+        print(f"Farma {farm_id}: {state['status']}, hotovo {state['done']}/{state['total']}, "
+              f"chyb {len(state['failed'])}")
+    return states
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    app = create_app()
+    with app.app_context():
+        nightly_batch_generation(args, overwrite='--overwrite' in sys.argv, wait='--wait' in sys.argv)
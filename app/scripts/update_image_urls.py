@@ -1,18 +1,16 @@
 import os
-import json
+from app.core.farm_catalog import catalog_store
 
 def update_image_urls():
     """Aktualizuje URL obrázků v JSON souborech na kompletní URL"""
-    base_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'farms')
+    base_dir = catalog_store.base_dir
     
     for farm_id in os.listdir(base_dir):
-        json_path = os.path.join(base_dir, farm_id, f'{farm_id}.json')
-        if os.path.exists(json_path):
+        if catalog_store.exists(farm_id):
             print(f"Zpracovávám farmu {farm_id}...")
             
-            # Načtení JSON souboru
-            with open(json_path, 'r', encoding='utf-8') as f:
-                farm_data = json.load(f)
+            # Načtení katalogu včetně neskompaktovaných úprav ze žurnálu
+            farm_data = catalog_store.get(farm_id)
             
             # Aktualizace URL obrázků
             for product in farm_data.get('products', []):
@@ -25,9 +23,8 @@ def update_image_urls():
                         new_url = f"http://161.35.70.99/products/{farm_id}_images/{filename}"
                         product['mirakl_image_1'] = new_url
             
-            # Uložení aktualizovaného JSONu
-            with open(json_path, 'w', encoding='utf-8') as f:
-                json.dump(farm_data, f, ensure_ascii=False, indent=2)
+            # Uložení aktualizovaného JSONu (žurnál se tím zapracuje)
+            catalog_store.save(farm_id, farm_data)
             
             print(f"Farma {farm_id} byla aktualizována.")
 
@@ -2,6 +2,11 @@
 let selectedFarmId = null;
 let products = [];
 let socket = null;
+let productStats = { total: 0, confirmed: 0 };
+let nextAfterSku = null;
+const PAGE_SIZE = 50;
+// Běžící streamy dlouhých popisů (stream_id -> stav)
+const activeStreams = {};
 
 // Inicializace při načtení stránky
 document.addEventListener('DOMContentLoaded', () => {
@@ -33,6 +38,15 @@ function initializeSocket() {
             updateContent(product_index, type, content);
         });
         
+        // Průběh hromadného generování farmy
+        socket.on('bulk_product', handleBulkProduct);
+        socket.on('bulk_status', updateBulkStatus);
+        
+        // Streamované generování dlouhého popisu
+        socket.on('long_description_delta', handleLongDescriptionDelta);
+        socket.on('long_description_done', (data) => finishLongDescriptionStream(data.stream_id, data.long_description));
+        socket.on('long_description_error', (data) => finishLongDescriptionStream(data.stream_id, null, data.error));
+        
         socket.on('error', (data) => {
             const { product_index, type, message } = data;
             handleError(product_index, type, message);
@@ -62,6 +76,7 @@ function initializeFarmSelector() {
         
         if (selectedFarmId) {
             console.log('Začínám načítat produkty pro nově vybranou farmu');
+            joinFarm(selectedFarmId);
             await loadProducts(selectedFarmId);
         } else {
             console.log('Žádná farma není vybrána, mažu produkty');
@@ -76,24 +91,32 @@ function initializeFarmSelector() {
         console.log('Farma je předvybraná v URL:', farmId);
         farmSelect.value = farmId;
         if (farmId) {
+            selectedFarmId = farmId;
+            joinFarm(farmId);
             loadProducts(farmId);
         }
     }
 }
 
-// Načtení produktů
+// Načtení produktů (první stránka)
 async function loadProducts(farmId) {
     console.log('Začínám načítat produkty pro farmu:', farmId);
+    products = [];
+    nextAfterSku = null;
+    await loadNextPage(farmId);
+}
+
+// Načtení další stránky produktů (kurzor after_sku)
+async function loadNextPage(farmId = selectedFarmId) {
     try {
-        const apiUrl = `/products/api/farms/${farmId}/products`;
+        const params = new URLSearchParams({ limit: PAGE_SIZE });
+        if (nextAfterSku) {
+            params.set('after_sku', nextAfterSku);
+        }
+        const apiUrl = `/products/api/farms/${farmId}/products?${params}`;
         console.log('Volám API endpoint:', apiUrl);
         
         const response = await fetch(apiUrl);
-        console.log('Odpověď od serveru:', {
-            status: response.status,
-            statusText: response.statusText,
-            headers: Object.fromEntries(response.headers.entries())
-        });
         
         if (!response.ok) {
             const errorData = await response.json().catch(() => null);
@@ -102,12 +125,19 @@ async function loadProducts(farmId) {
         }
         
         const data = await response.json();
-        console.log('Načtená data:', data);
         
-        products = data;
-        console.log('Načteno produktů:', products.length);
+        // Celkové počty posílá server jen s první stránkou
+        if (data.total !== undefined) {
+            productStats = { total: data.total, confirmed: data.confirmed };
+        }
+        
+        const startIndex = products.length;
+        products.push(...data.products);
+        nextAfterSku = data.next_after_sku;
+        console.log('Načteno produktů:', products.length, 'z', productStats.total);
         
-        renderProducts();
+        renderProducts(startIndex);
+        updateLoadMoreButton();
         updateOverallProgress();
         
     } catch (error) {
@@ -116,15 +146,23 @@ async function loadProducts(farmId) {
     }
 }
 
-// Vykreslení produktů
-function renderProducts() {
-    console.log('Začínám vykreslovat produkty');
+function updateLoadMoreButton() {
+    const button = document.getElementById('load-more-button');
+    if (button) {
+        button.style.display = nextAfterSku ? 'block' : 'none';
+    }
+}
+
+// Vykreslení produktů (od indexu startIndex, předchozí stránky zůstávají)
+function renderProducts(startIndex = 0) {
     const container = document.getElementById('products-container');
     if (!container) {
         console.error('Container pro produkty nebyl nalezen!');
         return;
     }
-    container.innerHTML = '';
+    if (startIndex === 0) {
+        container.innerHTML = '';
+    }
     
     const template = document.getElementById('product-template');
     if (!template) {
@@ -132,8 +170,8 @@ function renderProducts() {
         return;
     }
     
-    products.forEach((product, index) => {
-        console.log(`Vykreslování produktu ${index}:`, product);
+    products.slice(startIndex).forEach((product, offset) => {
+        const index = startIndex + offset;
         let html = template.innerHTML
             .replace(/\${index}/g, index)
             .replace(/\${product\.name}/g, product.name);
@@ -200,8 +238,6 @@ function renderProducts() {
         
         container.appendChild(productElement);
     });
-    
-    console.log('Vykreslování produktů dokončeno');
 }
 
 // Generování obsahu
@@ -222,10 +258,19 @@ async function startGeneration(index) {
     setProgressBarsGenerating(index);
     
     try {
-        // Generování popisků
-        const descResult = await generateDescriptions(product.sku);
-        updateContent(index, 'short', descResult.short_description);
-        updateContent(index, 'long', descResult.long_description);
+        if (canStream()) {
+            // Dlouhý popis se vypisuje průběžně, krátký běží souběžně
+            await Promise.all([
+                generateDescriptions(product.sku, 'short')
+                    .then(result => updateContent(index, 'short', result.short_description)),
+                streamLongDescription(index)
+            ]);
+        } else {
+            // Generování popisků
+            const descResult = await generateDescriptions(product.sku);
+            updateContent(index, 'short', descResult.short_description);
+            updateContent(index, 'long', descResult.long_description);
+        }
         
         // Aktivace regeneračních tlačítek
         enableRegenerationButtons(index);
@@ -323,6 +368,9 @@ function confirmProduct(index) {
         }
         
         // Aktualizace stavu produktu
+        if (!products[index].is_confirmed) {
+            productStats.confirmed++;
+        }
         products[index].is_confirmed = true;
         
         // Deaktivace tlačítek
@@ -516,6 +564,11 @@ async function regenerateContent(index, type) {
     setProgressBarGenerating(index, type);
     
     try {
+        if (type === 'long' && canStream()) {
+            await streamLongDescription(index, true);
+            return;
+        }
+        
         const response = await fetch(`/products/api/products/${product.sku}/regenerate`, {
             method: 'POST',
             headers: {
@@ -597,16 +650,168 @@ function enableRegenerationButtons(index) {
 }
 
 function updateOverallProgress() {
-    const total = products.length;
-    const confirmed = products.filter(p => p.is_confirmed).length;
+    // Počty za celou farmu, ne jen za načtené stránky
+    const { total, confirmed } = productStats;
     
     document.getElementById('progress-counter').textContent = `${confirmed}/${total} produktů potvrzeno`;
-    document.getElementById('main-progress-bar').style.width = `${(confirmed / total) * 100}%`;
+    document.getElementById('main-progress-bar').style.width = `${total ? (confirmed / total) * 100 : 0}%`;
     
     const exportSection = document.getElementById('export-section');
     exportSection.style.display = confirmed > 0 ? 'block' : 'none';
 }
 
+function canStream() {
+    return socket !== null && socket.connected;
+}
+
+// Streamované generování dlouhého popisu; Promise skončí po uložení popisu
+function streamLongDescription(index, regenerate = false) {
+    const streamId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+    return new Promise((resolve, reject) => {
+        activeStreams[streamId] = { index, paragraphs: [], length: 0, resolve, reject };
+        socket.emit('generate_long_stream', {
+            farm_id: selectedFarmId,
+            sku: products[index].sku,
+            stream_id: streamId,
+            regenerate: regenerate
+        }, (response) => {
+            if (response && response.error) {
+                finishLongDescriptionStream(streamId, null, response.error);
+            }
+        });
+    });
+}
+
+// Kousek textu do odstavce - formátování jako _format_long_description na serveru
+function handleLongDescriptionDelta(data) {
+    const stream = activeStreams[data.stream_id];
+    if (!stream) return;
+    
+    stream.paragraphs[data.paragraph] = (stream.paragraphs[data.paragraph] || '') + data.text;
+    stream.length += data.text.length;
+    
+    const container = document.getElementById(`long-description-${stream.index}`);
+    if (container) {
+        container.innerHTML = stream.paragraphs.map((para, i) => {
+            const heading = i === 1 ? '<p><strong>O původu</strong></p>' : i === 2 ? '<p><strong>Tipy do kuchyně</strong></p>' : '';
+            return `${heading}<p>${(para || '').trim()}</p>`;
+        }).join('');
+    }
+    // Délka popisu je přibližně 1500 znaků
+    updateProgressBar(stream.index, 'long', Math.min(95, Math.round(stream.length / 15)), 'generating');
+}
+
+function finishLongDescriptionStream(streamId, longDescription, error = null) {
+    const stream = activeStreams[streamId];
+    if (!stream) return;
+    delete activeStreams[streamId];
+    
+    if (error) {
+        stream.reject(new Error(error));
+        return;
+    }
+    products[stream.index].long_description = longDescription;
+    updateContent(stream.index, 'long', longDescription);
+    stream.resolve(longDescription);
+}
+
+// Odběr průběhu hromadného generování vybrané farmy
+function joinFarm(farmId) {
+    document.getElementById('bulk-section').style.display = 'block';
+    if (!socket) {
+        refreshBulkStatus(farmId);
+        return;
+    }
+    socket.emit('join_farm', { farm_id: farmId }, (response) => {
+        if (response && response.error) {
+            console.warn('Odběr průběhu farmy selhal:', response.error);
+            return;
+        }
+        updateBulkStatus(response ? response.job : null);
+    });
+}
+
+async function refreshBulkStatus(farmId = selectedFarmId) {
+    const response = await fetch(`/products/api/farms/${farmId}/generate_all`);
+    if (response.ok) {
+        updateBulkStatus((await response.json()).job);
+    }
+}
+
+// Spuštění (nebo obnovení) hromadného generování všech nepotvrzených produktů
+async function startBulkGeneration() {
+    try {
+        const response = await fetch(`/products/api/farms/${selectedFarmId}/generate_all`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({})
+        });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Spuštění hromadného generování selhalo');
+        }
+        updateBulkStatus(data.job);
+    } catch (error) {
+        showError(error.message);
+    }
+}
+
+async function cancelBulkGeneration() {
+    try {
+        const response = await fetch(`/products/api/farms/${selectedFarmId}/generate_all/cancel`, { method: 'POST' });
+        const data = await response.json();
+        if (!response.ok) {
+            throw new Error(data.error || 'Zastavení hromadného generování selhalo');
+        }
+        updateBulkStatus(data.job);
+    } catch (error) {
+        showError(error.message);
+    }
+}
+
+function updateBulkStatus(job) {
+    const status = document.getElementById('bulk-status');
+    const startButton = document.getElementById('bulk-start-button');
+    const cancelButton = document.getElementById('bulk-cancel-button');
+    if (!status || (job && job.farm_id !== selectedFarmId)) return;
+    
+    const running = job && (job.status === 'running' || job.status === 'pending');
+    startButton.disabled = running;
+    startButton.textContent = job && ['cancelled', 'interrupted', 'failed'].includes(job.status)
+        ? 'Pokračovat v generování' : 'Vygenerovat všechny popisy';
+    cancelButton.style.display = running ? 'inline-block' : 'none';
+    
+    if (!job) {
+        status.textContent = '';
+        return;
+    }
+    const labels = {
+        pending: 'Připravuje se', running: 'Probíhá', completed: 'Dokončeno',
+        cancelled: 'Zastaveno', interrupted: 'Přerušeno', failed: 'Selhalo'
+    };
+    status.textContent = `${labels[job.status] || job.status}: ${job.done}/${job.total} hotovo` +
+        (job.failed ? `, ${job.failed} chyb` : '') +
+        (job.api_calls_saved ? ` (varianty: ušetřeno ${job.api_calls_saved} volání)` : '');
+}
+
+// Výsledek jednoho produktu z hromadného generování
+function handleBulkProduct(data) {
+    if (data.farm_id !== selectedFarmId) return;
+    updateBulkStatus({ ...data, status: 'running' });
+    
+    // Produkt nemusí být na načtených stránkách
+    const index = products.findIndex(p => p.sku === data.sku);
+    if (index === -1) return;
+    if (data.status === 'done') {
+        products[index].short_description = data.short_description;
+        products[index].long_description = data.long_description;
+        updateContent(index, 'short', data.short_description);
+        updateContent(index, 'long', data.long_description);
+    } else {
+        handleError(index, 'short', data.error);
+    }
+}
+
 // Export do CSV
 async function exportToCSV() {
     try {
@@ -630,7 +835,7 @@ async function exportToCSV() {
 }
 
 // Generování popisů
-async function generateDescriptions(sku) {
+async function generateDescriptions(sku, type = null) {
     console.log('Začínám generovat popisky pro SKU:', sku);
     console.log('Data pro odeslání:', { farm_id: selectedFarmId, sku: sku });
     
@@ -642,7 +847,8 @@ async function generateDescriptions(sku) {
             },
             body: JSON.stringify({
                 farm_id: selectedFarmId,
-                sku: sku
+                sku: sku,
+                type: type
             })
         });
         
@@ -669,6 +875,10 @@ async function generateDescriptions(sku) {
 function clearProducts() {
     console.log('Mažu seznam produktů');
     products = [];
+    productStats = { total: 0, confirmed: 0 };
+    nextAfterSku = null;
+    updateLoadMoreButton();
+    document.getElementById('bulk-section').style.display = 'none';
     const container = document.getElementById('products-container');
     if (container) {
         container.innerHTML = '';
@@ -702,6 +912,9 @@ function enableEdit(index) {
         }
 
         // Nastavení produktu jako nepotvrzený
+        if (products[index].is_confirmed) {
+            productStats.confirmed--;
+        }
         products[index].is_confirmed = false;
         
         // Aktualizace celkového progress baru
@@ -0,0 +1,113 @@
+"""
+Porovnání JSON a binárního formátu katalogu farmy.
+
+Katalog se sestaví opakováním skutečných řádků farmy 3018 na zadaný počet
+produktů. Pro každý formát se měří velikost souboru, čas načtení celého
+katalogu, čas výpisu SKU a názvů a nárůst RSS při výpisu (každé měření
+RSS běží v samostatném procesu).
+
+Spuštění: python -m benchmarks.catalog_format
+"""
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+import time
+from app.core.catalog_binary import BinaryCatalog, dump_catalog
+
+SOURCE = os.path.join(os.path.dirname(__file__), '..', 'app', 'data', 'farms', '3018', '3018.json')
+SIZES = [1000, 10000, 50000]
+
+
+def build_catalog(size: int) -> dict:
+    with open(SOURCE, encoding='utf-8') as f:
+        source = json.load(f)
+    rows = source['products'][1:]
+    products = [source['products'][0]]
+    for i in range(size):
+        row = dict(rows[i % len(rows)])
+        row['Shop SKU'] = f'FA_BENCH_{i:06d}'
+        products.append(row)
+    return {'farm_id': 'bench', 'name': source['name'], 'description': source['description'], 'products': products}
+
+
+def load_json(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def list_json(path: str) -> list:
+    data = load_json(path)
+    return [(p.get('Shop SKU'), p.get('Name')) for p in data['products']]
+
+
+def list_binary(path: str) -> list:
+    with BinaryCatalog(path) as catalog:
+        return [(row.get('Shop SKU'), row.get('Name')) for row in catalog.rows()]
+
+
+def load_binary(path: str) -> dict:
+    with BinaryCatalog(path) as catalog:
+        return catalog.to_dict()
+
+
+def rss_kb() -> int:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def measure_rss(fmt: str, path: str) -> None:
+    """Spouští se v podprocesu: vypíše nárůst RSS (kB) při výpisu SKU a názvů"""
+    before = rss_kb()
+    result = list_json(path) if fmt == 'json' else list_binary(path)
+    print(rss_kb() - before, len(result))
+
+
+def rss_growth(fmt: str, path: str) -> int:
+    output = subprocess.check_output(
+        [sys.executable, '-m', 'benchmarks.catalog_format', '--rss', fmt, path],
+        cwd=os.path.join(os.path.dirname(__file__), '..'))
+    return int(output.split()[0])
+
+
+def timed(fn, path: str, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(path)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        print(f'{"řádků":>7} {"formát":>7} {"velikost [kB]":>14} {"celý katalog [ms]":>18} '
+              f'{"SKU+název [ms]":>15} {"RSS výpisu [kB]":>16}')
+        for size in SIZES:
+            data = build_catalog(size)
+            json_path = os.path.join(tmp_dir, f'bench{size}.json')
+            bin_path = os.path.join(tmp_dir, f'bench{size}.catalog.bin')
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            dump_catalog(data, bin_path)
+
+            for fmt, path, load, listing in (('json', json_path, load_json, list_json),
+                                             ('bin', bin_path, load_binary, list_binary)):
+                print(f'{size:>7} {fmt:>7} {os.path.getsize(path) / 1024:>14.0f} '
+                      f'{timed(load, path) * 1000:>18.1f} {timed(listing, path) * 1000:>15.1f} '
+                      f'{rss_growth(fmt, path):>16}')
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--rss':
+        measure_rss(sys.argv[2], sys.argv[3])
+    else:
+        main()
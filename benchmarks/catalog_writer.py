@@ -0,0 +1,66 @@
+"""
+Propustnost souběžných úprav katalogu přes FarmCatalogWriter.
+
+Každé vlákno potvrzuje vlastní SKU; writer slučuje úpravy jedné farmy
+v okně CATALOG_COMMIT_WINDOW do jednoho zápisu. Vypisuje počet úprav
+za sekundu a průměrnou velikost dávky pro různý počet vláken.
+
+Spuštění: python -m benchmarks.catalog_writer
+"""
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from app.core.farm_catalog import FarmCatalogStore
+from app.core.catalog_writer import FarmCatalogWriter
+
+THREAD_COUNTS = [1, 8, 32]
+EDITS_PER_THREAD = 25
+WINDOW = 0.002
+
+
+def build_catalog(base_dir: str, farm_id: str, size: int) -> list:
+    skus = [f'FA_T_{i:05d}' for i in range(size)]
+    products = [{'Shop SKU': 'shop_sku', 'Name': 'name'}]
+    products += [{'Shop SKU': sku, 'Name': f'Produkt {sku}'} for sku in skus]
+    farm_dir = os.path.join(base_dir, farm_id)
+    os.makedirs(farm_dir)
+    with open(os.path.join(farm_dir, f'{farm_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump({'farm_id': farm_id, 'products': products}, f)
+    return skus
+
+
+def run(threads_count: int) -> tuple:
+    base_dir = tempfile.mkdtemp()
+    try:
+        skus = build_catalog(base_dir, 'farm1', threads_count * EDITS_PER_THREAD)
+        writer = FarmCatalogWriter(FarmCatalogStore(base_dir=base_dir), window=WINDOW)
+
+        def worker(offset):
+            for sku in skus[offset::threads_count]:
+                writer.write('farm1', sku, {'is_confirmed': True})
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(threads_count)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        return len(skus), elapsed, writer.stats()
+    finally:
+        shutil.rmtree(base_dir)
+
+
+def main():
+    print(f'{"vláken":>8} {"úprav":>8} {"úprav/s":>10} {"dávek":>8} {"úprav na zápis":>16}')
+    for threads_count in THREAD_COUNTS:
+        edits, elapsed, stats = run(threads_count)
+        print(f'{threads_count:>8} {edits:>8} {edits / elapsed:>10.0f} {stats["batches"]:>8} '
+              f'{stats["edits"] / stats["batches"]:>16.1f}')
+
+
+if __name__ == '__main__':
+    main()
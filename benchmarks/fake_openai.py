@@ -0,0 +1,237 @@
+"""
+Lokální náhrada OpenAI API pro zátěžové testy (bez volání skutečného API).
+
+Obsluhuje POST /v1/chat/completions ve stejném tvaru, jaký posílá
+TextGenerator (text, JSON odpověď kombinovaného generování, streamování)
+a ProductNameProcessor (JSON s dávkou překladů). Chování upstreamu je
+nastavitelné profilem FakeProfile: log-normální rozdělení latence do
+prvního bajtu, rychlost generování tokenů, podíl chyb 500 a periodické
+vlny 429 s hlavičkou Retry-After.
+
+Samostatné spuštění (aplikaci pak stačí OPENAI_BASE_URL=http://127.0.0.1:8089/v1):
+    python -m benchmarks.fake_openai --port=8089 --latency=0.8 --error-rate=0.02 --burst-every=30
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PARAGRAPHS = [
+    'Poctivý farmářský produkt vyrobený v malé rodinné farmě z vlastních surovin.',
+    'Farma hospodaří tradičním způsobem a zvířata mají celoročně přístup na pastvu.',
+    'Hodí se k snídani, do pomazánek i jako základ domácích receptů.'
+]
+
+
+class FakeProfile:
+    """
+    Chování falešného upstreamu.
+
+    latency: medián latence do prvního bajtu (s), sigma: rozptyl log-normálního
+    rozdělení (0 = konstantní latence), tokens_per_second: rychlost generování
+    odpovědi (0 = okamžitě), error_rate: podíl odpovědí 500, burst_every /
+    burst_length: každých burst_every sekund odmítá burst_length sekund vše s 429.
+    """
+
+    def __init__(self, latency: float = 0.5, sigma: float = 0.4, tokens_per_second: float = 0,
+                 error_rate: float = 0.0, burst_every: float = 0, burst_length: float = 2.0, seed: int = None):
+        self.latency = latency
+        self.sigma = sigma
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.burst_every = burst_every
+        self.burst_length = burst_length
+        self.random = random.Random(seed)
+
+    def first_byte_delay(self) -> float:
+        if self.latency <= 0:
+            return 0.0
+        if self.sigma <= 0:
+            return self.latency
+        return self.random.lognormvariate(math.log(self.latency), self.sigma)
+
+    def generation_delay(self, tokens: int) -> float:
+        return tokens / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def burst_remaining(self, elapsed: float) -> float:
+        """Kolik sekund ještě trvá vlna 429 (0 = mimo vlnu)"""
+        if self.burst_every <= 0:
+            return 0.0
+        position = elapsed % self.burst_every
+        return max(0.0, self.burst_length - position) if elapsed >= self.burst_every else 0.0
+
+    def fails(self) -> bool:
+        return self.error_rate > 0 and self.random.random() < self.error_rate
+
+
+def completion_text(body: dict) -> str:
+    """Obsah odpovědi podle typu požadavku (překlad, kombinované generování, text)"""
+    prompt = (body.get('messages') or [{}])[-1].get('content', '')
+    if (body.get('response_format') or {}).get('type') == 'json_object':
+        if 'translations' in prompt:
+            match = re.search(r'\[.*?\]', prompt, re.S)
+            names = json.loads(match.group(0)) if match else []
+            return json.dumps({'translations': {name: f'{name} (en)' for name in names}}, ensure_ascii=False)
+        return json.dumps({'short_description': PARAGRAPHS[0], 'long_description': PARAGRAPHS}, ensure_ascii=False)
+    if int(body.get('max_tokens') or 0) <= 200:
+        return PARAGRAPHS[0]
+    return '\n\n'.join(PARAGRAPHS)
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 3)
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+        if not self.path.endswith('/chat/completions'):
+            return self._json(404, {'error': {'message': f'Neznámý endpoint {self.path}', 'type': 'invalid_request_error'}})
+
+        server.count('requests')
+        profile = server.profile
+        burst = profile.burst_remaining(time.monotonic() - server.started)
+        if burst > 0:
+            server.count('throttled')
+            return self._json(429, {'error': {'message': 'Rate limit reached', 'type': 'requests',
+                                              'code': 'rate_limit_exceeded'}},
+                              {'Retry-After': f'{burst:.2f}'})
+
+        time.sleep(profile.first_byte_delay())
+        if profile.fails():
+            server.count('errors')
+            return self._json(500, {'error': {'message': 'The server had an error', 'type': 'server_error'}})
+
+        text = completion_text(body)
+        completion_tokens = estimate_tokens(text)
+        prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in body.get('messages') or [])
+        if body.get('stream'):
+            return self._stream(body, text, profile)
+
+        time.sleep(profile.generation_delay(completion_tokens))
+        server.count('completed')
+        self._json(200, {
+            'id': f'chatcmpl-fake{server.requests}', 'object': 'chat.completion', 'created': int(time.time()),
+            'model': body.get('model', 'gpt-4o'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                      'total_tokens': prompt_tokens + completion_tokens}
+        })
+
+    def _stream(self, body: dict, text: str, profile: FakeProfile) -> None:
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        pieces = re.findall(r'\S+\s*', text)
+        for piece in pieces:
+            time.sleep(profile.generation_delay(estimate_tokens(piece)))
+            self._chunk({'id': 'chatcmpl-fake', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                         'model': body.get('model', 'gpt-4o'),
+                         'choices': [{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}]})
+        self._chunk('[DONE]')
+        self.wfile.write(b'0\r\n\r\n')
+        self.server.count('completed')
+
+    def _chunk(self, payload) -> None:
+        data = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+        event = f'data: {data}\n\n'.encode()
+        self.wfile.write(f'{len(event):x}\r\n'.encode() + event + b'\r\n')
+        self.wfile.flush()
+
+    def _json(self, status: int, payload: dict, headers: dict = None) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Falešný OpenAI server běžící ve vlákně; base_url patří do OPENAI_BASE_URL"""
+    daemon_threads = True
+
+    def __init__(self, profile: FakeProfile = None, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), FakeOpenAIHandler)
+        self.profile = profile or FakeProfile()
+        self.started = time.monotonic()
+        self.requests = self.completed = self.errors = self.throttled = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f'http://{self.server_address[0]}:{self.server_address[1]}/v1'
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self) -> dict:
+        return {'requests': self.requests, 'completed': self.completed, 'errors': self.errors,
+                'throttled': self.throttled}
+
+    def start(self) -> 'FakeOpenAIServer':
+        self.started = time.monotonic()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_options(argv: list) -> dict:
+    """Volby ve tvaru --nazev=hodnota (pomlčky v názvu -> podtržítka)"""
+    options = {}
+    for arg in argv:
+        if arg.startswith('--') and '=' in arg:
+            name, value = arg[2:].split('=', 1)
+            options[name.replace('-', '_')] = value
+    return options
+
+
+PROFILE_OPTIONS = {'latency': float, 'sigma': float, 'tokens_per_second': float, 'error_rate': float,
+                   'burst_every': float, 'burst_length': float, 'seed': int}
+
+
+def profile_from_options(options: dict) -> FakeProfile:
+    return FakeProfile(**{name: PROFILE_OPTIONS[name](value) for name, value in options.items()
+                          if name in PROFILE_OPTIONS})
+
+
+def main():
+    options = parse_options(sys.argv[1:])
+    server = FakeOpenAIServer(profile_from_options(options), port=int(options.get('port', 8089)))
+    print(f'Falešné OpenAI API běží na {server.base_url} (Ctrl+C ukončí)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == '__main__':
+    main()
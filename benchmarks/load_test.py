@@ -0,0 +1,210 @@
+"""
+Zátěžový test generovacích endpointů proti falešnému OpenAI API.
+
+Spustí benchmarks.fake_openai ve vlákně, nasměruje na něj aplikaci
+(OPENAI_BASE_URL) a nad kopií katalogů farem v dočasném adresáři pustí
+zadaný počet souběžných uživatelů. Každý uživatel opakuje realistický
+tok: výpis produktů, generování obsahu, nahrání obrázku, potvrzení
+a občas export. Na konci vypíše pro každý endpoint počet požadavků,
+chyby, propustnost a p50/p95/p99 latence - výsledky jednotlivých běhů
+tak jde porovnat po každé změně souběžnosti.
+
+LLM cache je vypnutá, aby každé generování došlo až na (falešné) API.
+
+Spuštění:
+    python -m benchmarks.load_test --users=16 --duration=30 --farm=3018 \
+        --latency=0.8 --sigma=0.5 --error-rate=0.02 --burst-every=20 --burst-length=2 [--output=beh.json]
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import logging
+import tempfile
+import threading
+from collections import defaultdict
+from benchmarks.fake_openai import FakeOpenAIServer, parse_options, profile_from_options
+
+FARMS_DIR = os.path.join(os.path.dirname(__file__), '..', 'app', 'data', 'farms')
+# Obsah obrázku endpoint nekontroluje - stačí začátek a konec JPEG
+IMAGE = b'\xff\xd8\xff\xe0' + bytes(2048) + b'\xff\xd9'
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+class LoadRecorder:
+    """Latence a stavové kódy podle endpointu (sdílené všemi uživateli)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, status: int, latency: float) -> None:
+        with self._lock:
+            self.latencies[endpoint].append(latency)
+            self.statuses[endpoint][status] += 1
+            if status >= 400:
+                self.errors[endpoint] += 1
+
+    def report(self, elapsed: float) -> dict:
+        report = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            report[endpoint] = {
+                'requests': len(values), 'errors': self.errors[endpoint],
+                'throughput': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 0.50) * 1000, 1),
+                'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+                'p99_ms': round(percentile(values, 0.99) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+                'statuses': dict(self.statuses[endpoint])
+            }
+        return report
+
+
+class VirtualUser(threading.Thread):
+    """Jeden přihlášený uživatel opakující tok výpis -> generování -> obrázek -> potvrzení -> export"""
+
+    def __init__(self, app, farm_id: str, recorder: LoadRecorder, stop_at: float, seed: int,
+                 export_every: int = 5):
+        super().__init__(daemon=True)
+        self.client = app.test_client()
+        self.farm_id = farm_id
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.random = random.Random(seed)
+        self.export_every = export_every
+
+    def call(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = self.client.open(url, method=method, **kwargs)
+        response.get_data()
+        self.recorder.record(endpoint, response.status_code, time.perf_counter() - start)
+        return response
+
+    def run(self):
+        self.call('login', 'POST', '/auth/login', data={'email': 'admin', 'password': 'admin'})
+        iteration = 0
+        while time.monotonic() < self.stop_at:
+            iteration += 1
+            page = self.call('list_products', 'GET', f'/products/api/farms/{self.farm_id}/products?limit=50'
+                                                     f'&fields=sku,name,is_confirmed')
+            products = (page.get_json(silent=True) or {}).get('products') or []
+            if not products:
+                break
+            sku = self.random.choice(products)['sku']
+            generated = self.call('generate', 'POST', '/products/generate_product_content',
+                                  json={'farm_id': self.farm_id, 'sku': sku,
+                                        'regenerate': self.random.random() < 0.2})
+            content = generated.get_json(silent=True) or {}
+            self.call('upload_image', 'POST', '/products/api/upload_image', content_type='multipart/form-data',
+                      data={'farm_id': self.farm_id, 'sku': sku, 'image': (io.BytesIO(IMAGE), f'{sku}.jpg')})
+            self.call('confirm', 'POST', '/products/api/products/confirm',
+                      json={'farm_id': self.farm_id, 'sku': sku,
+                            'short_description': content.get('short_description', ''),
+                            'long_description': content.get('long_description', '')})
+            if iteration % self.export_every == 0:
+                self.call('export', 'GET', f'/products/api/farms/{self.farm_id}/export?format=csv')
+
+
+def setup_environment(tmp_dir: str, base_url: str) -> None:
+    """Nasměruje konfiguraci na falešné API a dočasná úložiště (před importem aplikace)"""
+    os.environ.update({
+        'OPENAI_API_KEY': 'fake-key',
+        'OPENAI_BASE_URL': base_url,
+        'OPENAI_HTTP2': 'false',
+        'LLM_CACHE_PATH': '',
+        'OPENAI_LIMITER_PATH': os.path.join(tmp_dir, 'openai_limits.sqlite3'),
+        'SINGLE_FLIGHT_PATH': os.path.join(tmp_dir, 'single_flight.sqlite3'),
+        'TRANSLATION_STORE_PATH': os.path.join(tmp_dir, 'translations.sqlite3'),
+    })
+
+
+def create_load_app(tmp_dir: str, farm_id: str):
+    from werkzeug.security import generate_password_hash
+    from app import create_app, db
+    from app.config.config import Config
+    from app.core.models import User, Farm
+    from app.core.farm_catalog import catalog_store
+
+    shutil.copytree(os.path.join(FARMS_DIR, farm_id), os.path.join(tmp_dir, 'farms', farm_id))
+    catalog_store.base_dir = os.path.join(tmp_dir, 'farms')
+    catalog_store.invalidate()
+
+    class LoadConfig(Config):
+        TESTING = True
+        WTF_CSRF_ENABLED = False
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(tmp_dir, 'load.db')
+
+    app = create_app(LoadConfig)
+    app.logger.setLevel(logging.WARNING)  # logování každého požadavku by měření přehlušilo
+    logging.getLogger('app').setLevel(logging.WARNING)
+    with app.app_context():
+        db.create_all()
+        # Přihlášení aplikace zná jen účet admin/admin
+        user = User(email='admin', password_hash=generate_password_hash('admin'))
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Farm(farm_id=farm_id, name=f'Farma {farm_id}', description='Rodinná farma', user_id=user.id))
+        db.session.commit()
+    return app
+
+
+def print_report(report: dict, upstream: dict, elapsed: float) -> None:
+    print(f'{"endpoint":<15} {"požadavků":>10} {"chyb":>6} {"req/s":>8} {"p50 [ms]":>10} {"p95 [ms]":>10} '
+          f'{"p99 [ms]":>10} {"max [ms]":>10}')
+    for endpoint, row in report.items():
+        print(f'{endpoint:<15} {row["requests"]:>10} {row["errors"]:>6} {row["throughput"]:>8.2f} '
+              f'{row["p50_ms"]:>10.1f} {row["p95_ms"]:>10.1f} {row["p99_ms"]:>10.1f} {row["max_ms"]:>10.1f}')
+    print(f'\nDoba běhu {elapsed:.1f} s, upstream: {json.dumps(upstream)}')
+
+
+def main():
+    options = parse_options(sys.argv[1:])
+    users = int(options.get('users', 8))
+    duration = float(options.get('duration', 30))
+    farm_id = options.get('farm', '3018')
+
+    tmp_dir = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    server = FakeOpenAIServer(profile_from_options(options)).start()
+    try:
+        setup_environment(tmp_dir, server.base_url)
+        os.chdir(tmp_dir)  # logs/ aplikace mimo repozitář
+        app = create_load_app(tmp_dir, farm_id)
+        from app.core.openai_clients import openai_clients
+
+        recorder = LoadRecorder()
+        started = time.monotonic()
+        threads = [VirtualUser(app, farm_id, recorder, started + duration, seed=i) for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        report = recorder.report(elapsed)
+        upstream = {**server.stats(), 'governor': openai_clients.to_dict()['governor']}
+        print_report(report, upstream, elapsed)
+        if options.get('output'):
+            with open(os.path.join(cwd, options['output']), 'w', encoding='utf-8') as f:
+                json.dump({'options': options, 'elapsed': elapsed, 'endpoints': report, 'upstream': upstream}, f,
+                          ensure_ascii=False, indent=2)
+    finally:
+        os.chdir(cwd)
+        server.stop()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark zjednodušování názvů produktů na syntetickém katalogu.
+
+Z názvů v StruhyTEST.csv složí katalog o 100 000 řádcích (náhodné
+přívlastky, hmotnosti a varianty, část názvů se opakuje jako u variant
+balení) a porovná:
+  - původní algoritmus (11x str.replace a re.sub s kompilací při volání),
+  - simplify_product_name se studenou a zahřátou LRU cache,
+  - simplify_many nad celým sloupcem (pandas).
+Všechny varianty musí dát stejné výsledky jako původní algoritmus.
+
+Spuštění: python -m benchmarks.name_simplify [--rows=100000] [--seed=1]
+"""
+import os
+import re
+import csv
+import sys
+import random
+import timeit
+from benchmarks.fake_openai import parse_options
+from app.core.product_name_processor import REMOVE_WORDS, simplify_product_name, simplify_many, _simplify
+
+CSV_PATH = os.path.join(os.path.dirname(__file__), '..', 'StruhyTEST.csv')
+PREFIXES = ['', 'Bio ', 'BIO ', 'Selský ', 'Farmářský ', 'Domácí ', 'Tradiční ', 'Čerstvý ', 'Extra ', 'Premium ']
+WEIGHTS = ['', ' 250 g', ' 500g', ' 1 kg', ' 5 kg', ' 1l', ' 2 l', ' 10 l']
+
+
+def legacy_simplify(product_name: str) -> str:
+    """Původní implementace (pro srovnání rychlosti a shody výsledků)"""
+    if not product_name or not isinstance(product_name, str):
+        return "unknown_product"
+    name_lower = product_name.lower()
+    for word in REMOVE_WORDS:
+        name_lower = name_lower.replace(word.lower(), '').strip()
+    name_lower = re.sub(r'\s*\d+\s*[kgl][gl]?\b', '', name_lower)
+    return ' '.join(name_lower.split())
+
+
+def load_names(path: str = CSV_PATH) -> list:
+    with open(path, encoding='utf-8') as f:
+        return [row['Name'] for row in csv.DictReader(f) if row.get('Name') and row['Name'] != 'name']
+
+
+def synthetic_catalog(names: list, rows: int, seed: int = 1) -> list:
+    """Názvy katalogu: základ z CSV + přívlastek + hmotnost, zhruba třetina řádků opakuje dřívější název"""
+    rng = random.Random(seed)
+    catalog = []
+    for i in range(rows):
+        if catalog and rng.random() < 0.3:
+            catalog.append(rng.choice(catalog))
+            continue
+        base = rng.choice(names)
+        catalog.append(f'{rng.choice(PREFIXES)}{base} {i % 997}{rng.choice(WEIGHTS)}')
+    return catalog
+
+
+def main():
+    options = parse_options(sys.argv[1:])
+    rows = int(options.get('rows', 100000))
+    catalog = synthetic_catalog(load_names(), rows, seed=int(options.get('seed', 1)))
+    expected = [legacy_simplify(name) for name in catalog]
+
+    def cold():
+        _simplify.cache_clear()
+        return [simplify_product_name(name) for name in catalog]
+
+    runs = {
+        'původní (str.replace)': lambda: [legacy_simplify(name) for name in catalog],
+        'simplify_product_name (studená cache)': cold,
+        'simplify_product_name (zahřátá cache)': lambda: [simplify_product_name(name) for name in catalog],
+        'simplify_many (pandas)': lambda: simplify_many(catalog),
+    }
+    print(f'{rows} názvů, {len(set(catalog))} různých')
+    print(f'{"varianta":<40} {"celkem [ms]":>12} {"na název [µs]":>15}')
+    for label, run in runs.items():
+        if run() != expected:
+            raise AssertionError(f'{label}: výsledek se liší od původní implementace')
+        elapsed = min(timeit.repeat(run, number=1, repeat=3))
+        print(f'{label:<40} {elapsed * 1000:>12.1f} {elapsed / rows * 1e6:>15.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Mikrobenchmark vyhledání produktu podle SKU v katalogu farmy.
+
+Porovnává lineární průchod seznamem products s indexem FarmCatalogStore
+pro katalogy různé velikosti. Latence indexu by měla zůstat stejná
+bez ohledu na počet řádků.
+
+Spuštění: python -m benchmarks.sku_lookup
+"""
+import os
+import json
+import random
+import shutil
+import tempfile
+import timeit
+from app.core.farm_catalog import FarmCatalogStore
+
+SIZES = [20, 2000, 200000]
+LOOKUPS = 2000
+
+
+def build_catalog(base_dir: str, farm_id: str, size: int) -> list:
+    skus = [f'FA_{farm_id}_{i:06d}' for i in range(size)]
+    products = [{'Shop SKU': 'shop_sku', 'Name': 'name'}]
+    products += [{'Shop SKU': sku, 'Name': f'Produkt {i}', 'is_confirmed': False} for i, sku in enumerate(skus)]
+
+    farm_dir = os.path.join(base_dir, farm_id)
+    os.makedirs(farm_dir)
+    with open(os.path.join(farm_dir, f'{farm_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump({'farm_id': farm_id, 'products': products}, f)
+    return skus
+
+
+def linear_lookup(farm_data: dict, sku: str):
+    for product in farm_data['products']:
+        if product.get('Shop SKU') == sku:
+            return product
+    return None
+
+
+def main():
+    base_dir = tempfile.mkdtemp()
+    try:
+        store = FarmCatalogStore(base_dir=base_dir, max_bytes=1024 * 1024 * 1024)
+        print(f'{"řádků":>10} {"index [µs]":>12} {"lineárně [µs]":>15}')
+
+        for size in SIZES:
+            farm_id = f'bench{size}'
+            skus = build_catalog(base_dir, farm_id, size)
+            farm_data = store.get(farm_id)
+            store.find_product(farm_id, skus[0])  # sestavení indexu mimo měření
+
+            sample = [random.choice(skus) for _ in range(LOOKUPS)]
+            indexed = timeit.timeit(lambda: [store.find_product(farm_id, s) for s in sample], number=1)
+            linear_sample = sample[:max(1, min(LOOKUPS, 2000000 // size))]
+            linear = timeit.timeit(lambda: [linear_lookup(farm_data, s) for s in linear_sample], number=1)
+
+            print(f'{size:>10} {indexed / len(sample) * 1e6:>12.2f} {linear / len(linear_sample) * 1e6:>15.2f}')
+    finally:
+        shutil.rmtree(base_dir)
+
+
+if __name__ == '__main__':
+    main()
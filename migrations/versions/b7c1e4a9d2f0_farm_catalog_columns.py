@@ -0,0 +1,52 @@
+"""farm catalog columns on product
+
+Revision ID: b7c1e4a9d2f0
+Revises: 684d0875c4c8
+Create Date: 2026-10-18 10:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7c1e4a9d2f0'
+down_revision = '684d0875c4c8'
+branch_labels = None
+depends_on = None
+
+# Původní unikátní omezení na sku nemá v SQLite jméno - batch režim
+# ho podle této konvence pojmenuje, aby šlo odstranit
+naming_convention = {
+    'uq': 'uq_%(table_name)s_%(column_0_name)s'
+}
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_constraint('uq_product_sku', type_='unique')
+        batch_op.alter_column('name', existing_type=sa.String(length=100), type_=sa.String(length=255),
+                              existing_nullable=False)
+        batch_op.add_column(sa.Column('category', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('weight', sa.String(length=50), nullable=True))
+        batch_op.add_column(sa.Column('position', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('mirakl_columns', sa.JSON(), nullable=True))
+        batch_op.create_unique_constraint('uq_product_farm_sku', ['farm_id', 'sku'])
+        batch_op.create_index('ix_product_farm_confirmed', ['farm_id', 'is_confirmed'], unique=False)
+        batch_op.create_index('ix_product_farm_category', ['farm_id', 'category'], unique=False)
+        batch_op.create_index('ix_product_farm_position', ['farm_id', 'position'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None, naming_convention=naming_convention) as batch_op:
+        batch_op.drop_index('ix_product_farm_position')
+        batch_op.drop_index('ix_product_farm_category')
+        batch_op.drop_index('ix_product_farm_confirmed')
+        batch_op.drop_constraint('uq_product_farm_sku', type_='unique')
+        batch_op.drop_column('mirakl_columns')
+        batch_op.drop_column('position')
+        batch_op.drop_column('weight')
+        batch_op.drop_column('category')
+        batch_op.alter_column('name', existing_type=sa.String(length=255), type_=sa.String(length=100),
+                              existing_nullable=False)
+        batch_op.create_unique_constraint('uq_product_sku', ['sku'])
@@ -0,0 +1,26 @@
+"""product created_at index
+
+Revision ID: d41f0c7e8a35
+Revises: b7c1e4a9d2f0
+Create Date: 2026-10-18 11:02:17.530981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41f0c7e8a35'
+down_revision = 'b7c1e4a9d2f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.create_index('ix_product_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_created_at')
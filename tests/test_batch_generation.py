@@ -0,0 +1,102 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+from unittest import mock
+from app.core.farm_catalog import FarmCatalogStore
+from app.core.catalog_writer import FarmCatalogWriter
+from app.core.catalog_backends import JsonCatalogBackend
+from app.core.batch_generation import BatchGenerationManager, LocalBatchTransport
+from tests.test_farm_catalog import write_catalog
+from tests.test_bulk_generation import PRODUCTS
+
+
+def respond(body):
+    """Odpověď lokální dávky - název produktu vytažený z promptu"""
+    prompt = body['messages'][-1]['content']
+    name = next(line.split(':', 1)[1].strip() for line in prompt.splitlines()
+                if line.strip().startswith('Název produktu:'))
+    if name == 'produkt 7':
+        raise ValueError('Model nedostupný')
+    return json.dumps({'short_description': f'Krátký: {name}', 'long_description': [f'Popis {name}.']})
+
+
+class BatchGenerationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        write_catalog(self.base_dir, 'farm1', PRODUCTS)
+        self.store = FarmCatalogStore(base_dir=self.base_dir)
+        self.backend = JsonCatalogBackend(self.store, FarmCatalogWriter(self.store, window=0.001))
+        self.transport = LocalBatchTransport(respond, os.path.join(self.base_dir, 'remote'))
+        self.manager = BatchGenerationManager(batches_dir=os.path.join(self.base_dir, 'batches'),
+                                              transport_factory=lambda: self.transport, ingest_chunk=5)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_prepare_submit_and_ingest(self):
+        """Test, že dávka obsahuje jen produkty k vygenerování a výsledky se zapíšou do katalogu"""
+        state = self.manager.prepare('farm1', self.backend)
+        self.assertEqual((state['status'], state['total']), ('prepared', 18))
+        with open(state['input_path'], encoding='utf-8') as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[0]['custom_id'], 'S2')
+        self.assertEqual(lines[0]['body']['response_format'], {'type': 'json_object'})
+        self.assertFalse({'S0', 'S1'} & {line['custom_id'] for line in lines})
+        with self.assertRaises(RuntimeError):
+            self.manager.prepare('farm1', self.backend)
+
+        state = self.manager.advance('farm1', self.backend)
+        self.assertEqual(state['status'], 'completed')
+        self.assertEqual((state['done'], state['ingested_lines'], state['api_calls_saved']), (17, 18, 0))
+        self.assertIn('Model nedostupný', state['failed']['S7'])
+        product = FarmCatalogStore(base_dir=self.base_dir).find_product('farm1', 'S5')
+        self.assertEqual(product['Short Description'], 'Krátký: produkt 5')
+        self.assertEqual(product['Description'], '<p>Popis produkt 5.</p>')
+
+    def test_crash_during_ingest_resumes_without_resubmitting(self):
+        """Test, že po pádu uprostřed importu se pokračuje od uloženého bloku a dávka se znovu neodesílá"""
+        self.manager.prepare('farm1', self.backend)
+        calls = []
+        update_products = self.backend.update_products
+
+        def crash_on_third_chunk(farm_id, edits):
+            calls.append(len(edits))
+            if len(calls) == 3:
+                raise OSError('Disk plný')
+            return update_products(farm_id, edits)
+
+        with mock.patch.object(self.backend, 'update_products', side_effect=crash_on_third_chunk):
+            with self.assertRaises(OSError):
+                self.manager.advance('farm1', self.backend)
+        state = self.manager.state('farm1')
+        self.assertEqual((state['status'], state['ingested_lines'], state['done']), ('ingesting', 10, 9))
+
+        with mock.patch.object(self.transport, 'submit') as submit:
+            state = self.manager.advance('farm1', self.backend)
+        submit.assert_not_called()
+        self.assertEqual((state['status'], state['ingested_lines'], state['done']), ('completed', 18, 17))
+
+    def test_variants_share_one_request(self):
+        """Test, že varianty se stejným promptem mají jeden požadavek a výsledek se rozkopíruje"""
+        write_catalog(self.base_dir, 'farm2', [PRODUCTS[0]] + [
+            {'Shop SKU': f'T{size}', 'Name': f'Tvaroh {size} kg', 'Farm ingredients': 'mléko'} for size in (1, 5, 10)
+        ])
+        state = self.manager.prepare('farm2', self.backend)
+        self.assertEqual((state['total'], state['requests'], state['variants']), (3, 1, {'T1': ['T5', 'T10']}))
+        state = self.manager.advance('farm2', self.backend)
+        self.assertEqual(state['done'], 3)
+        self.assertEqual(self.store.find_product('farm2', 'T10')['Short Description'], 'Krátký: tvaroh')
+
+    def test_failed_batch_allows_new_run(self):
+        """Test, že dávka, která na straně API skončila chybou, uzavře běh a jde připravit nový"""
+        self.manager.prepare('farm1', self.backend)
+        with mock.patch.object(self.transport, 'status', return_value={'status': 'expired'}):
+            state = self.manager.advance('farm1', self.backend)
+        self.assertEqual(state['status'], 'failed')
+        self.assertEqual(self.manager.prepare('farm1', self.backend)['status'], 'prepared')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import unittest
+import tempfile
+import shutil
+import asyncio
+import os
+import json
+from types import SimpleNamespace
+from app.core.farm_catalog import FarmCatalogStore
+from app.core.catalog_writer import FarmCatalogWriter
+from app.core.catalog_backends import JsonCatalogBackend
+from app.core.bulk_generation import BulkGenerationManager
+from app.core.llm_cache import LLMCache
+from app.core.telemetry import Telemetry
+from app.generators.text_generator import AsyncTextGenerator
+from tests.test_farm_catalog import write_catalog
+
+PRODUCTS = [{'Shop SKU': 'shop_sku', 'Name': 'name'}] + [
+    {'Shop SKU': f'S{i}', 'Name': f'Produkt {i}', 'Farm ingredients': 'mléko'} for i in range(20)
+]
+PRODUCTS[1]['is_confirmed'] = True
+PRODUCTS[2].update({'Short Description': 'Hotový', 'Description': 'Hotový popis'})
+
+
+class FakeGenerator:
+    """Generátor bez OpenAI - měří souběžnost a umí zastavit úlohu v půlce"""
+
+    def __init__(self, delay=0.01, on_call=None, fail_sku=None):
+        self.delay = delay
+        self.on_call = on_call
+        self.fail_sku = fail_sku
+        self.active = 0
+        self.max_active = 0
+        self.calls = []
+
+    async def generate_descriptions(self, product_data, bypass_cache=False):
+        self.calls.append(product_data['name'])
+        if self.on_call:
+            self.on_call(len(self.calls))
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(self.delay)
+        self.active -= 1
+        if product_data['name'] == self.fail_sku:
+            raise ValueError('API nedostupné')
+        return {'short_description': f"Krátký: {product_data['name']}",
+                'long_description': f"<p>{product_data['farm_name']}</p>"}
+
+
+class BulkGenerationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        write_catalog(self.base_dir, 'farm1', PRODUCTS)
+        self.store = FarmCatalogStore(base_dir=self.base_dir)
+        self.backend = JsonCatalogBackend(self.store, FarmCatalogWriter(self.store, window=0.001))
+        self.manager = BulkGenerationManager(jobs_dir=os.path.join(self.base_dir, 'jobs'))
+        self.events = []
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def start(self, generator, **kwargs):
+        return self.manager.start('farm1', self.backend, concurrency=4, generator_factory=lambda: generator,
+                                  emit=lambda event, payload: self.events.append((event, payload)), wait=True, **kwargs)
+
+    def test_generates_unconfirmed_products_concurrently(self):
+        """Test, že úloha zpracuje jen nepotvrzené produkty bez popisů a dodrží limit souběžnosti"""
+        generator = FakeGenerator()
+        job = self.start(generator)
+        self.assertEqual(job.state['status'], 'completed')
+        self.assertEqual((job.state['done'], job.state['total']), (18, 18))
+        self.assertEqual(generator.max_active, 4)
+        self.assertNotIn('Produkt 0', generator.calls)
+        self.assertNotIn('Produkt 1', generator.calls)
+
+        other = FarmCatalogStore(base_dir=self.base_dir)
+        self.assertEqual(other.find_product('farm1', 'S5')['Short Description'], 'Krátký: Produkt 5')
+        self.assertEqual(other.find_product('farm1', 'S1')['Description'], 'Hotový popis')
+        self.assertEqual(sum(1 for event, _ in self.events if event == 'bulk_product'), 18)
+        self.assertEqual(self.events[-1][1]['status'], 'completed')
+
+    def test_cancel_and_resume(self):
+        """Test, že zrušená úloha jde obnovit a dokončí jen zbylé produkty"""
+        generator = FakeGenerator(on_call=lambda n: n == 6 and self.manager.cancel('farm1'))
+        job = self.start(generator)
+        self.assertEqual(job.state['status'], 'cancelled')
+        done = job.state['done']
+        self.assertLess(done, 18)
+        self.assertEqual(BulkGenerationManager(jobs_dir=self.manager.jobs_dir).status('farm1')['status'], 'cancelled')
+
+        resumed = self.start(FakeGenerator())
+        self.assertEqual(resumed.state['job_id'], job.state['job_id'])
+        self.assertEqual((resumed.state['status'], resumed.state['done'], resumed.state['total']), ('completed', 18, 18))
+
+    def test_resume_with_overwrite_skips_processed_products(self):
+        """Test, že obnovené přegenerování nezpracuje znovu produkty hotové před zrušením"""
+        generator = FakeGenerator(on_call=lambda n: n == 6 and self.manager.cancel('farm1'))
+        job = self.start(generator, overwrite=True)
+        self.assertEqual(job.state['status'], 'cancelled')
+        done = job.state['done']
+        self.assertNotIn('processed', job.to_dict())
+
+        resumed = self.start(FakeGenerator(), overwrite=True)
+        self.assertEqual(len(resumed.generator_factory().calls), 19 - done)
+        self.assertEqual((resumed.state['status'], resumed.state['done'], resumed.state['total']), ('completed', 19, 19))
+
+    def test_failed_product_is_reported(self):
+        """Test, že chyba jednoho produktu nezastaví úlohu a produkt zůstane bez popisu"""
+        job = self.start(FakeGenerator(fail_sku='Produkt 7'))
+        self.assertEqual(job.to_dict()['failed_skus'], ['S7'])
+        self.assertEqual(job.state['done'], 17)
+        self.assertNotIn('Short Description', self.store.find_product('farm1', 'S7'))
+
+    def test_variants_are_generated_once(self):
+        """Test, že varianty lišící se jen hmotností se generují jednou a popis dostanou všechny"""
+        write_catalog(self.base_dir, 'farm2', [PRODUCTS[0]] + [
+            {'Shop SKU': 'T1', 'Name': 'Bio selský tvaroh 1 kg', 'Farm ingredients': 'mléko'},
+            {'Shop SKU': 'T5', 'Name': 'Bio selský tvaroh 5 kg', 'Farm ingredients': ' Mléko'},
+            {'Shop SKU': 'T9', 'Name': 'Tvaroh 250 g', 'Farm ingredients': 'mléko, sůl'}
+        ])
+        generator = FakeGenerator()
+        job = self.manager.start('farm2', self.backend, generator_factory=lambda: generator, wait=True)
+        self.assertEqual(len(generator.calls), 2)
+        self.assertEqual((job.state['done'], job.state['groups'], job.state['api_calls_saved']), (3, 2, 1))
+        self.assertEqual(self.store.find_product('farm2', 'T5')['Short Description'],
+                         self.store.find_product('farm2', 'T1')['Short Description'])
+
+    def test_real_async_generator_writes_descriptions(self):
+        """Test, že úloha se skutečným AsyncTextGeneratorem (stub OpenAI) zapíše popisy do katalogu"""
+        class Completions:
+            async def create(self, **request):
+                content = json.dumps({'short_description': 'Krátký popis s 5% tuku!',
+                                      'long_description': ['Popis.', 'Farma.', 'Tip.']})
+                return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+        def factory():
+            generator = AsyncTextGenerator()
+            generator.cache = LLMCache(path='')
+            generator.telemetry = Telemetry(log_path='')
+            generator.client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+            return generator
+
+        job = self.manager.start('farm1', self.backend, concurrency=4, generator_factory=factory, wait=True)
+        self.assertEqual(job.state['status'], 'completed')
+        self.assertEqual(job.to_dict()['failed_skus'], [])
+        product = FarmCatalogStore(base_dir=self.base_dir).find_product('farm1', 'S5')
+        self.assertEqual(product['Short Description'], 'Krátký popis s 5 % tuku.')
+        self.assertTrue(product['Description'].startswith('<p>Popis.</p>'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import tempfile
+import shutil
+import os
+from app import create_app, db
+from app.config.config import Config
+from app.core.models import User, Farm, Product
+from app.core.farm_catalog import FarmCatalogStore
+from app.core.catalog_writer import FarmCatalogWriter
+from app.core.catalog_backends import JsonCatalogBackend, SqlCatalogBackend
+from tests.test_farm_catalog import write_catalog
+
+PRODUCTS = [
+    {'Category': 'category', 'Shop SKU': 'shop_sku', 'Name': 'name', 'Chov': 'chov'},
+    {'Category': 'Mléčné', 'Shop SKU': 'A', 'Name': 'Tvaroh', 'Chov': 'Bio', 'Weight': '0.25'},
+    {'Category': 'Mléčné', 'Shop SKU': 'B', 'Name': 'Máslo', 'Chov': 'Bio', 'is_confirmed': True},
+    {'Category': 'Maso', 'Shop SKU': 'C', 'Name': 'Klobása', 'Chov': ''}
+]
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    CATALOG_COMPACT_INTERVAL = 0
+
+
+class CatalogBackendsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        user = User(email='farmar@example.com')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Farm(farm_id='farm1', name='Farma', description='Popis', user_id=user.id))
+        db.session.commit()
+
+        self.base_dir = tempfile.mkdtemp()
+        write_catalog(self.base_dir, 'farm1', PRODUCTS)
+        store = FarmCatalogStore(base_dir=self.base_dir)
+        self.json = JsonCatalogBackend(store, FarmCatalogWriter(store, window=0))
+        self.sql = SqlCatalogBackend()
+        self.sql.save_catalog('farm1', store.get('farm1'))
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.base_dir)
+
+    def test_bulk_load_keeps_every_column(self):
+        """Test, že SQL úložiště vrací stejné řádky katalogu jako JSON (bez hlavičky)"""
+        self.assertEqual(Product.query.count(), 3)
+        self.assertEqual(self.sql.list_products('farm1'), self.json.list_products('farm1'))
+        row = self.sql.find_product('farm1', 'A')
+        self.assertEqual(list(row), list(PRODUCTS[1]))
+        self.assertEqual(row['Chov'], 'Bio')
+        self.assertIsNone(self.sql.find_product('farm1', 'shop_sku'))
+
+    def test_filters_and_counts_match(self):
+        """Test, že filtry a počty dávají v obou úložištích stejný výsledek"""
+        for backend in (self.json, self.sql):
+            self.assertEqual(backend.count_products('farm1'), 3)
+            self.assertEqual(backend.count_products('farm1', confirmed=True), 1)
+            self.assertEqual([p['Shop SKU'] for p in backend.list_products('farm1', category='Mléčné')], ['A', 'B'])
+
+    def test_cursor_pagination(self):
+        """Test, že stránkování kurzorem after_sku projde katalog bez opakování"""
+        for backend in (self.json, self.sql):
+            page, cursor = backend.list_page('farm1', 2)
+            self.assertEqual([p['Shop SKU'] for p in page], ['A', 'B'])
+            self.assertEqual(cursor, 'B')
+            page, cursor = backend.list_page('farm1', 2, after_sku=cursor)
+            self.assertEqual([p['Shop SKU'] for p in page], ['C'])
+            self.assertIsNone(cursor)
+            page, cursor = backend.list_page('farm1', 5, after_sku='A', confirmed=False)
+            self.assertEqual([p['Shop SKU'] for p in page], ['C'])
+            with self.assertRaises(KeyError):
+                backend.list_page('farm1', 2, after_sku='X')
+
+    def test_farm_stats(self):
+        """Test, že počty po farmách (GROUP BY / souhrny) souhlasí v obou úložištích"""
+        expected = {'farm1': {'is_active': True, 'products': 3, 'confirmed': 1}}
+        self.assertEqual(self.sql.farm_stats(), expected)
+        self.assertEqual(self.json.farm_stats(user_id=1), expected)
+        self.assertEqual(self.sql.farm_stats(user_id=2), {})
+
+    def test_update_product(self):
+        """Test, že úprava v SQL úložišti mění typované i JSON sloupce"""
+        ack = self.sql.update_product('farm1', 'C', {'is_confirmed': True, 'image_path': 'http://x/C.jpg'})
+        self.assertTrue(ack.found)
+        row = self.sql.find_product('farm1', 'C')
+        self.assertTrue(row['is_confirmed'])
+        self.assertEqual(row['image_path'], 'http://x/C.jpg')
+        self.assertEqual(self.sql.count_products('farm1', confirmed=True), 2)
+        self.assertFalse(self.sql.update_product('farm1', 'X', {'is_confirmed': True}).found)
+        with self.assertRaises(ValueError):
+            self.sql.update_product('farm1', 'C', {'Name': 'Jiný název'})
+
+    def test_update_products_in_bulk(self):
+        """Test, že hromadná úprava zapíše všechny nalezené produkty v obou úložištích"""
+        edits = [('A', {'Short Description': 'Krátký A'}), ('X', {'Short Description': 'Nic'}),
+                 ('C', {'Description': '<p>C</p>'})]
+        for backend in (self.json, self.sql):
+            acks = backend.update_products('farm1', edits)
+            self.assertEqual([ack.found for ack in acks], [True, False, True])
+            self.assertEqual(backend.find_product('farm1', 'A')['Short Description'], 'Krátký A')
+            self.assertEqual(backend.find_product('farm1', 'C')['Description'], '<p>C</p>')
+
+    def test_same_sku_in_different_farms(self):
+        """Test, že SKU je unikátní jen v rámci farmy"""
+        db.session.add(Farm(farm_id='farm2', name='Farma 2', description='', user_id=1))
+        db.session.commit()
+        self.sql.save_catalog('farm2', {'products': PRODUCTS})
+        self.assertEqual(Product.query.filter_by(sku='A').count(), 2)
+        self.sql.delete_catalog('farm2')
+        self.assertEqual(self.sql.count_products('farm2'), 0)
+        self.assertEqual(self.sql.count_products('farm1'), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+from app.core.catalog_binary import BinaryCatalog, dump_catalog, load_catalog, convert_catalog, is_binary_catalog
+
+CATALOG = {
+    'farm_id': 'farm1',
+    'name': 'Farma',
+    'description': 'Rodinná farma',
+    'products': [
+        {'Category': 'category', 'Shop SKU': 'shop_sku', 'Name': 'name', 'Farm allergens': 'farm_allergens'},
+        {'Category': 'Mléčné', 'Shop SKU': 'A', 'Name': 'Tvaroh', 'Farm allergens': 'mléko', 'is_confirmed': True},
+        {'Category': 'Maso', 'Shop SKU': 'B', 'Name': 'Klobása', 'Farm allergens': '', 'Cena': 129.5,
+         'Množství': 3, 'image_path': None, 'tags': ['uzené']}
+    ]
+}
+
+
+class BinaryCatalogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.bin_path = os.path.join(self.tmp_dir, 'farm1.catalog.bin')
+        dump_catalog(CATALOG, self.bin_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        """Test, že převod do binárního formátu a zpět zachová data i pořadí sloupců"""
+        data = load_catalog(self.bin_path)
+        self.assertEqual(data, CATALOG)
+        self.assertEqual([list(p) for p in data['products']], [list(p) for p in CATALOG['products']])
+
+    def test_lazy_field_decoding(self):
+        """Test, že čtení jednoho sloupce nedekóduje ostatní pole řádku"""
+        with BinaryCatalog(self.bin_path) as catalog:
+            self.assertEqual(len(catalog), 3)
+            rows = list(catalog.rows())
+            self.assertEqual([row['Name'] for row in rows], ['name', 'Tvaroh', 'Klobása'])
+            self.assertEqual(rows[2]._values, {'Name': 'Klobása'})
+            self.assertEqual(list(catalog.column('is_confirmed', False)), [False, True, False])
+            self.assertEqual(catalog.meta['name'], 'Farma')
+
+    def test_conversion_both_ways(self):
+        """Test, že convert_catalog rozpozná zdrojový formát a zapíše cílový podle přípony"""
+        json_path = os.path.join(self.tmp_dir, 'farm1.json')
+        convert_catalog(self.bin_path, json_path)
+        self.assertFalse(is_binary_catalog(json_path))
+        with open(json_path, encoding='utf-8') as f:
+            self.assertEqual(json.load(f), CATALOG)
+
+        bin_path = os.path.join(self.tmp_dir, 'copy.catalog.bin')
+        convert_catalog(json_path, bin_path)
+        self.assertTrue(is_binary_catalog(bin_path))
+        self.assertLess(os.path.getsize(bin_path), os.path.getsize(json_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
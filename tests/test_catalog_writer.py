@@ -0,0 +1,131 @@
+import unittest
+import tempfile
+import shutil
+import threading
+import json
+import os
+import time
+from app.core.farm_catalog import FarmCatalogStore
+from app.core.catalog_writer import FarmCatalogWriter
+
+THREADS = 32
+EDITS_PER_THREAD = 25
+
+
+class FarmCatalogWriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.skus = [f'FA_T_{i:04d}' for i in range(THREADS * EDITS_PER_THREAD)]
+        farm_dir = os.path.join(self.base_dir, 'farm1')
+        os.makedirs(farm_dir)
+        products = [{'Shop SKU': 'shop_sku', 'Name': 'name'}]
+        products += [{'Shop SKU': sku, 'Name': f'Produkt {sku}'} for sku in self.skus]
+        with open(os.path.join(farm_dir, 'farm1.json'), 'w', encoding='utf-8') as f:
+            json.dump({'farm_id': 'farm1', 'products': products}, f)
+
+        self.store = FarmCatalogStore(base_dir=self.base_dir)
+        self.writer = FarmCatalogWriter(self.store, window=0.002)
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_concurrent_confirmations_are_not_lost(self):
+        """Stress test: souběžná potvrzení různých SKU se neztratí a slučují se do dávek"""
+        errors = []
+        acks = []
+
+        def worker(offset):
+            try:
+                for sku in self.skus[offset::THREADS]:
+                    acks.append(self.writer.write('farm1', sku, {'is_confirmed': True}))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(THREADS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(acks), len(self.skus))
+        self.assertTrue(all(ack.found for ack in acks))
+
+        # Čtení z nové instance = stav, který uvidí jiný proces
+        fresh = FarmCatalogStore(base_dir=self.base_dir)
+        unconfirmed = [sku for sku in self.skus if not fresh.find_product('farm1', sku).get('is_confirmed')]
+        self.assertEqual(unconfirmed, [])
+
+        stats = self.writer.stats()
+        self.assertEqual(stats['edits'], len(self.skus))
+        self.assertLess(stats['batches'], len(self.skus))
+
+    def test_leader_hands_off_later_edits(self):
+        """Test, že leader zapíše jen úpravy z doby svého startu a další dávku zapíše čekající vlákno"""
+        release = threading.Event()
+        commits = []
+        update_products = self.store.update_products
+
+        def blocking_update(farm_id, edits):
+            commits.append((threading.current_thread().name, [edit['sku'] for edit in edits]))
+            if len(commits) == 1:
+                release.wait(5)
+            return update_products(farm_id, edits)
+
+        self.store.update_products = blocking_update
+        threads = [threading.Thread(target=self.writer.write, args=('farm1', sku, {'is_confirmed': True}), name=sku)
+                   for sku in self.skus[:3]]
+        threads[0].start()
+        while not commits:
+            time.sleep(0.001)
+        for t in threads[1:]:
+            t.start()
+        while len(self.writer._queues['farm1'].pending) < 2:
+            time.sleep(0.001)
+        release.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(commits[0], (self.skus[0], [self.skus[0]]))
+        self.assertEqual(len(commits), 2)
+        self.assertIn(commits[1][0], self.skus[1:3])
+        self.assertEqual(sorted(commits[1][1]), self.skus[1:3])
+        self.assertFalse(self.writer._queues['farm1'].committing)
+
+    def test_timed_out_edit_is_withdrawn(self):
+        """Test, že úprava, na jejíž zápis se přestalo čekat, se z fronty vyřadí a frontu nezablokuje"""
+        release = threading.Event()
+        update_products = self.store.update_products
+
+        def blocking_update(farm_id, edits):
+            release.wait(5)
+            return update_products(farm_id, edits)
+
+        self.store.update_products = blocking_update
+        leader = threading.Thread(target=self.writer.write, args=('farm1', self.skus[0], {'is_confirmed': True}))
+        leader.start()
+        while not self.writer._queues.get('farm1') or self.writer._queues['farm1'].pending:
+            time.sleep(0.001)
+        with self.assertRaises(TimeoutError):
+            self.writer.write('farm1', self.skus[1], {'is_confirmed': True}, timeout=0.05)
+        release.set()
+        leader.join()
+
+        self.assertFalse(self.writer._queues['farm1'].committing)
+        self.assertTrue(self.writer.write('farm1', self.skus[2], {'is_confirmed': True}).found)
+        self.assertNotIn('is_confirmed', FarmCatalogStore(base_dir=self.base_dir).find_product('farm1', self.skus[1]))
+
+    def test_unknown_sku_is_acknowledged_as_not_found(self):
+        """Test, že neexistující SKU nevyvolá chybu ostatním v dávce"""
+        ack = self.writer.write('farm1', 'neexistuje', {'is_confirmed': True})
+        self.assertFalse(ack.found)
+        self.assertTrue(self.writer.write('farm1', self.skus[0], {'is_confirmed': True}).found)
+
+    def test_invalid_field_rejected_before_batching(self):
+        """Test, že pole mimo žurnál je odmítnuto ještě před zařazením do dávky"""
+        with self.assertRaises(ValueError):
+            self.writer.write('farm1', self.skus[0], {'Name': 'Jiný název'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+from app.core.farm_catalog import FarmCatalogStore
+
+
+def write_catalog(base_dir, farm_id, products):
+    farm_dir = os.path.join(base_dir, farm_id)
+    os.makedirs(farm_dir, exist_ok=True)
+    with open(os.path.join(farm_dir, f'{farm_id}.json'), 'w', encoding='utf-8') as f:
+        json.dump({'farm_id': farm_id, 'name': farm_id, 'description': '', 'products': products}, f)
+
+
+class FarmCatalogStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.store = FarmCatalogStore(base_dir=self.base_dir, max_bytes=10 * 1024 * 1024)
+        write_catalog(self.base_dir, 'farm1', [{'Shop SKU': 'A', 'Name': 'Tvaroh'}])
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def test_repeated_get_parses_once(self):
+        """Test, že opakované čtení vrací stejný objekt z cache"""
+        first = self.store.get('farm1')
+        second = self.store.get('farm1')
+        self.assertIs(first, second)
+        self.assertEqual(self.store.stats()['misses'], 1)
+        self.assertEqual(self.store.stats()['hits'], 1)
+
+    def test_external_change_invalidates(self):
+        """Test, že změna souboru mimo cache vynutí nové načtení"""
+        self.store.get('farm1')
+        write_catalog(self.base_dir, 'farm1', [{'Shop SKU': 'A', 'Name': 'Tvaroh'}, {'Shop SKU': 'B', 'Name': 'Máslo'}])
+        self.assertEqual(len(self.store.get('farm1')['products']), 2)
+
+    def test_save_updates_cache_and_disk(self):
+        """Test, že vlastní zápis aktualizuje cache i soubor"""
+        data = self.store.get('farm1')
+        data['products'][0]['is_confirmed'] = True
+        self.store.save('farm1', data)
+        self.assertIs(self.store.get('farm1'), data)
+        with open(self.store.catalog_path('farm1'), encoding='utf-8') as f:
+            self.assertTrue(json.load(f)['products'][0]['is_confirmed'])
+
+    def test_lru_eviction_under_budget(self):
+        """Test, že při překročení limitu se uvolní nejdéle nepoužitý katalog"""
+        write_catalog(self.base_dir, 'farm2', [{'Shop SKU': 'B', 'Name': 'Máslo'}])
+        size = os.path.getsize(self.store.catalog_path('farm1'))
+        store = FarmCatalogStore(base_dir=self.base_dir, max_bytes=size + 10)
+        store.get('farm1')
+        store.get('farm2')
+        self.assertEqual(store.stats()['entries'], 1)
+        store.get('farm1')
+        self.assertEqual(store.stats()['misses'], 3)
+
+    def test_find_product_by_sku(self):
+        """Test, že index SKU najde produkt a přeskočí hlavičkový řádek"""
+        write_catalog(self.base_dir, 'farm2', [
+            {'Shop SKU': 'shop_sku', 'Name': 'name'},
+            {'Shop SKU': 'B', 'Name': 'Máslo'},
+            {'Shop SKU': 'C', 'Name': 'Sýr'}
+        ])
+        self.assertEqual(self.store.find_product('farm2', 'C')['Name'], 'Sýr')
+        self.assertIsNone(self.store.find_product('farm2', 'shop_sku'))
+        self.assertIsNone(self.store.find_product('farm2', 'X'))
+        self.assertEqual(self.store.product_position('farm2', 'B'), 1)
+
+    def test_update_goes_to_journal(self):
+        """Test, že úprava produktu nepřepisuje snapshot, ale připíše se do žurnálu"""
+        snapshot_before = os.path.getmtime(self.store.catalog_path('farm1'))
+        row = self.store.update_product('farm1', 'A', {'is_confirmed': True})
+        self.assertTrue(row['is_confirmed'])
+        self.assertEqual(os.path.getmtime(self.store.catalog_path('farm1')), snapshot_before)
+        self.assertGreater(self.store.journal('farm1').stat()[1], 0)
+        self.assertIsNone(self.store.update_product('farm1', 'X', {'is_confirmed': True}))
+
+    def test_journal_replayed_by_other_instance(self):
+        """Test, že jiný proces (instance) vidí úpravy ze žurnálu"""
+        other = FarmCatalogStore(base_dir=self.base_dir)
+        self.assertNotIn('is_confirmed', other.find_product('farm1', 'A'))
+        self.store.update_product('farm1', 'A', {'Short Description': 'Krátký popis'})
+        self.assertEqual(other.find_product('farm1', 'A')['Short Description'], 'Krátký popis')
+
+    def test_journal_rejects_unknown_fields(self):
+        """Test, že do žurnálu nelze zapsat libovolné pole"""
+        with self.assertRaises(ValueError):
+            self.store.update_product('farm1', 'A', {'Name': 'Jiný název'})
+
+    def test_compaction_folds_journal_into_snapshot(self):
+        """Test, že kompaktor zapracuje žurnál do snapshotu a žurnál smaže"""
+        self.store.update_product('farm1', 'A', {'is_confirmed': True})
+        self.assertTrue(self.store.compact('farm1'))
+        self.assertIsNone(self.store.journal('farm1').stat()[0])
+        with open(self.store.catalog_path('farm1'), encoding='utf-8') as f:
+            self.assertTrue(json.load(f)['products'][0]['is_confirmed'])
+        self.assertTrue(FarmCatalogStore(base_dir=self.base_dir).find_product('farm1', 'A')['is_confirmed'])
+        self.assertFalse(self.store.compact('farm1'))
+
+    def test_torn_journal_line_is_ignored(self):
+        """Test, že useknutý poslední řádek žurnálu nepoškodí čtení ani další zápisy"""
+        self.store.update_product('farm1', 'A', {'is_confirmed': True})
+        with open(self.store.journal('farm1').path, 'a', encoding='utf-8') as f:
+            f.write('{"sku": "A", "set": {"is_conf')
+        other = FarmCatalogStore(base_dir=self.base_dir)
+        self.assertTrue(other.find_product('farm1', 'A')['is_confirmed'])
+        other.update_product('farm1', 'A', {'Description': 'Dlouhý popis'})
+        self.assertEqual(FarmCatalogStore(base_dir=self.base_dir).find_product('farm1', 'A')['Description'], 'Dlouhý popis')
+
+    def test_edit_cost_independent_of_catalog_size(self):
+        """Test, že zápis úpravy nezávisí na velikosti katalogu"""
+        write_catalog(self.base_dir, 'big', [{'Shop SKU': f'S{i}', 'Name': 'x' * 100} for i in range(5000)])
+        self.store.update_product('big', 'S4999', {'is_confirmed': True})
+        self.store.update_product('farm1', 'A', {'is_confirmed': True})
+        self.assertEqual(self.store.journal('big').stat()[1], self.store.journal('farm1').stat()[1] + len('S4999') - len('A'))
+
+    def test_summary_updated_incrementally(self):
+        """Test, že souhrn se při úpravě jen dopočítá a čte se bez načítání katalogu"""
+        write_catalog(self.base_dir, 'farm2', [
+            {'Shop SKU': 'shop_sku', 'Name': 'name'},
+            {'Shop SKU': 'B', 'Name': 'Máslo', 'mirakl_image_1': 'http://x/B.jpg'},
+            {'Shop SKU': 'C', 'Name': 'Sýr'}
+        ])
+        summary = self.store.summary('farm2')
+        self.assertEqual((summary['products'], summary['confirmed'], summary['with_images']), (2, 0, 1))
+
+        self.store.update_products('farm2', [
+            {'sku': 'C', 'set': {'is_confirmed': True, 'Short Description': 'Krátký', 'Description': 'Dlouhý'}},
+            {'sku': 'C', 'set': {'mirakl_image_1': 'http://x/C.jpg'}}
+        ])
+        other = FarmCatalogStore(base_dir=self.base_dir)
+        updated = other.summary('farm2')
+        self.assertEqual(other.stats()['misses'], 0)
+        self.assertEqual((updated['confirmed'], updated['with_images'], updated['with_descriptions']), (1, 2, 1))
+        self.assertEqual(updated['version'], summary['version'] + 1)
+
+        self.store.compact('farm2')
+        self.assertEqual(other.summary('farm2')['version'], updated['version'])
+        self.assertEqual(other.stats()['misses'], 0)
+
+    def test_summary_rebuilt_when_missing_or_stale(self):
+        """Test, že chybějící nebo zastaralý souhrn se přepočítá z katalogu"""
+        self.store.summary('farm1')
+        os.remove(self.store.summary_file('farm1').path)
+        self.assertEqual(self.store.summary('farm1')['products'], 1)
+        write_catalog(self.base_dir, 'farm1', [{'Shop SKU': 'A', 'Name': 'Tvaroh'}, {'Shop SKU': 'B', 'Name': 'Máslo'}])
+        self.assertEqual(self.store.summary('farm1')['products'], 2)
+
+    def test_missing_catalog(self):
+        """Test, že neexistující katalog vyvolá FileNotFoundError"""
+        self.assertFalse(self.store.exists('missing'))
+        with self.assertRaises(FileNotFoundError):
+            self.store.get('missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
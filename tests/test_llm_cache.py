@@ -0,0 +1,80 @@
+import unittest
+import tempfile
+import shutil
+import time
+import os
+from types import SimpleNamespace
+from app.core.llm_cache import LLMCache, request_key
+from app.generators.text_generator import TextGenerator
+
+PRODUCT = {'name': 'Tvaroh měkký 250 g', 'ingredients': 'mléko', 'farm_description': 'Rodinná farma',
+           'farm_name': 'Farma'}
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **request):
+        self.calls += 1
+        message = SimpleNamespace(content=f'Popis {self.calls}')
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class LLMCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'llm_cache.sqlite3')
+        self.cache = LLMCache(path=self.path, ttl=3600, max_entries=1000)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_key_covers_request_parameters(self):
+        """Test, že klíč závisí na modelu, promptu, teplotě i max_tokens"""
+        request = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'x'}], 'temperature': 0.7, 'max_tokens': 200}
+        self.assertEqual(request_key(request), request_key(dict(request)))
+        for change in ({'model': 'gpt-4o-mini'}, {'temperature': 0.2}, {'max_tokens': 1000},
+                       {'messages': [{'role': 'user', 'content': 'y'}]}):
+            self.assertNotEqual(request_key(request), request_key({**request, **change}))
+
+    def test_persistent_with_ttl(self):
+        """Test, že záznam přežije novou instanci a po vypršení TTL se nevrací"""
+        self.cache.set('k', 'text')
+        self.assertEqual(LLMCache(path=self.path, ttl=3600).get('k'), 'text')
+        time.sleep(0.02)
+        expired = LLMCache(path=self.path, ttl=0.01)
+        self.assertIsNone(expired.get('k'))
+        self.assertEqual(expired.stats()['misses'], 1)
+
+    def test_size_eviction_keeps_recently_used(self):
+        """Test, že při překročení limitu se mažou nejdéle nepoužité záznamy"""
+        cache = LLMCache(path=self.path, ttl=0, max_entries=3)
+        for i in range(4):
+            cache.set(f'k{i}', f'v{i}')
+            cache.get('k0')
+        cache._evict(cache._connect(), time.time())
+        self.assertEqual(cache.stats()['entries'], 3)
+        self.assertEqual(cache.get('k0'), 'v0')
+        self.assertIsNone(cache.get('k1'))
+
+    def test_generator_uses_cache_and_bypass(self):
+        """Test, že opakované generování nevolá API a regenerace cache obchází"""
+        generator = TextGenerator()
+        completions = FakeCompletions()
+        generator.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        generator.cache = self.cache
+
+        first = generator.generate_short_description(PRODUCT)
+        self.assertEqual(generator.generate_short_description(PRODUCT), first)
+        self.assertEqual(completions.calls, 1)
+
+        regenerated = generator.generate_short_description(PRODUCT, bypass_cache=True)
+        self.assertNotEqual(regenerated, first)
+        self.assertEqual(generator.generate_short_description(PRODUCT), regenerated)
+        self.assertEqual(completions.calls, 2)
+        self.assertEqual(self.cache.stats()['bypassed'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import unittest
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from app.config.config import Config
+from app.core.openai_clients import OpenAIClientRegistry
+
+COMPLETION = {
+    'id': 'chatcmpl-1', 'object': 'chat.completion', 'created': 0, 'model': 'gpt-4o',
+    'choices': [{'index': 0, 'finish_reason': 'stop', 'message': {'role': 'assistant', 'content': 'Popis'}}]
+}
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps(COMPLETION).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OpenAIClientRegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), CompletionHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{self.server.server_address[1]}/v1'
+        self.patch = mock.patch.multiple(Config, OPENAI_BASE_URL=base_url, OPENAI_API_KEY='x', OPENAI_HTTP2=False)
+        self.patch.start()
+        self.registry = OpenAIClientRegistry()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def complete(self, client):
+        return client.chat.completions.create(model='gpt-4o', messages=[{'role': 'user', 'content': 'x'}])
+
+    def test_sync_client_is_shared_and_reuses_connection(self):
+        """Test, že všichni uživatelé dostanou stejného klienta a spojení se znovu používá"""
+        client = self.registry.client()
+        self.assertIs(self.registry.client(), client)
+        for _ in range(3):
+            self.assertEqual(self.complete(client).choices[0].message.content, 'Popis')
+        stats = self.registry.to_dict()
+        self.assertEqual((stats['requests'], stats['connections'], stats['reused_requests']), (3, 1, 2))
+
+    def test_async_client_per_event_loop(self):
+        """Test, že async klient je sdílený v rámci smyčky a po zavření se uvolní"""
+        async def run():
+            client = self.registry.async_client()
+            self.assertIs(self.registry.async_client(), client)
+            await asyncio.gather(*(client.chat.completions.create(
+                model='gpt-4o', messages=[{'role': 'user', 'content': 'x'}]) for _ in range(4)))
+            await self.registry.close_async_client()
+
+        asyncio.run(run())
+        stats = self.registry.to_dict()
+        self.assertEqual(stats['requests'], 4)
+        self.assertEqual(stats['async_clients'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
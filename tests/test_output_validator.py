@@ -0,0 +1,99 @@
+import unittest
+import json
+import asyncio
+from types import SimpleNamespace
+from app.generators.output_validator import OutputValidator, audit_summary
+from app.core.llm_cache import LLMCache
+from app.core.telemetry import Telemetry
+from app.generators.text_generator import AsyncTextGenerator
+from tests.test_text_generator import GeneratorTestCase, ScriptedCompletions, PRODUCT
+
+
+class OutputValidatorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.validator = OutputValidator()
+
+    def test_forbidden_words_match_inflected_forms_only_as_whole_words(self):
+        """Test, že se najdou skloňované tvary zakázaných slov, ale ne slova, která je jen obsahují"""
+        text = 'Kvalitní tvaroh s jemnou chutí, vyrobený s láskou a lásce k řemeslu. Nekvalita.'
+        self.assertEqual(self.validator.forbidden_words(text), ['kvalita', 'jemný', 'láska'])
+        self.assertEqual(self.validator.forbidden_words('Chlebová textura EKOLOGICKÉHO chleba'),
+                         ['textura', 'ekologický'])
+        self.assertEqual(self.validator.forbidden_words('Jemnozrnná mouka'), [])
+
+    def test_repair_fixes_percent_exclamation_and_length(self):
+        """Test, že oprava doplní mezeru před %, nahradí vykřičníky a zkrátí krátký popis na celé věty"""
+        text = 'Jogurt s 3,5% tuku z farmy Skočdopole! ' + 'Vyrábí se z mléka od vlastních krav na pastvě. ' * 3
+        result = self.validator.repair(text, 'short')
+        self.assertEqual(result.text, 'Jogurt s 3,5 % tuku z farmy Skočdopole. '
+                                      'Vyrábí se z mléka od vlastních krav na pastvě. '
+                                      'Vyrábí se z mléka od vlastních krav na pastvě.')
+        self.assertLessEqual(len(result.text), 150)
+        self.assertEqual(result.repairs, ['percent_format', 'exclamation', 'short_too_long'])
+        self.assertEqual(result.warnings, [])
+
+        # Jedna dlouhá věta se nezkracuje - problém zůstane ve warnings
+        result = self.validator.repair('Velmi ' * 30 + 'ideální sýr.', 'short')
+        self.assertEqual(result.repairs, [])
+        self.assertEqual(result.warnings, ['short_too_long', 'forbidden:ideální'])
+
+    def test_audit_whole_catalog(self):
+        """Test, že audit vrátí řádek na produkt a souhrn problémů celé farmy"""
+        products = [
+            {'Shop SKU': 'A', 'Name': 'Tvaroh', 'Short Description': 'Tvaroh z farmy.',
+             'Description': '<p>Popis.</p>', 'is_confirmed': True},
+            {'Shop SKU': 'B', 'Name': 'Jogurt', 'Short Description': 'Jogurt 3% tuku!',
+             'Description': '<p>Jemný jogurt, jemně kysaný.</p><p>Kvalitní mléko.</p>'},
+            {'Shop SKU': 'C', 'Name': 'Máslo'},
+        ]
+        report = self.validator.audit(products)
+        self.assertEqual(list(report['ok']), [True, False, True])
+        row = report.iloc[1]
+        self.assertEqual(row['forbidden'], ['jemný', 'kvalita'])
+        self.assertTrue(row['percent_format'] and row['exclamation'])
+        self.assertEqual(report.iloc[2]['forbidden'], [])
+        self.assertEqual(audit_summary(report), {'products': 3, 'ok': 2, 'short_too_long': 0, 'percent_format': 1,
+                                                 'exclamation': 1, 'forbidden': {'jemný': 1, 'kvalita': 1}})
+
+
+class GeneratorRepairTestCase(GeneratorTestCase):
+    def test_combined_descriptions_are_repaired(self):
+        """Test, že generátor vrátí opravené popisy bez dalšího volání OpenAI"""
+        generator = self.generator(json.dumps({
+            'short_description': 'Tvaroh s 30% tuku!',
+            'long_description': ['Popis tvarohu!', 'Farma Skočdopole.', 'Tip do kuchyně.']
+        }))
+        result = generator.generate_descriptions(PRODUCT)
+        self.assertEqual(len(self.completions.requests), 1)
+        self.assertEqual(result['short_description'], 'Tvaroh s 30 % tuku.')
+        self.assertTrue(result['long_description'].startswith('<p>Popis tvarohu.</p>'))
+
+    def test_async_descriptions_are_repaired(self):
+        """Test, že i asynchronní generátor (hromadné úlohy) vrátí opravené popisy"""
+        completions = ScriptedCompletions(
+            '{"short_description": "Jen krátký"}', 'Tvaroh s 30% tuku!', 'Popis tvarohu!\n\nFarma.'
+        )
+
+        class AsyncCompletions:
+            async def create(self, **request):
+                return completions.create(**request)
+
+        async def run():
+            generator = AsyncTextGenerator()
+            generator.cache = LLMCache(path=':memory:')
+            generator.telemetry = Telemetry(log_path='')
+            generator.client = SimpleNamespace(chat=SimpleNamespace(completions=AsyncCompletions()))
+            first = await generator.generate_descriptions(PRODUCT)
+            # Druhé volání jde z cache - oprava se provede i tak
+            second = await generator.generate_short_description(PRODUCT)
+            return first, second
+
+        result, cached_short = asyncio.run(run())
+        self.assertEqual(len(completions.requests), 3)
+        self.assertEqual(result['short_description'], 'Tvaroh s 30 % tuku.')
+        self.assertEqual(result['long_description'], '<p>Popis tvarohu.</p><p><strong>O původu</strong></p><p>Farma.</p>')
+        self.assertEqual(cached_short, 'Tvaroh s 30 % tuku.')
+
+
+if __name__ == '__main__':
+    unittest.main()
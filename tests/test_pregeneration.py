@@ -0,0 +1,106 @@
+import unittest
+import os
+import json
+import time
+import shutil
+import tempfile
+import threading
+from app.core.farm_catalog import FarmCatalogStore
+from app.core.catalog_writer import FarmCatalogWriter
+from app.core.catalog_backends import JsonCatalogBackend
+from app.core.bulk_generation import generation_data
+from app.core.llm_cache import LLMCache
+from app.core.pregeneration import InteractiveGate, PregenerationManager
+from app.core.telemetry import Telemetry
+from tests.test_farm_catalog import write_catalog
+from tests.test_text_generator import GeneratorTestCase
+
+PRODUCTS = [
+    {'Shop SKU': 'C1', 'Name': 'Máslo', 'is_confirmed': True},
+    {'Shop SKU': 'D1', 'Name': 'Jogurt', 'Short Description': 'Hotový', 'Description': 'Hotový popis'},
+    {'Shop SKU': 'V1', 'Name': 'Tvaroh', 'Farm ingredients': 'mléko'},
+    {'Shop SKU': 'V2', 'Name': 'Tvaroh', 'Farm ingredients': 'mléko'},
+    {'Shop SKU': 'P1', 'Name': 'Sýr', 'Farm ingredients': 'mléko'},
+    {'Shop SKU': 'P2', 'Name': 'Kefír', 'Farm ingredients': 'mléko'},
+    {'Shop SKU': 'P3', 'Name': 'Podmáslí', 'Farm ingredients': 'mléko'},
+]
+RESPONSE = json.dumps({'short_description': 'Krátký popis.', 'long_description': ['Odstavec.']})
+
+
+class InteractiveGateTestCase(unittest.TestCase):
+    def test_wait_idle_waits_for_interactive_requests(self):
+        """Test, že předgenerování počká na doběhnutí interaktivního požadavku a dobu klidu"""
+        gate = InteractiveGate(quiet=0.05)
+        entered, release = threading.Event(), threading.Event()
+
+        def interactive():
+            with gate.interactive():
+                entered.set()
+                release.wait()
+
+        thread = threading.Thread(target=interactive)
+        thread.start()
+        entered.wait()
+        threading.Timer(0.1, release.set).start()
+        start = time.monotonic()
+        gate.wait_idle()
+        self.assertGreaterEqual(time.monotonic() - start, 0.14)
+        self.assertEqual(gate.active, 0)
+        thread.join()
+
+
+class PregenerationTestCase(GeneratorTestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        write_catalog(self.base_dir, 'farm1', PRODUCTS)
+        self.store = FarmCatalogStore(base_dir=self.base_dir)
+        self.backend = JsonCatalogBackend(self.store, FarmCatalogWriter(self.store, window=0.001))
+        self.text_generator = self.generator(*[RESPONSE] * 10)
+        self.text_generator.cache = LLMCache(path=':memory:')
+        self.text_generator.telemetry = Telemetry(log_path='')
+
+    def tearDown(self):
+        shutil.rmtree(self.base_dir)
+
+    def manager(self, budget):
+        return PregenerationManager(state_dir=os.path.join(self.base_dir, 'pregeneration'),
+                                    generator_factory=lambda: self.text_generator,
+                                    gate=InteractiveGate(quiet=0), budget=budget, cache=self.text_generator.cache)
+
+    def test_generates_into_cache_within_budget(self):
+        """Test, že se nacachované, potvrzené a popsané produkty přeskočí a denní rozpočet se dodrží"""
+        farm_data = self.backend.farm_info('farm1')
+        sku_data = {p['Shop SKU']: generation_data(p, farm_data, 'farm1') for p in PRODUCTS}
+        self.text_generator.generate_descriptions(sku_data['P1'])  # už vygenerováno uživatelem
+
+        manager = self.manager(budget=2)
+        state = manager.run_farm('farm1', self.backend)
+        self.assertEqual(state['status'], 'budget_exhausted')
+        self.assertEqual((state['candidates'], state['cached'], state['generated'], state['used']), (4, 1, 2, 2))
+        self.assertTrue(self.text_generator.descriptions_cached(sku_data['V2']))  # varianty jedním voláním
+        self.assertFalse(self.text_generator.descriptions_cached(sku_data['P3']))
+        self.assertFalse(self.text_generator.descriptions_cached(sku_data['C1']))
+        self.assertEqual(len(self.completions.requests), 3)
+        self.assertEqual(self.store.find_product('farm1', 'P2').get('Short Description'), None)
+
+        # Rozpočet je denní - opětovné nahrání téhož dne už nic nevygeneruje
+        state = manager.run_farm('farm1', self.backend)
+        self.assertEqual((state['status'], state['cached'], state['used']), ('budget_exhausted', 3, 2))
+        self.assertEqual(manager.state('farm1')['used'], 2)
+
+    def test_interactive_paths_use_pregenerated_descriptions(self):
+        """Test, že krátký popis i stream dlouhého popisu po předgenerování nevolají OpenAI"""
+        state = self.manager(budget=10).run_farm('farm1', self.backend)
+        self.assertEqual(state['generated'], 4)
+        requests = len(self.completions.requests)
+
+        product = generation_data(self.store.find_product('farm1', 'P1'), self.backend.farm_info('farm1'), 'farm1')
+        self.assertEqual(self.text_generator.generate_short_description(product), 'Krátký popis.')
+        chunks = list(self.text_generator.stream_long_description(product))
+        self.assertEqual(self.text_generator.finish_long_description(''.join(chunks)), '<p>Odstavec.</p>')
+        self.assertEqual(self.text_generator.generate_long_description(product), '<p>Odstavec.</p>')
+        self.assertEqual(len(self.completions.requests), requests)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import re
+from app.core.product_name_processor import ProductNameProcessor, REMOVE_WORDS, simplify_product_name, simplify_many
+
+NAMES = [
+    'Bio selský tvaroh měkký tučný 1 kg', 'Bio selský jogurt bílý   1 kg', 'Bio selské mléko, tuk 4 – 5%  5 l',
+    'Bio selské mléko, tuk 3,5% „barista“ 2 l', 'Bio zakysaná smetana 16% 1 l', 'Bio čerstvá smetana 35%  1 kg',
+    'Farmářský sýr Eidam 500g', 'TRADIČNÍ domácí klobása 250 g', 'Přírodní pravý med 10 l', 'Originální extra',
+    'Premium máslo 82%', 'BIO Extra máslo 250g', 'Mléko  5 l ', 'Bio', 'Premium', 'biobio kefír 1kg',
+]
+
+
+def legacy_simplify(product_name: str) -> str:
+    """Původní implementace (11x str.replace) - referenční výsledek"""
+    name_lower = product_name.lower()
+    for word in REMOVE_WORDS:
+        name_lower = name_lower.replace(word.lower(), '').strip()
+    name_lower = re.sub(r'\s*\d+\s*[kgl][gl]?\b', '', name_lower)
+    return ' '.join(name_lower.split())
+
+
+class SimplifyProductNameTestCase(unittest.TestCase):
+    def test_matches_previous_implementation(self):
+        """Test, že předkompilovaný výraz dává stejné názvy jako původní postupné str.replace"""
+        self.assertEqual([simplify_product_name(name) for name in NAMES], [legacy_simplify(name) for name in NAMES])
+        self.assertEqual(simplify_product_name('Bio selský tvaroh měkký tučný 1 kg'), 'tvaroh měkký tučný')
+        self.assertEqual(ProductNameProcessor().simplify_product_name('x', alt_name='Domácí sýr 500g'), 'sýr')
+
+    def test_simplify_many(self):
+        """Test, že hromadné zjednodušení odpovídá jednotlivému včetně prázdných a chybějících názvů"""
+        names = ['Bio jogurt 1 kg', None, '', 'Bio jogurt 1 kg', float('nan'), 'Čerstvý  sýr 5 kg']
+        self.assertEqual(simplify_many(names), [simplify_product_name(name) for name in names])
+        self.assertEqual(simplify_many(names)[:2], ['jogurt', 'unknown_product'])
+        self.assertEqual(simplify_many([None]), ['unknown_product'])
+        self.assertEqual(simplify_many([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,200 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+from app.core.rate_limiter import (TokenBucketStore, AdaptiveConcurrency, OpenAIGovernor, GovernedTransport,
+                                   AsyncGovernedTransport, estimate_tokens)
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    """Server, který první požadavek odmítne 429 a další odbaví s usage"""
+    protocol_version = 'HTTP/1.1'
+    calls = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        ThrottlingHandler.calls += 1
+        if ThrottlingHandler.calls == 1:
+            status, payload = 429, {'error': {'message': 'Rate limit'}}
+        else:
+            status, payload = 200, {'usage': {'total_tokens': 50}}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        if status == 429:
+            self.send_header('Retry-After', '0.2')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TokenBucketStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'limits.sqlite3')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_buckets_are_shared_between_instances(self):
+        """Test, že vyčerpaný bucket vidí i jiná instance (jiný worker) nad stejným souborem"""
+        first = TokenBucketStore(self.path, rpm=2, tpm=1000)
+        second = TokenBucketStore(self.path, rpm=2, tpm=1000)
+        self.assertEqual(first.reserve(100), 0)
+        self.assertEqual(second.reserve(100), 0)
+        wait = first.reserve(100)
+        self.assertGreater(wait, 20)  # 1 požadavek se doplní za 30 s
+        self.assertLessEqual(wait, 30)
+
+    def test_token_limit_and_adjust(self):
+        """Test, že limit tokenů čeká na doplnění a oprava odhadu tokeny vrátí"""
+        bucket = TokenBucketStore(self.path, rpm=0, tpm=600)
+        self.assertEqual(bucket.reserve(500), 0)
+        self.assertAlmostEqual(bucket.reserve(200), 10, delta=0.5)  # chybí 100 tokenů, 10 tokenů/s
+        bucket.adjust(-400)  # skutečná spotřeba byla 100
+        self.assertEqual(bucket.reserve(200), 0)
+
+    def test_block_pauses_all_requests(self):
+        """Test, že po 429 čekají všechny požadavky (i ty z jiných workerů)"""
+        bucket = TokenBucketStore('', rpm=100, tpm=0)
+        bucket.block(5)
+        self.assertAlmostEqual(bucket.reserve(1), 5, delta=0.5)
+
+
+class AdaptiveConcurrencyTestCase(unittest.TestCase):
+    def test_additive_increase_multiplicative_decrease(self):
+        """Test, že limit roste po úspěších a po 429 nebo skoku latence klesne na polovinu"""
+        concurrency = AdaptiveConcurrency(initial=4, maximum=10, cooldown=0)
+        for _ in range(4):
+            self.assertTrue(concurrency.try_acquire())
+        self.assertFalse(concurrency.try_acquire())
+        for _ in range(4):
+            concurrency.release(1.0, 100)
+        self.assertEqual(concurrency.to_dict()['limit'], 4)
+        self.assertGreater(concurrency.limit, 4.9)
+
+        concurrency.try_acquire()
+        concurrency.release(None, 100, throttled=True)
+        self.assertEqual(concurrency.to_dict()['limit'], 2)
+
+        concurrency.try_acquire()
+        concurrency.release(10.0, 100)  # 10x pomalejší než dosud
+        self.assertEqual(concurrency.to_dict(), {'limit': 1, 'active': 0, 'decreases': 2})
+
+
+class GovernedTransportTestCase(unittest.TestCase):
+    def test_throttled_response_blocks_bucket_and_usage_corrects_estimate(self):
+        """Test, že transport po 429 sníží souběžnost a pozastaví bucket a odhad opraví podle usage"""
+        ThrottlingHandler.calls = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        governor = OpenAIGovernor(TokenBucketStore('', rpm=1000, tpm=10000), AdaptiveConcurrency(initial=4))
+        client = httpx.Client(transport=GovernedTransport(httpx.HTTPTransport(), governor))
+        url = f'http://127.0.0.1:{server.server_address[1]}/v1/chat/completions'
+        body = {'messages': [{'role': 'user', 'content': 'x' * 300}], 'max_tokens': 200}
+        try:
+            self.assertEqual(estimate_tokens(body), 304)
+            self.assertEqual(client.post(url, json=body).status_code, 429)
+            self.assertGreater(governor.bucket.reserve(1), 0)  # pauza podle Retry-After
+
+            response = client.post(url, json=body)
+            self.assertEqual(response.json()['usage']['total_tokens'], 50)
+            stats = governor.to_dict()
+            self.assertEqual((stats['throttled'], stats['active'], stats['limit']), (1, 0, 2))
+            self.assertLess(governor.waited, 1)
+            # Odmítnutý požadavek tokeny vrátil a odhad 304 se opravil na skutečných 50
+            self.assertEqual(governor.bucket.reserve(9600), 0)
+        finally:
+            client.close()
+            server.shutdown()
+            server.server_close()
+
+    def test_wait_is_bounded_by_request_timeout(self):
+        """Test, že čekání na rate limit nepřekročí timeout požadavku (PoolTimeout, slot se uvolní)"""
+        governor = OpenAIGovernor(TokenBucketStore('', rpm=100, tpm=0), AdaptiveConcurrency(initial=1))
+        governor.bucket.block(30)
+        client = httpx.Client(transport=GovernedTransport(httpx.HTTPTransport(), governor), timeout=0.5)
+        try:
+            with self.assertRaises(httpx.PoolTimeout):
+                client.post('http://127.0.0.1:9/v1/chat/completions', json={'max_tokens': 10})
+            self.assertEqual(governor.to_dict()['active'], 0)
+        finally:
+            client.close()
+
+    def test_streamed_response_holds_slot_until_closed(self):
+        """Test, že streamovaná odpověď drží slot souběžnosti, dokud se její tělo nedočte a nezavře"""
+        def handler(request):
+            return httpx.Response(200, headers={'content-type': 'text/event-stream'},
+                                  stream=httpx.ByteStream(b'data: {}\n\ndata: [DONE]\n\n'))
+
+        governor = OpenAIGovernor(TokenBucketStore('', rpm=0, tpm=0), AdaptiveConcurrency(initial=1))
+        client = httpx.Client(transport=GovernedTransport(httpx.MockTransport(handler), governor))
+        try:
+            with client.stream('POST', 'http://openai.test/v1/chat/completions', json={'stream': True}) as response:
+                self.assertEqual(governor.to_dict()['active'], 1)
+                self.assertTrue(response.read().endswith(b'[DONE]\n\n'))
+            self.assertEqual(governor.to_dict()['active'], 0)
+        finally:
+            client.close()
+
+    def test_async_streamed_response_holds_slot_until_closed(self):
+        """Test, že i async transport uvolní slot až po zavření streamu"""
+        governor = OpenAIGovernor(TokenBucketStore('', rpm=0, tpm=0), AdaptiveConcurrency(initial=1))
+
+        async def run():
+            transport = httpx.MockTransport(lambda request: httpx.Response(
+                200, headers={'content-type': 'text/event-stream'}, stream=StreamBody(b'data: [DONE]\n\n')))
+            async with httpx.AsyncClient(transport=AsyncGovernedTransport(transport, governor)) as client:
+                async with client.stream('POST', 'http://openai.test/v1/chat/completions', json={}) as response:
+                    active = governor.to_dict()['active']
+                    await response.aread()
+            return active
+
+        self.assertEqual(asyncio.run(run()), 1)
+        self.assertEqual(governor.to_dict()['active'], 0)
+
+    def test_async_transport_releases_outside_event_loop(self):
+        """Test, že async transport volá after (zápis do SQLite) mimo vlákno smyčky událostí"""
+        threads = []
+
+        class RecordingGovernor(OpenAIGovernor):
+            def after(self, *args, **kwargs):
+                threads.append(threading.get_ident())
+                super().after(*args, **kwargs)
+
+        governor = RecordingGovernor(TokenBucketStore('', rpm=0, tpm=0), AdaptiveConcurrency(initial=1))
+
+        async def run():
+            transport = httpx.MockTransport(lambda request: httpx.Response(
+                200, json={'usage': {'total_tokens': 5}}) if request.url.path.startswith('/json/') else httpx.Response(
+                200, headers={'content-type': 'text/event-stream'}, stream=StreamBody(b'data: [DONE]\n\n')))
+            async with httpx.AsyncClient(transport=AsyncGovernedTransport(transport, governor)) as client:
+                await client.post('http://openai.test/json/chat/completions', json={})
+                async with client.stream('POST', 'http://openai.test/v1/chat/completions', json={}) as response:
+                    await response.aread()
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(run())
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(loop_thread, threads)
+        self.assertEqual(governor.to_dict()['active'], 0)
+
+
+class StreamBody(httpx.AsyncByteStream):
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def __aiter__(self):
+        yield self.data
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import os
+import time
+import shutil
+import tempfile
+import threading
+from app.core.single_flight import SingleFlight, FlightError
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'flights.sqlite3')
+        self.calls = []
+        self.release = threading.Event()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def generate(self, result):
+        def fn():
+            self.calls.append(result)
+            self.release.wait(5)
+            return {'short_description': result}
+        return fn
+
+    def run_concurrently(self, flights, fn, count=5):
+        results = []
+        threads = [threading.Thread(target=lambda flight=flights[i % len(flights)]: results.append(flight.do('farm1:A', fn)))
+                   for i in range(count)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.3)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_share_one_generation(self):
+        """Test, že souběžná volání se stejným klíčem provedou operaci jednou"""
+        flight = SingleFlight(path='')
+        results = self.run_concurrently([flight], self.generate('Krátký'))
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([result for result, _ in results], [{'short_description': 'Krátký'}] * 5)
+        self.assertTrue(all(shared for _, shared in results))
+        self.assertEqual(flight.stats()['shared_local'], 4)
+
+        # Po dokončení se výsledek nepamatuje
+        flight.do('farm1:A', self.generate('Nový'))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_error_is_shared(self):
+        """Test, že chybu leadera dostanou i čekající volání"""
+        flight = SingleFlight(path='')
+        errors = []
+
+        def fail():
+            self.calls.append(1)
+            self.release.wait(5)
+            raise ValueError('API nedostupné')
+
+        def call():
+            try:
+                flight.do('farm1:A', fail)
+            except ValueError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        self.release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual((len(self.calls), errors), (1, ['API nedostupné'] * 3))
+
+    def test_workers_share_result_through_lease(self):
+        """Test, že worker v jiném procesu (jiná instance nad stejným souborem) počká na výsledek leadera"""
+        workers = [SingleFlight(path=self.path, poll_interval=0.05) for _ in range(2)]
+        results = self.run_concurrently(workers, self.generate('Krátký'), count=4)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual([result for result, _ in results], [{'short_description': 'Krátký'}] * 4)
+        self.assertEqual(sum(worker.stats()['shared_remote'] for worker in workers), 1)
+
+    def test_expired_lease_is_taken_over(self):
+        """Test, že po pádu leadera (vypršený lease) operaci převezme čekající worker"""
+        crashed = SingleFlight(path=self.path, lease=0.3)
+        self.assertTrue(crashed._acquire('farm1:A', 'crashed-flight'))
+        worker = SingleFlight(path=self.path, poll_interval=0.05)
+        self.release.set()
+        result, shared = worker.do('farm1:A', self.generate('Převzato'))
+        self.assertEqual((result, shared), ({'short_description': 'Převzato'}, False))
+
+    def test_remote_error_raises_flight_error(self):
+        """Test, že chyba leadera v jiném procesu se čekajícímu ohlásí jako FlightError"""
+        leader = SingleFlight(path=self.path)
+        self.assertTrue(leader._acquire('k', 'f1'))
+        threading.Timer(0.2, leader._finish, ('k', 'f1', 'error', 'API nedostupné')).start()
+        with self.assertRaisesRegex(FlightError, 'API nedostupné'):
+            SingleFlight(path=self.path, poll_interval=0.05).do('k', self.generate('x'))
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import time
+from app.core.stats_cache import StatsCache
+
+
+class StatsCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.cache = StatsCache(ttl=0.05)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'total_products': self.calls}
+
+    def test_cached_until_ttl(self):
+        """Test, že hodnota se do vypršení TTL nepočítá znovu"""
+        self.assertEqual(self.cache.get_or_compute('user1', self.compute), {'total_products': 1})
+        self.assertEqual(self.cache.get_or_compute('user1', self.compute), {'total_products': 1})
+        self.cache.get_or_compute('user2', self.compute)
+        self.assertEqual(self.calls, 2)
+        time.sleep(0.06)
+        self.assertEqual(self.cache.get_or_compute('user1', self.compute), {'total_products': 3})
+
+    def test_write_invalidates(self):
+        """Test, že zápis produktů zneplatní cache před vypršením TTL"""
+        self.cache.get_or_compute('user1', self.compute)
+        self.cache.invalidate()
+        self.assertEqual(self.cache.get_or_compute('user1', self.compute), {'total_products': 2})
+
+    def test_result_computed_during_write_not_cached(self):
+        """Test, že výsledek spočítaný souběžně se zápisem se neuloží"""
+        def compute_with_write():
+            self.cache.invalidate()
+            return self.compute()
+        self.cache.get_or_compute('user1', compute_with_write)
+        self.cache.get_or_compute('user1', self.compute)
+        self.assertEqual(self.calls, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from types import SimpleNamespace
+import openai
+from app.core.telemetry import Telemetry, Histogram
+from app.core.retry_policy import RetryPolicy
+from tests.test_text_generator import GeneratorTestCase, PRODUCT, api_error
+
+
+class TelemetryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.tmp_dir, 'telemetry', 'generation.jsonl')
+        self.telemetry = Telemetry(log_path=self.log_path, max_bytes=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_histogram_buckets(self):
+        """Test, že histogram počítá kumulativní koše a odhaduje kvantily horní hranicí koše"""
+        histogram = Histogram()
+        for value in (0.1, 0.3, 0.3, 1.5, 70):
+            histogram.observe(value)
+        data = histogram.to_dict()
+        self.assertEqual(data['buckets'][0], [0.25, 1])
+        self.assertEqual(data['buckets'][1], [0.5, 3])
+        self.assertEqual(data['buckets'][-1], ['+Inf', 5])
+        self.assertEqual(data['p50'], 0.5)
+        self.assertEqual(data['p99'], '+Inf')
+
+    def test_overflow_quantile_is_valid_json(self):
+        """Test, že kvantil nad posledním košem (> 64 s) projde jako platný JSON"""
+        self.telemetry.record({'latency': 100.0, 'attempts': 1})
+        data = json.loads(json.dumps(self.telemetry.snapshot(), allow_nan=False))
+        self.assertEqual(data['total']['latency']['p50'], '+Inf')
+
+    def test_calls_are_aggregated_and_logged(self):
+        """Test, že volání se sečtou podle farmy, endpointu a typu a zapíšou do logu událostí"""
+        with self.telemetry.context(farm_id='3018', sku='A', endpoint='bulk_generation'):
+            with self.telemetry.track('combined', 'gpt-4o') as call:
+                call.attempts = 2
+                call.add_usage(SimpleNamespace(prompt_tokens=1000, completion_tokens=500))
+                call.warnings = ['forbidden:kvalita']
+        with self.assertRaises(ValueError):
+            with self.telemetry.track('short', 'gpt-4o') as call:
+                raise ValueError('Chyba')
+
+        snapshot = self.telemetry.snapshot()
+        farm = snapshot['by_farm']['3018']
+        self.assertEqual((farm['calls'], farm['attempts'], farm['prompt_tokens']), (1, 2, 1000))
+        self.assertAlmostEqual(farm['cost_usd'], 0.0075)
+        self.assertEqual(farm['warnings'], {'forbidden:kvalita': 1})
+        self.assertEqual(snapshot['by_endpoint']['other']['errors'], 1)
+        self.assertEqual(set(snapshot['by_type']), {'combined', 'short'})
+        self.assertEqual(snapshot['slowest'][0]['sku'], 'A')
+
+        with open(self.log_path, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+        self.assertEqual(events[0]['farm'], '3018')
+        self.assertNotIn('cache_hit', events[0])  # nulové hodnoty se vynechají
+        self.assertEqual(events[1]['error'], 'Chyba')
+        self.assertEqual(self.telemetry.aggregate_log()['total'], snapshot['total'])
+
+
+class GeneratorTelemetryTestCase(GeneratorTestCase):
+    def setUp(self):
+        self.telemetry = Telemetry(log_path='')
+
+    def generator(self, *responses):
+        generator = super().generator(*responses)
+        generator.telemetry = self.telemetry
+        generator.retry_policy = RetryPolicy(attempts=3, base=0.01, cap=0.02, min_attempt=0.1)
+        return generator
+
+    def test_generator_records_attempts_fallback_and_warnings(self):
+        """Test, že generátor zaznamená pokusy, fallback a zakázaná slova z validace"""
+        generator = self.generator(api_error(openai.InternalServerError, 500), 'Vysoká kvalita tvarohu.',
+                                   api_error(openai.BadRequestError, 400))
+        generator.generate_short_description(PRODUCT)
+        generator.generate_short_description({**PRODUCT, 'name': 'Máslo'})
+
+        short = self.telemetry.snapshot()['by_type']['short']
+        self.assertEqual((short['calls'], short['attempts'], short['fallbacks']), (2, 3, 1))
+        self.assertEqual(short['warnings'], {'forbidden:kvalita': 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
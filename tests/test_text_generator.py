@@ -0,0 +1,192 @@
+import unittest
+import json
+import time
+import asyncio
+from types import SimpleNamespace
+from unittest import mock
+import httpx
+import openai
+from app.config.config import Config
+from app.core.llm_cache import LLMCache
+from app.core.retry_policy import Deadline, RetryPolicy, retry_after
+from app.generators.text_generator import TextGenerator, AsyncTextGenerator, ParagraphStream, GenerationError
+
+PRODUCT = {'name': 'Tvaroh měkký 250 g', 'ingredients': 'mléko', 'farm_description': 'Rodinná farma',
+           'farm_name': 'Farma Skočdopole'}
+
+
+class ScriptedCompletions:
+    """Vrací předem dané odpovědi a zaznamenává požadavky"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def create(self, stream=False, **request):
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        if stream:
+            return (SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))]) for piece in response)
+        message = SimpleNamespace(content=response)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class GeneratorTestCase(unittest.TestCase):
+    def generator(self, *responses):
+        generator = TextGenerator()
+        generator.cache = LLMCache(path='')
+        self.completions = ScriptedCompletions(*responses)
+        generator.client = SimpleNamespace(chat=SimpleNamespace(completions=self.completions))
+        return generator
+
+
+class CombinedGenerationTestCase(GeneratorTestCase):
+    def test_both_descriptions_in_one_call(self):
+        """Test, že oba popisy přijdou jedním voláním a dlouhý popis se naformátuje"""
+        generator = self.generator(json.dumps({
+            'short_description': 'Tvaroh z farmy.',
+            'long_description': ['Popis tvarohu.', 'Farma Skočdopole.', 'Tip do kuchyně.']
+        }))
+        result = generator.generate_descriptions(PRODUCT)
+        self.assertEqual(len(self.completions.requests), 1)
+        self.assertEqual(self.completions.requests[0]['response_format'], {'type': 'json_object'})
+        self.assertEqual(result['short_description'], 'Tvaroh z farmy.')
+        self.assertEqual(result['long_description'],
+                         '<p>Popis tvarohu.</p><p><strong>O původu</strong></p><p>Farma Skočdopole.</p>'
+                         '<p><strong>Tipy do kuchyně</strong></p><p>Tip do kuchyně.</p>')
+
+    def test_cache_hit_is_not_rewritten(self):
+        """Test, že zásah cache kombinovaný záznam nepřepíše (zachová stáří a počet zásahů)"""
+        generator = self.generator(json.dumps({'short_description': 'Tvaroh z farmy.', 'long_description': ['Popis.']}))
+        generator.cache = LLMCache(path=':memory:')
+        first = generator.generate_descriptions(PRODUCT)
+        created_at, = generator.cache._connect().execute('SELECT created_at FROM llm_cache').fetchone()
+        self.assertEqual(generator.generate_descriptions(PRODUCT), first)
+        self.assertEqual(generator.cache._connect().execute('SELECT created_at, hits FROM llm_cache').fetchone(),
+                         (created_at, 1))
+
+    def test_invalid_response_falls_back_to_two_calls(self):
+        """Test, že nezpracovatelná odpověď vede na samostatné generování obou popisů"""
+        generator = self.generator('{"short_description": "Jen krátký"}', 'Krátký popis.', 'Odstavec 1')
+        result = generator.generate_descriptions(PRODUCT)
+        self.assertEqual(len(self.completions.requests), 3)
+        self.assertNotIn('response_format', self.completions.requests[1])
+        self.assertEqual(result, {'short_description': 'Krátký popis.', 'long_description': '<p>Odstavec 1</p>'})
+
+
+class StreamingGenerationTestCase(GeneratorTestCase):
+    def test_paragraph_stream_handles_split_separator(self):
+        """Test, že oddělovač odstavců rozdělený mezi kousky streamu se rozpozná"""
+        stream = ParagraphStream()
+        pieces = []
+        for delta in ('Tvaroh je', ' čerstvý.\n', '\nFarma', ' leží', '\n\nTip'):
+            pieces.extend(stream.feed(delta))
+        self.assertEqual(pieces, [(0, 'Tvaroh je'), (0, ' čerstvý.'), (1, 'Farma'), (1, ' leží'), (2, 'Tip')])
+
+    def test_stream_long_description_is_cached(self):
+        """Test, že streamovaný popis přijde po kouskách a uloží se do LLM cache"""
+        generator = self.generator(['Odstavec', ' 1\n\nOdstavec 2'])
+        generator.cache = LLMCache(path=':memory:')
+        self.assertEqual(list(generator.stream_long_description(PRODUCT)), ['Odstavec', ' 1\n\nOdstavec 2'])
+        self.assertEqual(list(generator.stream_long_description(PRODUCT)), ['Odstavec 1\n\nOdstavec 2'])
+        self.assertEqual(len(self.completions.requests), 1)
+
+    def test_stream_never_yields_fallback_or_empty_text(self):
+        """Test, že prázdný stream se neuloží do cache a neúspěch skončí GenerationError místo fallback textu"""
+        generator = self.generator([], 'Odstavec 1')
+        self.assertEqual(list(generator.stream_long_description(PRODUCT)), ['Odstavec 1'])
+        self.assertEqual(len(self.completions.requests), 2)
+
+        generator = self.generator([], api_error(openai.AuthenticationError, 401))
+        generator.cache = LLMCache(path=':memory:')
+        with self.assertRaises(GenerationError):
+            list(generator.stream_long_description(PRODUCT))
+        self.assertEqual(generator.cache.stats()['entries'], 0)
+
+
+def api_error(error_class, status, headers=None):
+    request = httpx.Request('POST', 'https://api.openai.com/v1/chat/completions')
+    response = httpx.Response(status, headers=headers, request=request)
+    return error_class('Chyba', response=response, body=None)
+
+
+class RetryTestCase(GeneratorTestCase):
+    def generator(self, *responses):
+        generator = super().generator(*responses)
+        generator.retry_policy = RetryPolicy(attempts=3, base=0.01, cap=0.05, min_attempt=0.5)
+        return generator
+
+    def test_transient_error_is_retried_within_deadline(self):
+        """Test, že přechodná chyba se zopakuje a pokus dostane timeout ze zbytku rozpočtu"""
+        generator = self.generator(api_error(openai.InternalServerError, 503), 'Krátký popis.')
+        deadline = Deadline(5)
+        self.assertEqual(generator.generate_short_description(PRODUCT, deadline=deadline), 'Krátký popis.')
+        self.assertEqual(len(self.completions.requests), 2)
+        self.assertLessEqual(self.completions.requests[1]['timeout'], 5)
+        self.assertEqual(generator.retry_policy.retries, 1)
+
+    def test_non_retryable_error_returns_fallback(self):
+        """Test, že chyba, kterou opakování nespraví (401), vede hned na fallback popis"""
+        generator = self.generator(api_error(openai.AuthenticationError, 401), 'Nepoužije se')
+        self.assertEqual(generator.generate_short_description(PRODUCT),
+                         'Tvaroh měkký 250 g - farmářský produkt z Farma Skočdopole.')
+        self.assertEqual(len(self.completions.requests), 1)
+
+    def test_retry_after_beyond_deadline_returns_fallback_immediately(self):
+        """Test, že když Retry-After přesahuje rozpočet, fallback se vrátí bez čekání"""
+        error = api_error(openai.RateLimitError, 429, {'retry-after': '30'})
+        self.assertEqual(retry_after(error), 30)
+        generator = self.generator(error, 'Nepoužije se')
+        start = time.monotonic()
+        text = generator.generate_short_description(PRODUCT, deadline=Deadline(3))
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertIn('farmářský produkt', text)
+        self.assertEqual(generator.retry_policy.deadline_exceeded, 1)
+
+    def test_split_fallback_has_own_budget_after_combined_timeout(self):
+        """Test, že kombinované volání, které vyčerpá svůj rozpočet, nepřipraví záložní volání o čas"""
+        timeout_error = openai.APITimeoutError(request=httpx.Request('POST', 'https://api.openai.com'))
+        generator = self.generator(timeout_error, 'Krátký popis.', 'Odstavec 1')
+        scripted = self.completions.create
+
+        def create(**request):
+            if 'response_format' in request:
+                time.sleep(request['timeout'])  # kombinované volání vyprší až na konci rozpočtu
+            return scripted(**request)
+
+        generator.client.chat.completions = SimpleNamespace(create=create)
+        with mock.patch.object(Config, 'GENERATION_DEADLINE', 0.6), mock.patch.object(Config, 'COMBINED_GENERATION', True):
+            result = generator.generate_descriptions(PRODUCT)
+        self.assertEqual(result, {'short_description': 'Krátký popis.', 'long_description': '<p>Odstavec 1</p>'})
+        self.assertEqual(len(self.completions.requests), 3)
+        self.assertEqual(generator.retry_policy.deadline_exceeded, 0)
+
+    def test_async_generation_raises_after_deadline(self):
+        """Test, že hromadné (async) generování po vyčerpání rozpočtu vyhodí GenerationError"""
+        async def run():
+            generator = AsyncTextGenerator()
+            generator.cache = LLMCache(path='')
+            generator.retry_policy = RetryPolicy(attempts=50, base=0.2, cap=0.2, min_attempt=0.1)
+
+            class Completions:
+                calls = 0
+
+                async def create(self, **request):
+                    Completions.calls += 1
+                    raise openai.APITimeoutError(request=httpx.Request('POST', 'https://api.openai.com'))
+
+            generator.client = SimpleNamespace(chat=SimpleNamespace(completions=Completions()))
+            with self.assertRaises(GenerationError):
+                await generator.generate_short_description(PRODUCT, deadline=Deadline(0.35))
+            return Completions.calls
+
+        start = time.monotonic()
+        calls = asyncio.run(run())
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertLess(calls, 50)  # ukončil to rozpočet, ne počet pokusů
+
+
+if __name__ == '__main__':
+    unittest.main()
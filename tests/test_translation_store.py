@@ -0,0 +1,113 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+import httpx
+import openai
+from app.config.config import Config
+from app.core.retry_policy import RetryPolicy
+from app.core.translation_store import TranslationStore
+from app.processors.product_name_processor import ProductNameProcessor
+
+
+class TranslatingCompletions:
+    """Přeloží názvy z JSON seznamu v promptu (vynechá názvy z `skip`)"""
+
+    def __init__(self, skip=(), broken=(), errors=()):
+        self.skip = skip
+        self.broken = broken  # dávka s některým z těchto názvů dostane uříznutý JSON
+        self.errors = list(errors)
+        self.requests = []
+
+    def create(self, **request):
+        self.requests.append(request)
+        if self.errors:
+            raise self.errors.pop(0)
+        prompt = request['messages'][-1]['content']
+        names = json.loads(prompt[prompt.index('['):prompt.index(']') + 1])
+        if set(names) & set(self.broken):
+            return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"translations": {"'),
+                                                            finish_reason='length')])
+        translations = {name: f'EN {name}' for name in names if name not in self.skip}
+        content = json.dumps({'translations': translations})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class TranslationStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = TranslationStore(path=os.path.join(self.tmp_dir, 'translations.sqlite3'))
+        self.patches = [mock.patch('app.processors.product_name_processor.translation_store', self.store),
+                        mock.patch.object(Config, 'TRANSLATION_BATCH_SIZE', 2)]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def processor(self, completions):
+        processor = ProductNameProcessor()
+        processor.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+        return processor
+
+    def test_reconnects_after_fork(self):
+        """Test, že se spojení s SQLite po forku (jiné pid) otevře znovu a nesdílí se mezi procesy"""
+        self.store.set_many({'tvaroh': 'Quark'})
+        conn = self.store._connect()
+        with mock.patch('os.getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(self.store._connect(), conn)
+            self.assertEqual(self.store.get('Tvaroh'), 'Quark')
+
+    def test_batches_and_persists_translations(self):
+        """Test, že chybějící názvy se přeloží po dávkách a jiný proces je najde v úložišti"""
+        completions = TranslatingCompletions()
+        result = self.processor(completions).translate_many(['Tvaroh', 'máslo', 'tvaroh', 'kefír', 'jogurt'])
+        self.assertEqual(result['tvaroh'], 'EN tvaroh')
+        self.assertEqual(len(result), 4)
+        self.assertEqual(len(completions.requests), 2)
+        self.assertEqual(completions.requests[0]['response_format'], {'type': 'json_object'})
+
+        other = TranslatingCompletions()
+        self.assertEqual(self.processor(other)._simplify_product_name('Bio kefír 1 kg', for_image=True), 'EN kefír')
+        self.assertEqual(other.requests, [])
+        self.assertEqual(TranslationStore(path=self.store.path).get('Máslo'), 'EN máslo')
+
+    def test_missing_translation_is_not_stored(self):
+        """Test, že název, který odpověď vynechala, se neuloží a příště se přeloží znovu"""
+        processor = self.processor(TranslatingCompletions(skip=('sýr',)))
+        self.assertEqual(processor._translate_to_english('sýr'), 'sýr')
+        self.assertIsNone(self.store.get('sýr'))
+        processor.client.chat.completions.skip = ()
+        self.assertEqual(processor._translate_to_english('sýr'), 'EN sýr')
+
+    def test_unparsable_batch_is_split_and_transient_error_retried(self):
+        """Test, že uříznutá odpověď vede na rozpůlení dávky a přechodná chyba se zopakuje"""
+        timeout = openai.APITimeoutError(request=httpx.Request('POST', 'https://api.openai.com'))
+        completions = TranslatingCompletions(broken=('máslo',), errors=[timeout])
+        with mock.patch.object(Config, 'TRANSLATION_BATCH_SIZE', 4), \
+                mock.patch('app.processors.product_name_processor.generation_retry',
+                           RetryPolicy(attempts=3, base=0.01, cap=0.01, min_attempt=0.1)):
+            result = self.processor(completions).translate_many(['kefír', 'máslo', 'sýr', 'tvaroh'])
+        self.assertEqual(result, {'kefír': 'EN kefír', 'sýr': 'EN sýr', 'tvaroh': 'EN tvaroh'})
+        # Pokus s chybou, celá dávka, poloviny [kefír, máslo] a [sýr, tvaroh], pak kefír a máslo zvlášť
+        self.assertEqual(len(completions.requests), 6)
+        self.assertGreater(completions.requests[1]['max_tokens'], completions.requests[2]['max_tokens'])
+        self.assertIsNone(self.store.get('máslo'))
+
+    def test_warm_translations_for_catalog(self):
+        """Test, že import připraví překlady zjednodušených názvů (varianty jen jednou)"""
+        completions = TranslatingCompletions()
+        products = [{'Shop SKU': 'shop_sku', 'Name': 'name'}, {'Shop SKU': 'T1', 'Name': 'Bio tvaroh 1 kg'},
+                    {'Shop SKU': 'T5', 'Name': 'Bio tvaroh 5 kg'}, {'Shop SKU': 'M1', 'Name': 'Máslo 250 g'}]
+        self.assertEqual(self.processor(completions).warm_translations(products), 2)
+        self.assertEqual(self.store.get_many(['tvaroh', 'máslo']), {'tvaroh': 'EN tvaroh', 'máslo': 'EN máslo'})
+        self.assertEqual(len(completions.requests), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()